@@ -1,30 +1,71 @@
-import openai
 import os
+import threading
+import time
 from dotenv import load_dotenv
+from metrics import timed
+from backends import create_generation_backend
+from response_cache import cache_key, create_response_cache
 
 load_dotenv()
-openai.api_key = os.getenv('OPENAI_API_KEY')
+
+# Global cap on in-flight LLM calls, shared by every caller in the process
+api_slots = threading.BoundedSemaphore(int(os.getenv('AI_MAX_CONCURRENCY', 4)))
 
 class AIQuestionGenerator:
-    def __init__(self):
+    def __init__(self, backend=None, cache=None):
         self.model = "gpt-3.5-turbo"
+        self.backend = backend or create_generation_backend()
+        if cache is None:
+            cache = create_response_cache()
+        # cache=False turns caching off for this generator
+        self.cache = cache or None
     
-    def generate_question(self, section, difficulty, topic=None):
+    def _complete(self, system, prompt, temperature, max_tokens=1000, fresh=False, parse=None):
+        """Run one chat completion through the response cache and backend and return its text.
+        
+        ``fresh`` skips the cache entirely, for prompts whose point is a new answer every time.
+        With ``parse`` the parsed result is returned instead, and text that parses to None is
+        never cached, so a malformed response is not served again on retry.
+        """
+        messages = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ]
+        key = None
+        if self.cache is not None:
+            if fresh:
+                self.cache.record_bypass()
+            else:
+                key = cache_key(self.model, messages, temperature, max_tokens)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    value = parse(cached[0]) if parse else cached[0]
+                    if value is not None:
+                        return value
+                    self.cache.delete(key)
+        
+        started = time.perf_counter()
+        with api_slots:
+            result = self.backend.complete(self.model, messages, temperature, max_tokens)
+        value = parse(result.text) if parse else result.text
+        if key is not None and value is not None:
+            self.cache.put(key, result.text, result.prompt_tokens, result.completion_tokens,
+                           time.perf_counter() - started)
+        return value
+    
+    @timed('sat_operation_seconds')
+    def generate_question(self, section, difficulty, topic=None, fresh=True):
         """Generate a new SAT question using OpenAI API"""
         prompt = self._create_prompt(section, difficulty, topic)
         
         try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert SAT question creator for Omani students."},
-                    {"role": "user", "content": prompt}
-                ],
+            return self._complete(
+                "You are an expert SAT question creator for Omani students.",
+                prompt,
                 temperature=0.7,
-                max_tokens=1000
+                fresh=fresh,
+                parse=self._parse_response
             )
-            
-            return self._parse_response(response.choices[0].message['content'])
         except Exception as e:
             print(f"Error generating question: {e}")
             return None
@@ -75,6 +116,7 @@ class AIQuestionGenerator:
             print(f"Error parsing response: {e}")
             return None
     
+    @timed('sat_operation_seconds')
     def generate_arabic_translation(self, question_data):
         """Generate Arabic translation for a question"""
         prompt = f"""
@@ -97,17 +139,28 @@ class AIQuestionGenerator:
         """
         
         try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert translator for educational content."},
-                    {"role": "user", "content": prompt}
-                ],
+            return self._complete(
+                "You are an expert translator for educational content.",
+                prompt,
                 temperature=0.3,
-                max_tokens=1000
+                parse=self._parse_response
             )
-            
-            return self._parse_response(response.choices[0].message['content'])
         except Exception as e:
             print(f"Error generating translation: {e}")
             return None
+    
+    @timed('sat_operation_seconds')
+    def explain_concept(self, concept):
+        """Explain a concept for SAT students; identical requests are served from the cache"""
+        prompt = f"Explain the concept of {concept.strip().lower()} in simple terms for a high school student preparing for the SAT."
+        
+        try:
+            return self._complete(
+                "You are an expert SAT tutor for Omani students.",
+                prompt,
+                temperature=0.3,
+                max_tokens=600
+            )
+        except Exception as e:
+            print(f"Error generating explanation: {e}")
+            return None
@@ -0,0 +1,159 @@
+"""Pluggable LLM and translation backends.
+
+AIQuestionGenerator and SATPrep talk to these instead of calling OpenAI and
+Google Translate directly. LLM_BACKEND / TRANSLATION_BACKEND pick the
+implementation; ``stub`` selects deterministic local backends that model
+latency, error rate and token throughput without any network access.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+
+CompletionResult = namedtuple('CompletionResult', ['text', 'prompt_tokens', 'completion_tokens'])
+
+
+class BackendError(Exception):
+    """Raised by a backend when an upstream call fails"""
+
+
+def count_tokens(text):
+    # Close enough to the tokenizer for load modelling: ~4 characters per token
+    return max(1, len(text) // 4)
+
+
+class OpenAIBackend:
+    def __init__(self, api_key=None):
+        import openai
+        openai.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.openai = openai
+
+    def complete(self, model, messages, temperature, max_tokens):
+        response = self.openai.ChatCompletion.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        usage = response.get('usage', {})
+        return CompletionResult(
+            response.choices[0].message['content'],
+            usage.get('prompt_tokens', 0),
+            usage.get('completion_tokens', 0)
+        )
+
+
+class StubGenerationBackend:
+    """Deterministic local LLM.
+
+    Responses depend only on the prompt, so identical prompts always get
+    identical text. Each call sleeps for ``latency`` plus up to ``jitter``
+    seconds plus the time to stream its tokens at ``tokens_per_second``, and
+    fails with probability ``error_rate``.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, tokens_per_second=None, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def complete(self, model, messages, temperature, max_tokens):
+        prompt = '\n'.join(message['content'] for message in messages)
+        with self._lock:
+            self.calls += 1
+            fails = self._rng.random() < self.error_rate
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+
+        text = self._respond(prompt)
+        completion_tokens = min(max_tokens, count_tokens(text))
+        if self.tokens_per_second:
+            delay += completion_tokens / self.tokens_per_second
+        if delay:
+            time.sleep(delay)
+        if fails:
+            raise BackendError("Stub backend injected failure")
+        return CompletionResult(text, count_tokens(prompt), completion_tokens)
+
+    def _respond(self, prompt):
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+        rng = random.Random(digest)
+        if '"question_ar"' in prompt:
+            return json.dumps({
+                'question_ar': f"سؤال تجريبي {digest}",
+                'passage_ar': '',
+                'options_ar': [f"خيار {i + 1} {digest}" for i in range(4)],
+                'explanation_ar': f"شرح تجريبي {digest}"
+            }, ensure_ascii=False)
+        if '"question"' in prompt:
+            options = [f"Option {chr(65 + i)} {digest}" for i in range(4)]
+            difficulty = next((level for level in (1, 2, 3) if f'"difficulty": {level}' in prompt), 2)
+            return json.dumps({
+                'question': f"Stub question {digest}?",
+                'passage': '',
+                'options': options,
+                'answer': options[rng.randrange(4)],
+                'explanation': f"Stub explanation {digest}",
+                'difficulty': difficulty
+            })
+        return f"Stub explanation {digest}. " * rng.randint(5, 20)
+
+
+class GoogleTranslateBackend:
+    def translate(self, text, target_lang, source_lang='auto'):
+        from deep_translator import GoogleTranslator
+        return GoogleTranslator(source=source_lang, target=target_lang).translate(text)
+
+
+class StubTranslationBackend:
+    """Deterministic local translator with configurable latency and error rate"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def translate(self, text, target_lang, source_lang='auto'):
+        with self._lock:
+            self.calls += 1
+            fails = self._rng.random() < self.error_rate
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+        if fails:
+            raise BackendError("Stub translator injected failure")
+        return f"[{target_lang}] {text}"
+
+
+def _stub_options(prefix):
+    return {
+        'latency': float(os.getenv(f'{prefix}_LATENCY_MS', 0)) / 1000,
+        'jitter': float(os.getenv(f'{prefix}_JITTER_MS', 0)) / 1000,
+        'error_rate': float(os.getenv(f'{prefix}_ERROR_RATE', 0)),
+        'seed': int(os.getenv(f'{prefix}_SEED', 0))
+    }
+
+
+def create_generation_backend():
+    if os.getenv('LLM_BACKEND', 'openai') == 'stub':
+        tokens_per_second = os.getenv('STUB_LLM_TOKENS_PER_SECOND')
+        return StubGenerationBackend(
+            tokens_per_second=float(tokens_per_second) if tokens_per_second else None,
+            **_stub_options('STUB_LLM')
+        )
+    return OpenAIBackend()
+
+
+def create_translation_backend():
+    if os.getenv('TRANSLATION_BACKEND', 'google') == 'stub':
+        return StubTranslationBackend(**_stub_options('STUB_TRANSLATE'))
+    return GoogleTranslateBackend()
@@ -0,0 +1,108 @@
+"""Resumable backfill of missing Arabic question text.
+
+Scans the bank in id order for questions whose Arabic fields are empty,
+translates each batch with a bounded worker pool, writes the batch back
+with one bulk update and checkpoints the last id it finished. Re-running
+the job continues from the checkpoint; --restart starts over, which also
+retries questions an earlier run could not translate.
+
+    python backfill.py --workers 8 --batch-size 200
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sat_utils import SATPrep
+
+JOB_NAME = 'arabic_backfill'
+
+
+class ArabicBackfill:
+    def __init__(self, sat, workers=8, batch_size=200, job=JOB_NAME):
+        self.sat = sat
+        self.workers = workers
+        self.batch_size = batch_size
+        self.job = job
+        self.translated = 0
+        self.failed = []
+
+    def translate_question(self, row):
+        """Return (question_ar, options_ar, explanation_ar, id), or None if it could not be translated"""
+        question_id, question_en, options_en, answer, explanation_en = row
+        translation = self.sat.ai_generator.generate_arabic_translation({
+            'question': question_en,
+            'options': options_en,
+            'answer': answer,
+            'explanation': explanation_en
+        })
+        if translation and translation.get('question_ar') and len(translation.get('options_ar') or []) == len(options_en):
+            return (translation['question_ar'], translation['options_ar'],
+                    translation.get('explanation_ar', ''), question_id)
+
+        # Fall back to field-by-field machine translation
+        try:
+            translator = self.sat.translator
+            return (
+                translator.translate(question_en, 'ar'),
+                [translator.translate(option, 'ar') for option in options_en],
+                translator.translate(explanation_en, 'ar') if explanation_en else '',
+                question_id
+            )
+        except Exception as e:
+            print(f"Could not translate question {question_id}: {e}")
+            return None
+
+    def run(self, restart=False, limit=None):
+        if restart:
+            self.sat.db.save_checkpoint(self.job, 0)
+        last_id = self.sat.db.get_checkpoint(self.job)
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while limit is None or self.translated + len(self.failed) < limit:
+                size = self.batch_size if limit is None else min(self.batch_size, limit - self.translated - len(self.failed))
+                batch = self.sat.db.get_questions_missing_arabic(last_id, size)
+                if not batch:
+                    break
+
+                batch_started = time.perf_counter()
+                results = list(pool.map(self.translate_question, batch))
+                updates = [result for result in results if result is not None]
+                self.sat.db.update_arabic_translations(updates)
+                self.failed.extend(row[0] for row, result in zip(batch, results) if result is None)
+                self.translated += len(updates)
+
+                last_id = batch[-1][0]
+                self.sat.db.save_checkpoint(self.job, last_id)
+                rate = len(batch) / (time.perf_counter() - batch_started)
+                print(f"Backfilled up to id {last_id}: {self.translated} translated, "
+                      f"{len(self.failed)} failed ({rate:.1f} questions/s)")
+
+        elapsed = time.perf_counter() - started
+        return {
+            'translated': self.translated,
+            'failed': len(self.failed),
+            'last_id': last_id,
+            'seconds': round(elapsed, 2),
+            'questions_per_second': round((self.translated + len(self.failed)) / elapsed, 2) if elapsed else None
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill missing Arabic question text")
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--limit', type=int, help="Stop after this many questions")
+    parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint and rescan from the start")
+    args = parser.parse_args()
+
+    sat = SATPrep()
+    try:
+        summary = ArabicBackfill(sat, args.workers, args.batch_size).run(args.restart, args.limit)
+    finally:
+        sat.close()
+    print(summary)
+
+
+if __name__ == '__main__':
+    main()
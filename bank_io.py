@@ -0,0 +1,208 @@
+"""Bulk import and export of the question bank.
+
+Imports stream JSON Lines (optionally gzipped) one line at a time and upsert
+them in batches, so files far larger than memory can be loaded and re-loaded.
+The line reached is checkpointed after every batch; if an import is
+interrupted, running it again on the unchanged file resumes from there.
+A finished import clears its checkpoint, so importing the file again (or
+an updated file at the same path) reads it from line 1. A nested questions.json file is accepted too.
+Exports write JSON Lines or, with pyarrow
+installed, Parquet for analytics.
+
+    python bank_io.py import bank.jsonl.gz
+    python bank_io.py export bank.parquet
+"""
+import argparse
+import gzip
+import json
+import os
+import time
+
+from storage import create_storage
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def normalize_question(record, section=None):
+    """Accept either the flat export format or the nested questions.json item format"""
+    if isinstance(record.get('question'), dict):
+        return {
+            'section': record.get('section', section),
+            'question_en': record['question']['en'],
+            'question_ar': record['question'].get('ar', ''),
+            'options_en': [option['en'] for option in record['options']],
+            'options_ar': [option.get('ar', '') for option in record['options']],
+            'answer': record['answer'],
+            'explanation_en': record.get('explanation', {}).get('en', ''),
+            'explanation_ar': record.get('explanation', {}).get('ar', ''),
+            'difficulty': record.get('difficulty', 2),
+            'passage_en': (record.get('passage') or {}).get('en'),
+            'passage_ar': (record.get('passage') or {}).get('ar', ''),
+            'topic': record.get('topic')
+        }
+    return {
+        'section': record.get('section', section),
+        'question_en': record['question_en'],
+        'question_ar': record.get('question_ar', ''),
+        'options_en': record['options_en'],
+        'options_ar': record.get('options_ar', []),
+        'answer': record['answer'],
+        'explanation_en': record.get('explanation_en', ''),
+        'explanation_ar': record.get('explanation_ar', ''),
+        'difficulty': record.get('difficulty', 2),
+        'passage_en': record.get('passage_en'),
+        'passage_ar': record.get('passage_ar', ''),
+        'topic': record.get('topic')
+    }
+
+
+def iter_jsonl(path, skip=0):
+    """Yield (line_number, record) pairs, skipping the first ``skip`` lines"""
+    with _open(path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            if line_number <= skip or not line.strip():
+                continue
+            yield line_number, json.loads(line)
+
+
+def import_job(path):
+    """Checkpoint name for one version of a file: a rewritten file never resumes an old import"""
+    stat = os.stat(path)
+    return f"import:{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def import_jsonl(db, path, batch_size=5000, restart=False):
+    job = import_job(path)
+    if restart:
+        db.save_checkpoint(job, 0)
+    start_line = db.get_checkpoint(job)
+    started = time.perf_counter()
+    imported = 0
+    batch = []
+    line_number = start_line
+
+    for line_number, record in iter_jsonl(path, skip=start_line):
+        batch.append(normalize_question(record))
+        if len(batch) >= batch_size:
+            db.upsert_questions(batch)
+            db.save_checkpoint(job, line_number)
+            imported += len(batch)
+            batch = []
+    if batch:
+        db.upsert_questions(batch)
+        imported += len(batch)
+    db.save_checkpoint(job, 0)
+
+    elapsed = time.perf_counter() - started
+    return {
+        'rows': imported,
+        'resumed_from_line': start_line,
+        'seconds': round(elapsed, 2),
+        'rows_per_second': round(imported / elapsed, 1) if elapsed else None
+    }
+
+
+def import_questions_json(db, path):
+    """Upsert a nested questions.json file; re-running it on an existing bank restores dropped passages"""
+    started = time.perf_counter()
+    with open(path, 'r', encoding='utf-8') as f:
+        sections = json.load(f)
+    questions = [normalize_question(record, section)
+                 for section, records in sections.items() for record in records]
+    db.upsert_questions(questions)
+    elapsed = time.perf_counter() - started
+    return {'rows': len(questions), 'seconds': round(elapsed, 2)}
+
+
+def export_jsonl(db, path):
+    count = 0
+    with _open(path, 'w') as f:
+        for question in db.iter_questions():
+            f.write(json.dumps(question, ensure_ascii=False))
+            f.write('\n')
+            count += 1
+    return count
+
+
+def export_parquet(db, path, batch_size=50000):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet export needs pyarrow: pip install pyarrow")
+
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('section', pa.string()),
+        ('question_en', pa.string()),
+        ('question_ar', pa.string()),
+        ('options_en', pa.list_(pa.string())),
+        ('options_ar', pa.list_(pa.string())),
+        ('answer', pa.string()),
+        ('explanation_en', pa.string()),
+        ('explanation_ar', pa.string()),
+        ('difficulty', pa.int8()),
+        ('topic', pa.string()),
+        ('passage_en', pa.string()),
+        ('passage_ar', pa.string())
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        batch = []
+        for question in db.iter_questions(batch_size):
+            batch.append(question)
+            if len(batch) >= batch_size:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+
+def export_bank(db, path):
+    started = time.perf_counter()
+    if path.endswith('.parquet'):
+        count = export_parquet(db, path)
+    else:
+        count = export_jsonl(db, path)
+    elapsed = time.perf_counter() - started
+    return {
+        'rows': count,
+        'seconds': round(elapsed, 2),
+        'rows_per_second': round(count / elapsed, 1) if elapsed else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import or export the question bank")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help="Upsert questions from a .jsonl, .jsonl.gz or questions.json file")
+    import_parser.add_argument('path')
+    import_parser.add_argument('--batch-size', type=int, default=5000)
+    import_parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint and read from line 1")
+
+    export_parser = subparsers.add_parser('export', help="Write the bank to .jsonl, .jsonl.gz or .parquet")
+    export_parser.add_argument('path')
+
+    args = parser.parse_args()
+    db = create_storage()
+    try:
+        if args.command == 'import' and args.path.endswith('.json'):
+            print(import_questions_json(db, args.path))
+        elif args.command == 'import':
+            print(import_jsonl(db, args.path, args.batch_size, args.restart))
+        else:
+            print(export_bank(db, args.path))
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+"""Offline benchmarks for the SAT prep bot and app."""
@@ -0,0 +1,47 @@
+"""Throughput of the Arabic backfill job over a large bank.
+
+    python -m benchmarks.backfill --questions 20000 --workers 8 --latency-ms 20
+
+Builds a synthetic bank with the Arabic fields blanked out and runs the
+backfill against stub backends, printing per-batch and overall rates.
+"""
+import argparse
+import json
+import os
+import tempfile
+
+from ai_generator import AIQuestionGenerator
+from backends import StubGenerationBackend, StubTranslationBackend
+from backfill import ArabicBackfill
+from sat_utils import SATPrep
+from storage import create_storage
+from benchmarks.synthetic import insert_questions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arabic backfill benchmark")
+    parser.add_argument('--questions', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--error-rate', type=float, default=0.01)
+    parser.add_argument('--database-url', help="Empty database to fill (defaults to a temporary SQLite file)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = create_storage(args.database_url or os.path.join(tmp, 'backfill_bench.db'))
+        insert_questions(db, args.questions)
+        db.update_arabic_translations([('', [], '', question['id']) for question in db.iter_questions()])
+
+        backend = StubGenerationBackend(latency=args.latency_ms / 1000, error_rate=args.error_rate)
+        sat = SATPrep(db=db, ai_generator=AIQuestionGenerator(backend=backend, cache=False),
+                      translator=StubTranslationBackend())
+        summary = ArabicBackfill(sat, args.workers, args.batch_size).run()
+        summary['remaining'] = len(db.get_questions_missing_arabic(0, args.questions))
+        sat.close()
+
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
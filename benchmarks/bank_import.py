@@ -0,0 +1,64 @@
+"""Bulk import/export throughput for a large question bank.
+
+    python -m benchmarks.bank_import --rows 1000000
+
+Writes a synthetic gzipped JSON Lines bank, imports it into an empty
+database, re-imports it (every row becomes an update), then exports it
+to JSON Lines and, if pyarrow is installed, Parquet.
+"""
+import argparse
+import gzip
+import json
+import os
+import tempfile
+import time
+
+from bank_io import export_bank, import_jsonl
+from storage import create_storage
+from benchmarks.synthetic import QUESTION_FIELDS, generate_questions
+
+
+def write_bank(path, rows, seed=0):
+    started = time.perf_counter()
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        for row in generate_questions(rows, seed):
+            f.write(json.dumps(dict(zip(QUESTION_FIELDS, row)), ensure_ascii=False))
+            f.write('\n')
+    return round(time.perf_counter() - started, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bank import/export benchmark")
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--database-url', help="Empty database to import into (defaults to a temporary SQLite file)")
+    args = parser.parse_args()
+
+    report = {'rows': args.rows}
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'bank.jsonl.gz')
+        report['generate_seconds'] = write_bank(source, args.rows)
+        report['source_bytes'] = os.path.getsize(source)
+
+        db = create_storage(args.database_url or os.path.join(tmp, 'import_bench.db'))
+        report['import'] = import_jsonl(db, source, args.batch_size)
+        report['reimport'] = import_jsonl(db, source, args.batch_size)
+
+        jsonl_path = os.path.join(tmp, 'export.jsonl')
+        report['export_jsonl'] = export_bank(db, jsonl_path)
+        report['export_jsonl']['bytes'] = os.path.getsize(jsonl_path)
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            report['export_parquet'] = 'skipped: pyarrow not installed'
+        else:
+            parquet_path = os.path.join(tmp, 'export.parquet')
+            report['export_parquet'] = export_bank(db, parquet_path)
+            report['export_parquet']['bytes'] = os.path.getsize(parquet_path)
+        db.close()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Stats query latency before and after compacting old answer history.
+
+    python -m benchmarks.compaction --users 2000 --answers 2000000 --days 365 --horizon-days 30
+
+Builds a year of synthetic history, times the per-user stats queries,
+compacts everything past the horizon into daily summaries and archive
+files, then times the same queries again on the smaller hot table.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+
+from progress_archive import ProgressCompactor
+from storage import create_storage
+from benchmarks.run import measure
+from benchmarks.synthetic import insert_history, insert_questions, insert_users
+
+
+def query_latencies(db, user_ids, iterations, seed):
+    rng = random.Random(seed)
+    return {
+        'get_user_stats': measure(lambda i: db.get_user_stats(rng.choice(user_ids)), iterations),
+        'get_weak_areas': measure(lambda i: db.get_weak_areas(rng.choice(user_ids)), iterations),
+        'get_daily_progress_90d': measure(lambda i: db.get_daily_progress(rng.choice(user_ids), 90), iterations)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="History compaction benchmark")
+    parser.add_argument('--questions', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--answers', type=int, default=2000000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--horizon-days', type=int, default=30)
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--database-url', help="Empty database to fill (defaults to a temporary SQLite file)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = create_storage(args.database_url or os.path.join(tmp, 'compaction_bench.db'))
+        insert_questions(db, args.questions, args.seed)
+        insert_users(db, args.users)
+        insert_history(db, args.answers, args.questions, args.seed, days=args.days)
+        user_ids = db.get_user_ids_after(0, args.users)
+
+        before = query_latencies(db, user_ids, args.iterations, args.seed)
+        archive = os.path.join(tmp, 'archive')
+        compaction = ProgressCompactor(db, archive, args.horizon_days).run()
+        archive_bytes = sum(os.path.getsize(os.path.join(archive, name)) for name in os.listdir(archive))
+        after = query_latencies(db, user_ids, args.iterations, args.seed)
+        db.close()
+
+    compaction.pop('files')
+    print(json.dumps({
+        'answers': args.answers,
+        'days': args.days,
+        'horizon_days': args.horizon_days,
+        'compaction': dict(compaction, archive_bytes=archive_bytes),
+        'before': before,
+        'after': after
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
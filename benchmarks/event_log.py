@@ -0,0 +1,96 @@
+"""Answer event log: multi-process append rate, tail rate and delivery latency.
+
+    python -m benchmarks.event_log --processes 4 --events 200000 --segment-events 50000
+
+Several writer processes append to one log directory with small segments
+so rolls happen under contention; the report checks that the offsets they
+got back are dense and unique. A consumer then tails the whole log, and a
+live consumer measures how long an appended event takes to reach it.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+from event_log import EventConsumer, EventLog
+from benchmarks.run import percentile
+
+
+def writer(directory, segment_events, count, seed, results):
+    log = EventLog(directory, segment_events)
+    offsets = [log.append_answer(seed, i, i % 3 != 0, 12.5) for i in range(count)]
+    log.close()
+    results.put(offsets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer event log benchmark")
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--segment-events', type=int, default=50000)
+    parser.add_argument('--live-events', type=int, default=500)
+    parser.add_argument('--poll-ms', type=float, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, 'events')
+        per_process = args.events // args.processes
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=writer, args=(directory, args.segment_events, per_process, i, results))
+                   for i in range(args.processes)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        offsets = sorted(offset for _ in workers for offset in results.get())
+        for worker in workers:
+            worker.join()
+        append_seconds = time.perf_counter() - started
+
+        log = EventLog(directory, args.segment_events)
+        consumer = EventConsumer(log, lambda events: None, batch_size=10000)
+        started = time.perf_counter()
+        while consumer.poll():
+            pass
+        tail_seconds = time.perf_counter() - started
+
+        delays = []
+        seen = threading.Event()
+
+        def on_events(events):
+            now = time.time()
+            delays.extend(now - event.timestamp for event in events)
+            seen.set()
+
+        live = EventConsumer(log, on_events, poll_interval=args.poll_ms / 1000)
+        live.offset = log.end_offset()
+        live.start()
+        for i in range(args.live_events):
+            seen.clear()
+            log.append_answer(0, i, True, 1.0)
+            seen.wait(1)
+        live.stop()
+        stats = log.stats()
+        log.close()
+
+    delays.sort()
+    print(json.dumps({
+        'processes': args.processes,
+        'appended': len(offsets),
+        'offsets_dense_and_unique': offsets == list(range(len(offsets))),
+        'segments': stats['segments'],
+        'bytes_per_event': round(stats['bytes'] / stats['end_offset'], 1),
+        'append_events_per_second': round(len(offsets) / append_seconds, 1),
+        'tail_events_per_second': round(consumer.handled / tail_seconds, 1),
+        'delivery_latency_ms': {
+            'p50': round(percentile(delays, 0.50) * 1000, 2),
+            'p99': round(percentile(delays, 0.99) * 1000, 2),
+            'max': round(delays[-1] * 1000, 2)
+        }
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
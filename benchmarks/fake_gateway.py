@@ -0,0 +1,144 @@
+"""Offline load test for the sharded bot runtime.
+
+A fake gateway generates command events for many guilds and routes each one
+to the process that owns the guild's shard, the same way Discord does.
+Every process builds its own SATPrep on the shared database, so the
+run measures sharded throughput against the shared-state database layer
+without touching Discord.
+
+    python -m benchmarks.fake_gateway --processes 4 --shards 16 --events 20000
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from event_log import EventLog
+from storage import create_storage
+from sharding import shard_for_guild, shard_ids_for_process
+from benchmarks.synthetic import SECTIONS, insert_questions
+
+
+def generate_events(count, guilds, users_per_guild, seed=0):
+    rng = random.Random(seed)
+    guild_ids = [(rng.randrange(1 << 40) << 22) | rng.randrange(1 << 22) for _ in range(guilds)]
+    for _ in range(count):
+        guild_id = rng.choice(guild_ids)
+        user_id = f"{guild_id}:{rng.randrange(users_per_guild)}"
+        roll = rng.random()
+        if roll < 0.5:
+            command = 'pyq'
+        elif roll < 0.9:
+            command = 'answer'
+        elif roll < 0.98:
+            command = 'stats'
+        else:
+            command = 'startstudy'
+        yield {'guild_id': guild_id, 'user_id': user_id, 'command': command,
+               'section': rng.choice(SECTIONS), 'correct': rng.random() < 0.6}
+
+
+def shard_worker(db_path, events_dir, inbox, results):
+    # Imported here so each process builds its own SATPrep, exactly like a shard does
+    from ai_generator import AIQuestionGenerator
+    from sat_utils import SATPrep
+
+    sat = SATPrep(db=create_storage(db_path), ai_generator=AIQuestionGenerator(cache=False),
+                  events=EventLog(events_dir))
+    results.put({'ready': os.getpid()})
+    last_question = {}
+    handled = 0
+    answers = 0
+    busy = 0.0
+    while True:
+        event = inbox.get()
+        if event is None:
+            break
+        started = time.perf_counter()
+        command = event['command']
+        user_id = event['user_id']
+        if command == 'pyq':
+            question = sat.get_pyq(event['section'])
+            if question:
+                last_question[user_id] = question['id']
+        elif command == 'answer':
+            question_id = last_question.pop(user_id, 1)
+            sat.record_user_answer(user_id, user_id, question_id, event['correct'], 5)
+            sat.record_session_answer(user_id, event['correct'], event['section'])
+            answers += 1
+        elif command == 'stats':
+            sat.get_user_stats(user_id)
+        elif command == 'startstudy':
+            sat.start_study_session(user_id, user_id)
+        busy += time.perf_counter() - started
+        handled += 1
+    sat.close()
+    results.put({'pid': os.getpid(), 'handled': handled, 'answers': answers, 'busy_seconds': round(busy, 3)})
+
+
+def run(processes, shards, events, guilds, users_per_guild, questions, db_path, events_dir):
+    db = create_storage(db_path)
+    insert_questions(db, questions)
+    db.close()
+
+    owner = {}
+    for index in range(processes):
+        for shard_id in shard_ids_for_process(index, processes, shards):
+            owner[shard_id] = index
+
+    inboxes = [multiprocessing.Queue() for _ in range(processes)]
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=shard_worker, args=(db_path, events_dir, inbox, results))
+               for inbox in inboxes]
+    for worker in workers:
+        worker.start()
+    # Time shard throughput, not interpreter start-up and imports
+    for _ in workers:
+        results.get()
+
+    started = time.perf_counter()
+    for event in generate_events(events, guilds, users_per_guild):
+        shard_id = shard_for_guild(event['guild_id'], shards)
+        inboxes[owner[shard_id]].put(event)
+    for inbox in inboxes:
+        inbox.put(None)
+    reports = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'processes': processes,
+        'shards': shards,
+        'events': events,
+        'elapsed_seconds': round(elapsed, 3),
+        'events_per_second': round(events / elapsed, 1),
+        # Every shard appends to one log; offsets must come out dense with no collisions
+        'answers_logged': EventLog(events_dir).end_offset(),
+        'per_process': reports
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the sharded bot runtime")
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--shards', type=int, default=16)
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--guilds', type=int, default=500)
+    parser.add_argument('--users-per-guild', type=int, default=20)
+    parser.add_argument('--questions', type=int, default=3000)
+    parser.add_argument('--database-url', help="Database file or postgresql:// URL (defaults to a temporary SQLite file)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.database_url or os.path.join(tmp, 'sat_prep_bench.db')
+        result = run(args.processes, args.shards, args.events, args.guilds,
+                     args.users_per_guild, args.questions, db_path, os.path.join(tmp, 'events'))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Concurrent load on the question generation path with a stub LLM backend.
+
+    python -m benchmarks.generation --threads 16 --requests 400 --latency-ms 800 --error-rate 0.02
+
+Runs SATPrep.generate_new_question from a thread pool, the way the bot's
+worker threads and Streamlit sessions call it, against a deterministic
+local backend. No network access is needed and the same seed gives the
+same run.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_generator import AIQuestionGenerator
+from backends import StubGenerationBackend, StubTranslationBackend
+from response_cache import ResponseCache
+from sat_utils import SATPrep
+from storage import create_storage
+from benchmarks.run import percentile
+from benchmarks.synthetic import SECTIONS, insert_questions
+
+
+def run(db_path, threads, requests, latency, jitter, tokens_per_second, error_rate, seed=0,
+        database_url=None):
+    db = create_storage(database_url or db_path)
+    insert_questions(db, 100, seed)
+    backend = StubGenerationBackend(latency=latency, jitter=jitter,
+                                    tokens_per_second=tokens_per_second,
+                                    error_rate=error_rate, seed=seed)
+    cache = ResponseCache(f"{db_path}.llm_cache")
+    sat = SATPrep(db=db, ai_generator=AIQuestionGenerator(backend=backend, cache=cache),
+                  translator=StubTranslationBackend(seed=seed))
+
+    def one(i):
+        started = time.perf_counter()
+        question = sat.generate_new_question(SECTIONS[i % len(SECTIONS)], 1 + i % 3, f"topic {i % 50}")
+        return time.perf_counter() - started, question is not None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        outcomes = list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+    sat.close()
+
+    latencies = sorted(latency for latency, _ in outcomes)
+    return {
+        'threads': threads,
+        'requests': requests,
+        'backend_calls': backend.calls,
+        'failed': sum(1 for _, ok in outcomes if not ok),
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(requests / elapsed, 2),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 2),
+            'p90': round(percentile(latencies, 0.90) * 1000, 2),
+            'p99': round(percentile(latencies, 0.99) * 1000, 2),
+            'max': round(latencies[-1] * 1000, 2)
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent generation-path benchmark")
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=500)
+    parser.add_argument('--jitter-ms', type=float, default=200)
+    parser.add_argument('--tokens-per-second', type=float, default=None)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--database-url', help="Database to use instead of a temporary SQLite file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        result = run(os.path.join(tmp, 'generation_bench.db'), args.threads, args.requests,
+                     args.latency_ms / 1000, args.jitter_ms / 1000, args.tokens_per_second,
+                     args.error_rate, args.seed, args.database_url)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
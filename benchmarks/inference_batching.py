@@ -0,0 +1,104 @@
+"""Throughput and tail latency of the shared inference worker with and without micro-batching.
+
+    python -m benchmarks.inference_batching --clients 32 --requests 2000
+
+Starts the worker with the stub model (a fixed per-batch cost plus a small
+per-item cost) in a separate process, once with --max-batch 1 and once with
+batching enabled, and drives it from concurrent client threads.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import secrets
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Client
+
+from inference_worker import InferenceClient, InferenceWorker, StubNLPHandler
+from benchmarks.run import percentile
+
+
+def _serve(address, authkey, max_batch, max_wait, per_batch, per_item):
+    InferenceWorker(StubNLPHandler(per_batch, per_item), address, authkey=authkey,
+                    max_batch=max_batch, max_wait=max_wait).serve_forever()
+
+
+def _wait_until_listening(address, authkey, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            Client(address, authkey=authkey).close()
+            return
+        except (ConnectionRefusedError, FileNotFoundError):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def run(address, clients, requests, max_batch, max_wait, per_batch, per_item):
+    # A fresh key per run, handed to the worker and the client directly
+    authkey = secrets.token_bytes(32)
+    worker = multiprocessing.Process(
+        target=_serve, args=(address, authkey, max_batch, max_wait, per_batch, per_item), daemon=True)
+    worker.start()
+    try:
+        _wait_until_listening(address, authkey)
+        client = InferenceClient(address, authkey=authkey, timeout=120)
+        latencies = []
+
+        def one(i):
+            started = time.perf_counter()
+            client.generate_explanation(f"concept {i}")
+            latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            list(pool.map(one, range(requests)))
+        elapsed = time.perf_counter() - started
+        stats = client.stats()
+        client.close()
+    finally:
+        worker.terminate()
+        worker.join()
+
+    latencies.sort()
+    return {
+        'max_batch': max_batch,
+        'max_wait_ms': max_wait * 1000,
+        'requests_per_second': round(requests / elapsed, 1),
+        'mean_batch_size': stats['mean_batch_size'],
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 2),
+            'p90': round(percentile(latencies, 0.90) * 1000, 2),
+            'p99': round(percentile(latencies, 0.99) * 1000, 2),
+            'max': round(latencies[-1] * 1000, 2)
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference worker batching benchmark")
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--max-batch', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=5)
+    parser.add_argument('--per-batch-ms', type=float, default=20, help="Stub model cost per batch")
+    parser.add_argument('--per-item-ms', type=float, default=2, help="Stub model cost per request in a batch")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        common = (args.clients, args.requests)
+        model = (args.per_batch_ms / 1000, args.per_item_ms / 1000)
+        report = {
+            'clients': args.clients,
+            'requests': args.requests,
+            'batching_off': run(os.path.join(tmp, 'off.sock'), *common, 1, 0, *model),
+            'batching_on': run(os.path.join(tmp, 'on.sock'), *common, args.max_batch, args.max_wait_ms / 1000, *model)
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
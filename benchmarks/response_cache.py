@@ -0,0 +1,64 @@
+"""Effect of the LLM response cache on repeated concept explanations.
+
+    python -m benchmarks.response_cache --requests 2000 --concepts 200 --latency-ms 300
+
+Issues explain_concept requests whose concepts follow a Zipf-like
+popularity curve against a stub backend, once with the cache and once
+without. Reports hit rate, saved tokens and the latency difference.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from ai_generator import AIQuestionGenerator
+from backends import StubGenerationBackend
+from response_cache import ResponseCache
+from benchmarks.run import percentile
+
+
+def drive(generator, concepts, requests, seed):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(concepts))]
+    latencies = []
+    for concept in rng.choices(concepts, weights=weights, k=requests):
+        started = time.perf_counter()
+        generator.explain_concept(concept)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return {
+        'seconds': round(sum(latencies), 3),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM response cache benchmark")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concepts', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=300)
+    parser.add_argument('--max-mb', type=float, default=64)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    concepts = [f"concept {i}" for i in range(args.concepts)]
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(os.path.join(tmp, 'llm_cache.db'), max_bytes=int(args.max_mb * 1024 * 1024))
+        cached = AIQuestionGenerator(
+            backend=StubGenerationBackend(latency=args.latency_ms / 1000, seed=args.seed), cache=cache)
+        with_cache = drive(cached, concepts, args.requests, args.seed)
+        with_cache['cache'] = cache.stats()
+        cache.close()
+
+    uncached = AIQuestionGenerator(
+        backend=StubGenerationBackend(latency=args.latency_ms / 1000, seed=args.seed), cache=False)
+    without_cache = drive(uncached, concepts, args.requests, args.seed)
+
+    print(json.dumps({'with_cache': with_cache, 'without_cache': without_cache}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""End-to-end benchmark of the storage backend and SATPrep on a synthetic bank.
+
+    python -m benchmarks.run --questions 100000 --users 5000 --answers 2000000 --out results.json
+
+Builds (or reuses, with --database-url) a synthetic database, SQLite by
+default or PostgreSQL for a postgresql:// URL, drives the main SATPrep
+operations with the network-free stub backends and reports throughput and
+latency percentiles per operation as JSON so runs can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from storage import create_storage, is_postgres_url
+from sat_utils import SATPrep
+from benchmarks.synthetic import SECTIONS, build_database
+from ai_generator import AIQuestionGenerator
+from event_log import EventLog
+from backends import StubGenerationBackend, StubTranslationBackend
+from response_cache import ResponseCache
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def measure(call, iterations):
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        call_started = time.perf_counter()
+        call(i)
+        latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'seconds': round(elapsed, 4),
+        'ops_per_second': round(iterations / elapsed, 1) if elapsed else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies) * 1000, 4),
+            'p50': round(percentile(latencies, 0.50) * 1000, 4),
+            'p90': round(percentile(latencies, 0.90) * 1000, 4),
+            'p99': round(percentile(latencies, 0.99) * 1000, 4),
+            'max': round(latencies[-1] * 1000, 4)
+        }
+    }
+
+
+def operations(sat, discord_ids, question_count, seed=0):
+    rng = random.Random(seed)
+    user_keys = {discord_id: sat.db.get_user_id(discord_id) for discord_id in discord_ids}
+
+    def user():
+        return rng.choice(discord_ids)
+
+    return {
+        'get_pyq': lambda i: sat.get_pyq(rng.choice(SECTIONS), rng.choice([None, 1, 2, 3]), user()),
+        'get_adaptive_question': lambda i: sat.get_adaptive_question(user(), rng.choice(SECTIONS)),
+        'get_user_stats': lambda i: sat.get_user_stats(user()),
+        'get_weak_areas': lambda i: sat.db.get_weak_areas(user_keys[user()]),
+        'record_user_answer': lambda i: sat.record_user_answer(
+            user(), 'bench', rng.randint(1, question_count), rng.random() < 0.6, 20),
+        'generate_new_question': lambda i: sat.generate_new_question(rng.choice(SECTIONS), 2)
+    }
+
+
+def run(database_url, questions, users, answers, iterations, only=None, seed=0, llm_latency=0.0,
+        cache_path=None, events_dir=None):
+    db = create_storage(database_url)
+    build_started = time.perf_counter()
+    if db.count_questions() == 0:
+        discord_ids = build_database(db, questions, users, answers, seed)
+    else:
+        discord_ids = db.find_discord_ids('bench-user-')
+        questions = db.count_questions()
+    build_seconds = time.perf_counter() - build_started
+
+    sat = SATPrep(
+        db=db,
+        ai_generator=AIQuestionGenerator(
+            backend=StubGenerationBackend(latency=llm_latency, seed=seed),
+            cache=ResponseCache(cache_path) if cache_path else False
+        ),
+        translator=StubTranslationBackend(seed=seed),
+        events=EventLog(events_dir) if events_dir else False
+    )
+    results = {}
+    for name, call in operations(sat, discord_ids, questions, seed).items():
+        if only and name not in only:
+            continue
+        results[name] = measure(call, iterations)
+    sat.close()
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'storage': 'postgresql' if is_postgres_url(database_url) else f"sqlite {sqlite3.sqlite_version}",
+            'machine': platform.machine()
+        },
+        'dataset': {
+            'questions': questions,
+            'users': len(discord_ids),
+            'answers': answers,
+            'build_seconds': round(build_seconds, 2)
+        },
+        'llm_latency_ms': llm_latency * 1000,
+        'operations': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end SATPrep benchmark")
+    parser.add_argument('--questions', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--answers', type=int, default=2000000)
+    parser.add_argument('--iterations', type=int, default=1000)
+    parser.add_argument('--only', nargs='*', help="Run only these operations")
+    parser.add_argument('--database-url', help="Database file or postgresql:// URL to build or reuse (defaults to a temporary SQLite file)")
+    parser.add_argument('--out', help="Write the JSON report here as well as to stdout")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--llm-latency-ms', type=float, default=0,
+                        help="Latency of the stub LLM backend per call")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Scratch files (response cache, event log) stay in the temporary directory
+        # even when --database-url points at a database the caller keeps
+        report = run(args.database_url or os.path.join(tmp, 'sat_prep_bench.db'), args.questions,
+                     args.users, args.answers, args.iterations, args.only, args.seed,
+                     args.llm_latency_ms / 1000, os.path.join(tmp, 'llm_cache.db'),
+                     os.path.join(tmp, 'events'))
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(output)
+
+
+if __name__ == '__main__':
+    main()
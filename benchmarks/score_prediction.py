@@ -0,0 +1,58 @@
+"""Score prediction throughput: one-at-a-time versus batched cohort scoring.
+
+    python -m benchmarks.score_prediction --users 20000 --answers 1000000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from storage import create_storage
+from score_prediction import ScorePredictor
+from benchmarks.run import measure
+from benchmarks.synthetic import build_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score prediction benchmark")
+    parser.add_argument('--questions', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--answers', type=int, default=1000000)
+    parser.add_argument('--single', type=int, default=1000, help="Users scored one at a time")
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--database-url', help="Empty database to fill (defaults to a temporary SQLite file)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = create_storage(args.database_url or os.path.join(tmp, 'score_bench.db'))
+        build_database(db, args.questions, args.users, args.answers, args.seed)
+        predictor = ScorePredictor(db)
+        user_ids = db.get_user_ids_after(0, args.users)
+
+        single = measure(lambda i: predictor.predict_many([rng.choice(user_ids)]), args.single)
+        started = time.perf_counter()
+        predictor.predict_many(user_ids)
+        cohort_seconds = time.perf_counter() - started
+        precompute = predictor.precompute(args.batch_size)
+        cached = measure(lambda i: predictor.get_prediction(rng.choice(user_ids)), args.single)
+        db.close()
+
+    print(json.dumps({
+        'users': args.users,
+        'answers': args.answers,
+        'single_user': dict(single, users_per_second=single['ops_per_second']),
+        'cohort_one_pass': {
+            'seconds': round(cohort_seconds, 3),
+            'users_per_second': round(len(user_ids) / cohort_seconds, 1)
+        },
+        'precompute': precompute,
+        'cached_dashboard_read': cached
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Full-text search latency on a large question bank.
+
+    python -m benchmarks.search --questions 100000 --queries 2000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from storage import create_storage
+from benchmarks.run import measure
+from benchmarks.synthetic import SECTIONS, TOPICS, _AR_WORDS, _EN_WORDS, insert_questions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Question search benchmark")
+    parser.add_argument('--questions', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--database-url', help="Empty database to fill (defaults to a temporary SQLite file)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = create_storage(args.database_url or os.path.join(tmp, 'search_bench.db'))
+        started = time.perf_counter()
+        insert_questions(db, args.questions, args.seed)
+        build_seconds = time.perf_counter() - started
+
+        report = {
+            'questions': args.questions,
+            'build_seconds_with_index': round(build_seconds, 2),
+            'english_keywords': measure(
+                lambda i: db.search_questions(' '.join(rng.sample(_EN_WORDS, 2))), args.queries),
+            'arabic_keywords': measure(
+                lambda i: db.search_questions(rng.choice(_AR_WORDS)), args.queries),
+            'topic_filtered': measure(
+                lambda i: db.search_questions(rng.choice(TOPICS), rng.choice(SECTIONS), rng.randint(1, 3)),
+                args.queries)
+        }
+        db.close()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
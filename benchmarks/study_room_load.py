@@ -0,0 +1,81 @@
+"""Load test of a study room: many members answering one shared question.
+
+    python -m benchmarks.study_room_load --members 200 --spread 5
+
+Members answer at random times within ``--spread`` seconds. Scoreboard
+publishes go to a fake Discord edit that takes ``--edit-latency-ms``; the
+report shows how many edits the room issued (versus one per answer without
+coalescing), the smallest gap between them and the cost of recording an
+answer.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from study_rooms import RoomEngine
+from benchmarks.run import percentile
+
+
+async def simulate(args):
+    edits = []
+
+    async def publish(room, snapshot, final):
+        edits.append((time.monotonic(), snapshot['answered'], final))
+        await asyncio.sleep(args.edit_latency_ms / 1000)
+
+    engine = RoomEngine(publish, edit_interval=args.edit_interval, time_limit=args.spread + 5,
+                        max_members=args.members + 1)
+    rng = random.Random(args.seed)
+    room = engine.create(0, 1)
+    for user_id in range(1, args.members):
+        engine.join(room.id, user_id)
+
+    engine.start_round(room, {'question_id': 1, 'options_en': ['a', 'b', 'c', 'd'], 'correct_index': 2, 'section': 'math'})
+    latencies = []
+
+    async def member(user_id):
+        await asyncio.sleep(rng.uniform(0, args.spread))
+        started = time.perf_counter()
+        engine.answer(room, user_id, rng.choice([0, 1, 2, 2, 3]))
+        latencies.append(time.perf_counter() - started)
+
+    started = time.monotonic()
+    round_task = asyncio.create_task(engine.wait_round(room))
+    await asyncio.gather(*(member(user_id) for user_id in range(args.members)))
+    snapshot = await round_task
+    elapsed = time.monotonic() - started
+    engine.close(room)
+
+    gaps = [later[0] - earlier[0] for earlier, later in zip(edits, edits[1:]) if not later[2]]
+    latencies.sort()
+    return {
+        'members': args.members,
+        'answered': snapshot['answered'],
+        'round_seconds': round(elapsed, 2),
+        'scoreboard_edits': len(edits),
+        'edits_without_coalescing': args.members,
+        'min_seconds_between_live_edits': round(min(gaps), 3) if gaps else None,
+        'answer_us': {
+            'p50': round(percentile(latencies, 0.50) * 1e6, 2),
+            'p99': round(percentile(latencies, 0.99) * 1e6, 2),
+            'max': round(latencies[-1] * 1e6, 2)
+        },
+        'leader': snapshot['leaders'][0] if snapshot['leaders'] else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Study room load test")
+    parser.add_argument('--members', type=int, default=200)
+    parser.add_argument('--spread', type=float, default=5, help="Seconds over which members answer")
+    parser.add_argument('--edit-interval', type=float, default=1.5)
+    parser.add_argument('--edit-latency-ms', type=float, default=80)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(simulate(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
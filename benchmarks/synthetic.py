@@ -0,0 +1,120 @@
+"""Synthetic question banks and answer histories at realistic scale."""
+import random
+from datetime import datetime, timedelta, timezone
+
+SECTIONS = ['math', 'reading', 'writing']
+
+TOPICS = ['algebra', 'geometry', 'statistics', 'probability', 'grammar', 'punctuation',
+          'vocabulary', 'inference', 'main idea', 'linear equations', 'ratios', 'poetry']
+
+_EN_SEED_WORDS = ['equation', 'passage', 'author', 'value', 'graph', 'sentence', 'argument',
+                  'ratio', 'evidence', 'function', 'claim', 'triangle', 'paragraph', 'slope']
+_AR_SEED_WORDS = ['معادلة', 'فقرة', 'المؤلف', 'قيمة', 'رسم', 'جملة', 'حجة',
+                  'نسبة', 'دليل', 'دالة', 'ادعاء', 'مثلث', 'مقطع', 'ميل']
+
+
+def _vocabulary(seed_words, syllables, size, seed):
+    """Seed words plus made-up ones, so word frequencies follow a Zipf-like curve like real text"""
+    rng = random.Random(seed)
+    words = list(seed_words)
+    seen = set(words)
+    while len(words) < size:
+        word = ''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+_EN_WORDS = _vocabulary(_EN_SEED_WORDS, ['ba', 'ko', 'ri', 'sen', 'tal', 'mo', 'ver', 'di', 'lu', 'ex',
+                                         'pra', 'gon', 'ti', 'mes', 'ul', 'cat'], 5000, 1)
+_AR_WORDS = _vocabulary(_AR_SEED_WORDS, ['كا', 'لم', 'سي', 'ر', 'تو', 'با', 'مي', 'ند', 'فا', 'ق',
+                                         'حو', 'ع', 'شر', 'ب', 'ل', 'ة'], 5000, 2)
+_WEIGHTS = [1 / (rank + 1) for rank in range(5000)]
+_CUMULATIVE = []
+for _weight in _WEIGHTS:
+    _CUMULATIVE.append(_weight + (_CUMULATIVE[-1] if _CUMULATIVE else 0))
+
+
+def _text(rng, words, length):
+    return ' '.join(rng.choices(words, cum_weights=_CUMULATIVE[:len(words)], k=length))
+
+
+def generate_questions(count, seed=0):
+    """Yield question rows in SATDatabase.add_question column order"""
+    rng = random.Random(seed)
+    for i in range(count):
+        section = SECTIONS[i % len(SECTIONS)]
+        options_en = [f"{chr(65 + j)}) {_text(rng, _EN_WORDS, 3)} {i}" for j in range(4)]
+        options_ar = [f"{chr(0x0623 + j)}) {_text(rng, _AR_WORDS, 3)} {i}" for j in range(4)]
+        yield (
+            section,
+            f"Question {i}: {_text(rng, _EN_WORDS, 12)}?",
+            f"السؤال {i}: {_text(rng, _AR_WORDS, 12)}؟",
+            options_en,
+            options_ar,
+            options_en[rng.randrange(4)],
+            _text(rng, _EN_WORDS, 25),
+            _text(rng, _AR_WORDS, 25),
+            rng.randint(1, 3),
+            rng.choice(TOPICS)
+        )
+
+
+QUESTION_FIELDS = ['section', 'question_en', 'question_ar', 'options_en', 'options_ar',
+                   'answer', 'explanation_en', 'explanation_ar', 'difficulty', 'topic']
+
+
+def insert_questions(db, count, seed=0, batch_size=10000):
+    batch = []
+    for row in generate_questions(count, seed):
+        batch.append(dict(zip(QUESTION_FIELDS, row)))
+        if len(batch) >= batch_size:
+            db.upsert_questions(batch)
+            batch = []
+    if batch:
+        db.upsert_questions(batch)
+
+
+def insert_users(db, count):
+    """Create users bench-user-0..count-1; returns their discord ids"""
+    discord_ids = [f"bench-user-{i}" for i in range(count)]
+    db.add_users(discord_ids)
+    return discord_ids
+
+
+def insert_history(db, answers, question_count, seed=0, days=180, batch_size=50000):
+    """Spread ``answers`` user_progress rows over every user and the last ``days`` days.
+
+    Users get a skewed share of the history (a few very active students, a long
+    tail of light ones) and a per-user skill level that drives accuracy.
+    """
+    rng = random.Random(seed)
+    user_ids = db.get_user_ids_after(0, 1 << 62)
+    skill = {user_id: rng.uniform(0.3, 0.95) for user_id in user_ids}
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(len(user_ids))]
+    # UTC, like the CURRENT_TIMESTAMP default of live rows
+    start = datetime.now(timezone.utc) - timedelta(days=days)
+    span = days * 86400
+
+    rows = []
+    for user_id in rng.choices(user_ids, weights=weights, k=answers):
+        rows.append((
+            user_id,
+            rng.randint(1, question_count),
+            rng.random() < skill[user_id],
+            round(rng.lognormvariate(3, 0.5), 2),
+            (start + timedelta(seconds=rng.randrange(span))).strftime('%Y-%m-%d %H:%M:%S')
+        ))
+        if len(rows) >= batch_size:
+            db.add_progress_rows(rows)
+            rows = []
+    if rows:
+        db.add_progress_rows(rows)
+
+
+def build_database(db, questions, users, answers, seed=0):
+    insert_questions(db, questions, seed)
+    discord_ids = insert_users(db, users)
+    insert_history(db, answers, questions, seed)
+    return discord_ids
@@ -0,0 +1,64 @@
+"""Memory footprint of the question view registry over many issued questions.
+
+Run with ``python -m benchmarks.view_memory --questions 100000``. Prints the
+traced memory held by the registry at regular checkpoints; a bounded registry
+shows a flat line once the global cap is reached.
+"""
+import argparse
+import json
+import random
+import tracemalloc
+
+from view_registry import ViewRegistry
+
+
+class FakeView:
+    """Stands in for a discord.ui.View: four buttons' worth of state and a stop()"""
+
+    def __init__(self):
+        self.children = [object() for _ in range(4)]
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+
+def run(questions, users, max_per_user, max_total, checkpoints, seed=0):
+    rng = random.Random(seed)
+    registry = ViewRegistry(max_per_user=max_per_user, max_total=max_total,
+                            on_evict=lambda entry, view: view.stop())
+    step = max(1, questions // checkpoints)
+    samples = []
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for i in range(1, questions + 1):
+        user_id = rng.randrange(users)
+        token = registry.register(user_id, rng.randrange(1, 100000), rng.randrange(4),
+                                  'math', 'pyq', view=FakeView())
+        # Roughly half of the questions get answered, the rest time out or get evicted
+        if rng.random() < 0.5:
+            registry.release(token)
+        if i % step == 0:
+            current = tracemalloc.get_traced_memory()[0] - baseline
+            samples.append({'issued': i, 'live_views': len(registry), 'bytes': current})
+    tracemalloc.stop()
+
+    return {'samples': samples, 'registry': registry.stats()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--questions', type=int, default=100000)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--max-per-user', type=int, default=3)
+    parser.add_argument('--max-total', type=int, default=1000)
+    parser.add_argument('--checkpoints', type=int, default=10)
+    args = parser.parse_args()
+
+    result = run(args.questions, args.users, args.max_per_user, args.max_total, args.checkpoints)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,68 @@
 import sqlite3
+import hashlib
 import json
+import os
+import threading
 from datetime import datetime
+from metrics import timed
+from seen_set import or_bytes, split_chunks
+from storage import StorageBackend, database_url
 
-class SATDatabase:
-    def __init__(self):
-        self.conn = sqlite3.connect('sat_prep.db')
+# Must match the partial index predicate exactly for SQLite to use the index
+MISSING_ARABIC = "(question_ar IS NULL OR question_ar = '' OR options_ar IS NULL OR options_ar = '[]' OR explanation_ar IS NULL OR explanation_ar = '')"
+
+def database_path(url=None):
+    """Resolve a sqlite:/// URL (DATABASE_URL by default) or a plain file path to a file path"""
+    url = url or database_url()
+    if url.startswith('sqlite:///'):
+        return url[len('sqlite:///'):]
+    if '://' in url:
+        raise ValueError(f"Not a SQLite database URL: {url}")
+    return url
+
+# Columns served to the bot and app; passage text is fetched separately by passage_id
+QUESTION_COLUMNS = "id, section, question_en, question_ar, options_en, options_ar, answer, explanation_en, explanation_ar, difficulty, passage_id, topic"
+
+FTS_COLUMNS = "question_en, question_ar, explanation_en, explanation_ar, topic"
+
+def fts_query(text):
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix"""
+    terms = ['"' + term.replace('"', '""') + '"' for term in text.split()]
+    if terms:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+def passage_hash(passage_en):
+    return hashlib.sha256(passage_en.strip().encode('utf-8')).hexdigest()
+
+def question_hash(section, question_en, options_en):
+    """Stable identity of a question, used to upsert imported banks"""
+    payload = json.dumps([section, question_en, options_en], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class SATDatabase(StorageBackend):
+    def __init__(self, path=None):
+        # Several bot shards (processes) and worker threads share one database file,
+        # so every thread gets its own connection and the file runs in WAL mode.
+        self.path = path or database_path()
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
         self.create_tables()
     
+    @property
+    def conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
     def create_tables(self):
         cursor = self.conn.cursor()
         
@@ -65,36 +121,456 @@ class SATDatabase:
         )
         ''')
         
+        # Reading passages, shared by every question that quotes them
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS passages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content_hash TEXT UNIQUE,
+            passage_en TEXT,
+            passage_ar TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        
+        self._ensure_column(cursor, 'questions', 'passage_id', 'INTEGER REFERENCES passages (id)')
+        self._ensure_column(cursor, 'questions', 'content_hash', 'TEXT')
+        self._ensure_column(cursor, 'questions', 'topic', 'TEXT')
+        self._backfill_content_hashes(cursor)
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_questions_content_hash ON questions (content_hash)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_questions_section_difficulty ON questions (section, difficulty)")
+        
+        self._create_search_index(cursor)
+        
+        # Spaced-repetition state per (user, question); due_at is epoch seconds
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS review_state (
+            user_id INTEGER,
+            question_id INTEGER,
+            ease REAL,
+            interval_days REAL,
+            repetitions INTEGER,
+            lapses INTEGER,
+            due_at REAL,
+            last_reviewed_at REAL,
+            PRIMARY KEY (user_id, question_id),
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (question_id) REFERENCES questions (id)
+        ) WITHOUT ROWID
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_review_state_due ON review_state (user_id, due_at)")
+        
+        # Bitmap of question ids each user has answered, in 512-byte chunks (see seen_set.py)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_seen_chunks (
+            user_id INTEGER,
+            chunk INTEGER,
+            bits BLOB,
+            updated_at TIMESTAMP,
+            PRIMARY KEY (user_id, chunk),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        ''')
+        self._migrate_seen_bitmaps(cursor)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_progress_user ON user_progress (user_id, question_id)")
+        
+        # Learner profiles, keyed by Discord id or Streamlit session id; list fields are JSON
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS learner_profiles (
+            user_key TEXT PRIMARY KEY,
+            strengths TEXT,
+            weaknesses TEXT,
+            preferences TEXT,
+            learning_style TEXT,
+            pace TEXT,
+            goals TEXT,
+            updated_at TIMESTAMP
+        )
+        ''')
+        
+        # Latest SAT score forecast per user (see score_prediction.py)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS score_predictions (
+            user_id INTEGER PRIMARY KEY,
+            math INTEGER,
+            reading_writing INTEGER,
+            total INTEGER,
+            answers INTEGER,
+            predicted_at REAL,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        ''')
+        
+        # Answers older than the compaction horizon, rolled up per user, section and UTC day
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS progress_daily_summary (
+            user_id INTEGER,
+            section TEXT,
+            day TEXT,
+            answered INTEGER,
+            correct INTEGER,
+            seconds REAL,
+            difficulty_total INTEGER,
+            correct_difficulty INTEGER,
+            PRIMARY KEY (user_id, section, day)
+        ) WITHOUT ROWID
+        ''')
+        
+        # Progress of resumable maintenance jobs
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS job_checkpoints (
+            job TEXT PRIMARY KEY,
+            last_id INTEGER,
+            updated_at TIMESTAMP
+        )
+        ''')
+        
+        # Questions still waiting for an Arabic translation
+        cursor.execute(f'''
+        CREATE INDEX IF NOT EXISTS idx_questions_missing_arabic
+        ON questions (id) WHERE {MISSING_ARABIC}
+        ''')
+        
         self.conn.commit()
     
+    def _migrate_seen_bitmaps(self, cursor):
+        """Split whole-user bitmaps from the old user_seen table into chunk rows"""
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'user_seen'")
+        if cursor.fetchone() is None:
+            return
+        cursor.execute("SELECT user_id, bitmap, updated_at FROM user_seen")
+        cursor.executemany('''
+        INSERT OR IGNORE INTO user_seen_chunks (user_id, chunk, bits, updated_at) VALUES (?, ?, ?, ?)
+        ''', [
+            (user_id, chunk, data, updated_at)
+            for user_id, bitmap, updated_at in cursor.fetchall()
+            for chunk, data in (split_chunks(bitmap or b'') or {0: b''}).items()
+        ])
+        cursor.execute("DROP TABLE user_seen")
+    
+    def _ensure_column(self, cursor, table, column, declaration):
+        """Add a column that older databases were created without"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+    
+    def _create_search_index(self, cursor):
+        """Full-text index over question text, kept in sync with the questions table by triggers"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'questions_fts'")
+        exists = cursor.fetchone() is not None
+        cursor.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+            {FTS_COLUMNS},
+            content='questions', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        ''')
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS questions_fts_insert AFTER INSERT ON questions BEGIN
+            INSERT INTO questions_fts (rowid, {FTS_COLUMNS})
+            VALUES (new.id, new.question_en, new.question_ar, new.explanation_en, new.explanation_ar, new.topic);
+        END
+        ''')
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS questions_fts_delete AFTER DELETE ON questions BEGIN
+            INSERT INTO questions_fts (questions_fts, rowid, {FTS_COLUMNS})
+            VALUES ('delete', old.id, old.question_en, old.question_ar, old.explanation_en, old.explanation_ar, old.topic);
+        END
+        ''')
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS questions_fts_update AFTER UPDATE OF {FTS_COLUMNS} ON questions BEGIN
+            INSERT INTO questions_fts (questions_fts, rowid, {FTS_COLUMNS})
+            VALUES ('delete', old.id, old.question_en, old.question_ar, old.explanation_en, old.explanation_ar, old.topic);
+            INSERT INTO questions_fts (rowid, {FTS_COLUMNS})
+            VALUES (new.id, new.question_en, new.question_ar, new.explanation_en, new.explanation_ar, new.topic);
+        END
+        ''')
+        if not exists:
+            # Index the questions that were already in the bank
+            cursor.execute("INSERT INTO questions_fts (questions_fts) VALUES ('rebuild')")
+    
+    def _backfill_content_hashes(self, cursor):
+        cursor.execute("SELECT id, section, question_en, options_en FROM questions WHERE content_hash IS NULL")
+        rows = cursor.fetchall()
+        seen = set()
+        updates = []
+        for question_id, section, question_en, options_en in rows:
+            content_hash = question_hash(section, question_en, json.loads(options_en or '[]'))
+            # Exact duplicates already in the bank keep a NULL hash rather than break the unique index
+            if content_hash not in seen:
+                seen.add(content_hash)
+                updates.append((content_hash, question_id))
+        cursor.executemany("UPDATE questions SET content_hash = ? WHERE id = ?", updates)
+    
+    @timed('sat_db_query_seconds', 'query')
+    def get_user_id(self, discord_id):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT id FROM users WHERE discord_id = ?", (discord_id,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    
+    @timed('sat_db_query_seconds', 'query')
     def add_user(self, discord_id, username):
         cursor = self.conn.cursor()
-        try:
+        # Commit either way: an open write transaction would hold the lock every shard writes through
+        cursor.execute(
+            "INSERT INTO users (discord_id, username) VALUES (?, ?) ON CONFLICT(discord_id) DO NOTHING",
+            (discord_id, username)
+        )
+        self.conn.commit()
+        if cursor.rowcount == 1:
+            return cursor.lastrowid
+        cursor.execute(
+            "SELECT id FROM users WHERE discord_id = ?",
+            (discord_id,)
+        )
+        return cursor.fetchone()[0]
+    
+    @timed('sat_db_query_seconds', 'query')
+    def add_users(self, discord_ids):
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO users (discord_id, username) VALUES (?, ?)",
+            [(discord_id, discord_id) for discord_id in discord_ids]
+        )
+        self.conn.commit()
+    
+    @timed('sat_db_query_seconds', 'query')
+    def get_discord_ids(self, user_ids):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT id, discord_id FROM users WHERE id IN ({','.join('?' * len(user_ids))})", user_ids)
+        return dict(cursor.fetchall())
+    
+    @timed('sat_db_query_seconds', 'query')
+    def find_discord_ids(self, prefix):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT discord_id FROM users WHERE substr(discord_id, 1, ?) = ? ORDER BY id",
+                       (len(prefix), prefix))
+        return [row[0] for row in cursor.fetchall()]
+    
+    @timed('sat_db_query_seconds', 'query')
+    def count_questions(self):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM questions")
+        return cursor.fetchone()[0]
+    
+    @timed('sat_db_query_seconds', 'query')
+    def add_passage(self, passage_en, passage_ar=''):
+        """Store a passage once per distinct English text and return its id"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        INSERT INTO passages (content_hash, passage_en, passage_ar) VALUES (?, ?, ?)
+        ON CONFLICT(content_hash) DO UPDATE SET passage_ar = excluded.passage_ar
+        WHERE COALESCE(passages.passage_ar, '') = '' AND excluded.passage_ar != ''
+        ''', (passage_hash(passage_en), passage_en, passage_ar or ''))
+        self.conn.commit()
+        cursor.execute("SELECT id FROM passages WHERE content_hash = ?", (passage_hash(passage_en),))
+        return cursor.fetchone()[0]
+    
+    def _passage_ids(self, cursor, passages):
+        """Upsert many (passage_en, passage_ar) pairs and map each English text to its id"""
+        by_hash = {passage_hash(en): (en, ar or '') for en, ar in passages if en}
+        if not by_hash:
+            return {}
+        cursor.executemany('''
+        INSERT INTO passages (content_hash, passage_en, passage_ar) VALUES (?, ?, ?)
+        ON CONFLICT(content_hash) DO UPDATE SET passage_ar = excluded.passage_ar
+        WHERE COALESCE(passages.passage_ar, '') = '' AND excluded.passage_ar != ''
+        ''', [(content_hash, en, ar) for content_hash, (en, ar) in by_hash.items()])
+        ids = {}
+        hashes = list(by_hash)
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
             cursor.execute(
-                "INSERT INTO users (discord_id, username) VALUES (?, ?)",
-                (discord_id, username)
+                f"SELECT content_hash, id FROM passages WHERE content_hash IN ({','.join('?' * len(chunk))})",
+                chunk
             )
+            for content_hash, passage_id in cursor.fetchall():
+                ids[by_hash[content_hash][0]] = passage_id
+        return ids
+    
+    @timed('sat_db_query_seconds', 'query')
+    def get_passage(self, passage_id):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT passage_en, passage_ar FROM passages WHERE id = ?", (passage_id,))
+        return cursor.fetchone()
+    
+    @timed('sat_db_query_seconds', 'query')
+    def add_question(self, section, question_en, question_ar, options_en, options_ar, 
+                    answer, explanation_en, explanation_ar, difficulty,
+                    passage_en=None, passage_ar=None, topic=None):
+        cursor = self.conn.cursor()
+        passage_id = self.add_passage(passage_en, passage_ar) if passage_en else None
+        content_hash = question_hash(section, question_en, options_en)
+        try:
+            cursor.execute('''
+            INSERT INTO questions (section, question_en, question_ar, options_en, options_ar,
+                                   answer, explanation_en, explanation_ar, difficulty, passage_id,
+                                   topic, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (section, question_en, question_ar, json.dumps(options_en), 
+                  json.dumps(options_ar), answer, explanation_en, explanation_ar, difficulty,
+                  passage_id, topic, content_hash))
             self.conn.commit()
             return cursor.lastrowid
         except sqlite3.IntegrityError:
-            cursor.execute(
-                "SELECT id FROM users WHERE discord_id = ?",
-                (discord_id,)
-            )
+            # The same question is already in the bank; commit the passage upsert so no write transaction stays open
+            self.conn.commit()
+            cursor.execute("SELECT id FROM questions WHERE content_hash = ?", (content_hash,))
             return cursor.fetchone()[0]
     
-    def add_question(self, section, question_en, question_ar, options_en, options_ar, 
-                    answer, explanation_en, explanation_ar, difficulty):
+    @timed('sat_db_query_seconds', 'query')
+    def upsert_questions(self, questions):
+        """Insert or update many question dicts in one transaction, matched by content hash"""
         cursor = self.conn.cursor()
-        cursor.execute('''
+        passage_ids = self._passage_ids(cursor, [(q.get('passage_en'), q.get('passage_ar')) for q in questions])
+        cursor.executemany('''
         INSERT INTO questions (section, question_en, question_ar, options_en, options_ar,
-                               answer, explanation_en, explanation_ar, difficulty)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (section, question_en, question_ar, json.dumps(options_en), 
-              json.dumps(options_ar), answer, explanation_en, explanation_ar, difficulty))
+                               answer, explanation_en, explanation_ar, difficulty, passage_id,
+                               topic, content_hash)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(content_hash) DO UPDATE SET
+            question_ar = excluded.question_ar,
+            options_ar = excluded.options_ar,
+            answer = excluded.answer,
+            explanation_en = excluded.explanation_en,
+            explanation_ar = excluded.explanation_ar,
+            difficulty = excluded.difficulty,
+            passage_id = excluded.passage_id,
+            topic = COALESCE(excluded.topic, questions.topic)
+        ''', [(
+            q['section'], q['question_en'], q['question_ar'], json.dumps(q['options_en']),
+            json.dumps(q['options_ar']), q['answer'], q['explanation_en'], q['explanation_ar'],
+            q['difficulty'], passage_ids.get(q.get('passage_en')), q.get('topic'),
+            question_hash(q['section'], q['question_en'], q['options_en'])
+        ) for q in questions])
         self.conn.commit()
-        return cursor.lastrowid
+        return cursor.rowcount
+    
+    @timed('sat_db_query_seconds', 'query')
+    def iter_questions(self, batch_size=5000):
+        """Stream the whole bank as dicts without loading it into memory"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT q.id, q.section, q.question_en, q.question_ar, q.options_en, q.options_ar,
+               q.answer, q.explanation_en, q.explanation_ar, q.difficulty, q.topic,
+               p.passage_en, p.passage_ar
+        FROM questions q
+        LEFT JOIN passages p ON q.passage_id = p.id
+        ORDER BY q.id
+        ''')
+        columns = [desc[0] for desc in cursor.description]
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                question = dict(zip(columns, row))
+                question['options_en'] = json.loads(question['options_en'] or '[]')
+                question['options_ar'] = json.loads(question['options_ar'] or '[]')
+                yield question
     
+    @timed('sat_db_query_seconds', 'query')
+    def get_question(self, question_id):
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT {QUESTION_COLUMNS} FROM questions WHERE id = ?", (question_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        question = dict(zip([desc[0] for desc in cursor.description], row))
+        question['options_en'] = json.loads(question['options_en'] or '[]')
+        question['options_ar'] = json.loads(question['options_ar'] or '[]')
+        return question
+    
+    @timed('sat_db_query_seconds', 'query')
+    def get_question_ids(self, section, difficulty=None):
+        """Ids of every question in a section, read from the (section, difficulty) index"""
+        cursor = self.conn.cursor()
+        if difficulty:
+            cursor.execute("SELECT id FROM questions WHERE section = ? AND difficulty = ?", (section, difficulty))
+        else:
+            cursor.execute("SELECT id FROM questions WHERE section = ?", (section,))
+        return [row[0] for row in cursor.fetchall()]
+    
+    @timed('sat_db_query_seconds', 'query')
+    def search_questions(self, query, section=None, difficulty=None, limit=10):
+        """Rank questions by BM25 over English/Arabic text and topic"""
+        match = fts_query(query)
+        if not match:
+            return []
+        sql = '''
+        SELECT q.id, q.section, q.difficulty, q.topic,
+               snippet(questions_fts, -1, '**', '**', '…', 12) AS snippet,
+               bm25(questions_fts) AS rank
+        FROM questions_fts
+        JOIN questions q ON q.id = questions_fts.rowid
+        WHERE questions_fts MATCH ?
+        '''
+        params = [match]
+        if section:
+            sql += " AND q.section = ?"
+            params.append(section)
+        if difficulty:
+            sql += " AND q.difficulty = ?"
+            params.append(difficulty)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+        cursor = self.conn.cursor()
+        cursor.execute(sql, params)
+        columns = [desc[0] for desc in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    @timed('sat_db_query_seconds', 'query')
+    def get_explanation(self, question_id):
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT explanation_en FROM questions WHERE id = ?",
+            (question_id,)
+        )
+        row = cursor.fetchone()
+        return row[0] if row else ''
+    
+    @timed('sat_db_query_seconds', 'query')
+    def get_questions_missing_arabic(self, after_id, limit):
+        cursor = self.conn.cursor()
+        cursor.execute(f'''
+        SELECT id, question_en, options_en, answer, explanation_en
+        FROM questions
+        WHERE {MISSING_ARABIC} AND id > ?
+        ORDER BY id
+        LIMIT ?
+        ''', (after_id, limit))
+        return [(row[0], row[1], json.loads(row[2] or '[]'), row[3], row[4]) for row in cursor.fetchall()]
+    
+    @timed('sat_db_query_seconds', 'query')
+    def update_arabic_translations(self, rows):
+        """Bulk-write (question_ar, options_ar, explanation_ar, id) rows"""
+        cursor = self.conn.cursor()
+        cursor.executemany(
+            "UPDATE questions SET question_ar = ?, options_ar = ?, explanation_ar = ? WHERE id = ?",
+            [(question_ar, json.dumps(options_ar, ensure_ascii=False), explanation_ar, question_id)
+             for question_ar, options_ar, explanation_ar, question_id in rows]
+        )
+        self.conn.commit()
+    
+    @timed('sat_db_query_seconds', 'query')
+    def get_checkpoint(self, job):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT last_id FROM job_checkpoints WHERE job = ?", (job,))
+        row = cursor.fetchone()
+        return row[0] if row else 0
+    
+    @timed('sat_db_query_seconds', 'query')
+    def save_checkpoint(self, job, last_id):
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        INSERT INTO job_checkpoints (job, last_id, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(job) DO UPDATE SET last_id = excluded.last_id, updated_at = excluded.updated_at
+        ''', (job, last_id, datetime.now()))
+        self.conn.commit()
+    
+    @timed('sat_db_query_seconds', 'query')
     def record_answer(self, user_id, question_id, is_correct, time_taken):
         cursor = self.conn.cursor()
         cursor.execute(
@@ -103,15 +579,286 @@ class SATDatabase:
         )
         self.conn.commit()
     
+    @timed('sat_db_query_seconds', 'query')
+    def add_progress_rows(self, rows):
+        self.conn.executemany(
+            "INSERT INTO user_progress (user_id, question_id, is_correct, time_taken, timestamp) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+        self.conn.commit()
+    
+    @timed('sat_db_query_seconds', 'query')
+    def get_progress_rows_before(self, cutoff, limit):
+        """Oldest answers recorded before ``cutoff`` ('YYYY-MM-DD HH:MM:SS', UTC) with their question's
+        section and difficulty, in id order"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT up.id, up.user_id, up.question_id, up.is_correct, up.time_taken, up.timestamp,
+               COALESCE(q.section, ''), COALESCE(q.difficulty, 0)
+        FROM user_progress up
+        LEFT JOIN questions q ON q.id = up.question_id
+        WHERE up.timestamp < ?
+        ORDER BY up.id
+        LIMIT ?
+        ''', (cutoff, limit))
+        return cursor.fetchall()
+    
+    @timed('sat_db_query_seconds', 'query')
+    def compact_progress(self, summaries, row_ids):
+        """Add (user_id, section, day, answered, correct, seconds, difficulty_total, correct_difficulty)
+        rows to the daily summaries and delete the raw answers they cover, in one transaction"""
+        with self.conn:
+            self.conn.executemany('''
+            INSERT INTO progress_daily_summary
+                (user_id, section, day, answered, correct, seconds, difficulty_total, correct_difficulty)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, section, day) DO UPDATE SET
+                answered = answered + excluded.answered,
+                correct = correct + excluded.correct,
+                seconds = seconds + excluded.seconds,
+                difficulty_total = difficulty_total + excluded.difficulty_total,
+                correct_difficulty = correct_difficulty + excluded.correct_difficulty
+            ''', summaries)
+            self.conn.executemany("DELETE FROM user_progress WHERE id = ?", [(row_id,) for row_id in row_ids])
+    
+    @timed('sat_db_query_seconds', 'query')
+    def get_answered_question_ids(self, user_id):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT DISTINCT question_id FROM user_progress WHERE user_id = ?", (user_id,))
+        return [row[0] for row in cursor.fetchall()]
+    
+    @timed('sat_db_query_seconds', 'query')
+    def get_seen_chunks(self, user_id):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT chunk, bits FROM user_seen_chunks WHERE user_id = ? ORDER BY chunk", (user_id,))
+        return cursor.fetchall()
+    
+    @timed('sat_db_query_seconds', 'query')
+    def merge_seen_chunks(self, user_id, chunks):
+        conn = self.conn
+        # BEGIN IMMEDIATE takes the write lock before reading, so concurrent merges cannot drop bits
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            merged = {}
+            for chunk, data in sorted(chunks.items()):
+                row = conn.execute(
+                    "SELECT bits FROM user_seen_chunks WHERE user_id = ? AND chunk = ?", (user_id, chunk)
+                ).fetchone()
+                merged[chunk] = or_bytes(row[0], data) if row else bytes(data)
+            now = datetime.now()
+            conn.executemany('''
+            INSERT INTO user_seen_chunks (user_id, chunk, bits, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id, chunk) DO UPDATE SET bits = excluded.bits, updated_at = excluded.updated_at
+            ''', [(user_id, chunk, data, now) for chunk, data in merged.items()])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return merged
+    
+    @timed('sat_db_query_seconds', 'query')
+    def get_learner_profile(self, user_key):
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT strengths, weaknesses, preferences, learning_style, pace, goals FROM learner_profiles WHERE user_key = ?",
+            (user_key,)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return {
+            'strengths': json.loads(row[0] or '[]'),
+            'weaknesses': json.loads(row[1] or '[]'),
+            'preferences': json.loads(row[2] or '[]'),
+            'learning_style': row[3],
+            'pace': row[4],
+            'goals': json.loads(row[5] or '[]')
+        }
+    
+    @timed('sat_db_query_seconds', 'query')
+    def save_learner_profiles(self, profiles):
+        """Upsert (user_key, profile dict) pairs in one transaction"""
+        now = datetime.now()
+        cursor = self.conn.cursor()
+        cursor.executemany('''
+        INSERT INTO learner_profiles
+            (user_key, strengths, weaknesses, preferences, learning_style, pace, goals, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(user_key) DO UPDATE SET
+            strengths = excluded.strengths,
+            weaknesses = excluded.weaknesses,
+            preferences = excluded.preferences,
+            learning_style = excluded.learning_style,
+            pace = excluded.pace,
+            goals = excluded.goals,
+            updated_at = excluded.updated_at
+        ''', [(
+            user_key,
+            json.dumps(profile.get('strengths', []), ensure_ascii=False),
+            json.dumps(profile.get('weaknesses', []), ensure_ascii=False),
+            json.dumps(profile.get('preferences', []), ensure_ascii=False),
+            profile.get('learning_style'),
+            profile.get('pace'),
+            json.dumps(profile.get('goals', []), ensure_ascii=False),
+            now
+        ) for user_key, profile in profiles])
+        self.conn.commit()
+    
+    @timed('sat_db_query_seconds', 'query')
+    def get_user_ids_after(self, after_id, limit):
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT id FROM users WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit))
+        return [row[0] for row in cursor.fetchall()]
+    
+    @timed('sat_db_query_seconds', 'query')
+    def get_progress_aggregates(self, user_ids, chunk_size=5000):
+        """(user_id, section index, attempts, correct, difficulty-weighted correct, difficulty sum, seconds)
+        per user and section, raw and compacted history as separate rows; section index follows
+        score_prediction.SECTIONS"""
+        cursor = self.conn.cursor()
+        rows = []
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            cursor.execute(f'''
+            SELECT up.user_id,
+                   CASE q.section WHEN 'math' THEN 0 WHEN 'reading' THEN 1 ELSE 2 END,
+                   COUNT(*),
+                   SUM(up.is_correct),
+                   SUM(up.is_correct * q.difficulty),
+                   SUM(q.difficulty),
+                   SUM(COALESCE(up.time_taken, 0))
+            FROM user_progress up
+            JOIN questions q ON q.id = up.question_id
+            WHERE up.user_id IN ({','.join('?' * len(chunk))})
+            GROUP BY up.user_id, q.section
+            UNION ALL
+            SELECT user_id,
+                   CASE section WHEN 'math' THEN 0 WHEN 'reading' THEN 1 ELSE 2 END,
+                   SUM(answered),
+                   SUM(correct),
+                   SUM(correct_difficulty),
+                   SUM(difficulty_total),
+                   SUM(seconds)
+            FROM progress_daily_summary
+            WHERE user_id IN ({','.join('?' * len(chunk))})
+            GROUP BY user_id, section
+            ''', chunk + chunk)
+            rows.extend(cursor.fetchall())
+        return rows
+    
+    @timed('sat_db_query_seconds', 'query')
+    def get_score_prediction(self, user_id):
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT math, reading_writing, total, answers, predicted_at FROM score_predictions WHERE user_id = ?",
+            (user_id,)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip(['math', 'reading_writing', 'total', 'answers', 'predicted_at'], row))
+    
+    @timed('sat_db_query_seconds', 'query')
+    def save_score_predictions(self, predictions, predicted_at):
+        """Upsert (user_id, prediction dict) pairs in one transaction"""
+        cursor = self.conn.cursor()
+        cursor.executemany('''
+        INSERT OR REPLACE INTO score_predictions
+            (user_id, math, reading_writing, total, answers, predicted_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(user_id, p['math'], p['reading_writing'], p['total'], p['answers'], predicted_at)
+              for user_id, p in predictions])
+        self.conn.commit()
+    
+    @timed('sat_db_query_seconds', 'query')
+    def get_review_state(self, user_id, question_id):
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT ease, interval_days, repetitions, lapses FROM review_state WHERE user_id = ? AND question_id = ?",
+            (user_id, question_id)
+        )
+        return cursor.fetchone()
+    
+    @timed('sat_db_query_seconds', 'query')
+    def save_review_state(self, user_id, question_id, state, due_at, reviewed_at):
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        INSERT OR REPLACE INTO review_state
+            (user_id, question_id, ease, interval_days, repetitions, lapses, due_at, last_reviewed_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (user_id, question_id, state.ease, state.interval_days, state.repetitions,
+              state.lapses, due_at, reviewed_at))
+        self.conn.commit()
+    
+    @timed('sat_db_query_seconds', 'query')
+    def get_next_review(self, user_id, now):
+        """Most overdue question for the user, or None; one seek on the (user_id, due_at) index"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT question_id, due_at FROM review_state
+        WHERE user_id = ? AND due_at <= ?
+        ORDER BY due_at
+        LIMIT 1
+        ''', (user_id, now))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    
+    @timed('sat_db_query_seconds', 'query')
+    def get_review_summary(self, user_id, now):
+        """(questions due now, epoch seconds of the next upcoming review or None)"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT COUNT(*) FROM review_state WHERE user_id = ? AND due_at <= ?",
+            (user_id, now)
+        )
+        due = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT MIN(due_at) FROM review_state WHERE user_id = ? AND due_at > ?",
+            (user_id, now)
+        )
+        return due, cursor.fetchone()[0]
+    
+    @timed('sat_db_query_seconds', 'query')
     def start_study_session(self, user_id):
         cursor = self.conn.cursor()
         cursor.execute(
-            "INSERT INTO study_sessions (user_id, start_time) VALUES (?, ?)",
+            "INSERT INTO study_sessions (user_id, start_time, questions_answered, correct_answers, sections_studied) VALUES (?, ?, 0, 0, '')",
             (user_id, datetime.now())
         )
         self.conn.commit()
         return cursor.lastrowid
     
+    @timed('sat_db_query_seconds', 'query')
+    def get_active_session(self, user_id):
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT id, start_time, questions_answered, correct_answers, sections_studied
+        FROM study_sessions
+        WHERE user_id = ? AND end_time IS NULL
+        ORDER BY start_time DESC
+        LIMIT 1
+        ''', (user_id,))
+        return cursor.fetchone()
+    
+    @timed('sat_db_query_seconds', 'query')
+    def update_session_progress(self, session_id, is_correct, section):
+        """Count one answer against an open session; safe to call from any shard"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        UPDATE study_sessions
+        SET questions_answered = COALESCE(questions_answered, 0) + 1,
+            correct_answers = COALESCE(correct_answers, 0) + ?,
+            sections_studied = CASE
+                WHEN instr(',' || COALESCE(sections_studied, '') || ',', ',' || ? || ',') > 0
+                    THEN sections_studied
+                WHEN COALESCE(sections_studied, '') = '' THEN ?
+                ELSE sections_studied || ',' || ?
+            END
+        WHERE id = ? AND end_time IS NULL
+        ''', (1 if is_correct else 0, section, section, section, session_id))
+        self.conn.commit()
+    
+    @timed('sat_db_query_seconds', 'query')
     def end_study_session(self, session_id, questions_answered, correct_answers, sections_studied):
         cursor = self.conn.cursor()
         cursor.execute('''
@@ -121,32 +868,49 @@ class SATDatabase:
         ''', (datetime.now(), questions_answered, correct_answers, sections_studied, session_id))
         self.conn.commit()
     
+    @timed('sat_db_query_seconds', 'query')
     def get_user_stats(self, user_id):
         cursor = self.conn.cursor()
         
-        # Overall stats
+        # Overall stats, recent answers plus the compacted daily summaries
         cursor.execute('''
         SELECT 
-            COUNT(*) as total_questions,
-            SUM(is_correct) as correct_answers,
-            AVG(time_taken) as avg_time
-        FROM user_progress
-        WHERE user_id = ?
-        ''', (user_id,))
+            COALESCE(SUM(answered), 0) as total_questions,
+            SUM(correct) as correct_answers,
+            SUM(seconds) * 1.0 / SUM(answered) as avg_time
+        FROM (
+            SELECT COUNT(*) AS answered, SUM(is_correct) AS correct, SUM(time_taken) AS seconds
+            FROM user_progress
+            WHERE user_id = ?
+            UNION ALL
+            SELECT SUM(answered), SUM(correct), SUM(seconds)
+            FROM progress_daily_summary
+            WHERE user_id = ?
+        )
+        ''', (user_id, user_id))
         overall_stats = cursor.fetchone()
         
         # Section-wise stats
         cursor.execute('''
         SELECT 
-            q.section,
-            COUNT(*) as total,
-            SUM(up.is_correct) as correct,
-            AVG(up.time_taken) as avg_time
-        FROM user_progress up
-        JOIN questions q ON up.question_id = q.id
-        WHERE up.user_id = ?
-        GROUP BY q.section
-        ''', (user_id,))
+            section,
+            SUM(answered) as total,
+            SUM(correct) as correct,
+            SUM(seconds) * 1.0 / SUM(answered) as avg_time
+        FROM (
+            SELECT q.section, COUNT(*) AS answered, SUM(up.is_correct) AS correct, SUM(up.time_taken) AS seconds
+            FROM user_progress up
+            JOIN questions q ON up.question_id = q.id
+            WHERE up.user_id = ?
+            GROUP BY q.section
+            UNION ALL
+            SELECT section, SUM(answered), SUM(correct), SUM(seconds)
+            FROM progress_daily_summary
+            WHERE user_id = ?
+            GROUP BY section
+        )
+        GROUP BY section
+        ''', (user_id, user_id))
         section_stats = cursor.fetchall()
         
         # Recent sessions
@@ -165,21 +929,68 @@ class SATDatabase:
             'recent_sessions': recent_sessions
         }
     
+    @timed('sat_db_query_seconds', 'query')
+    def get_progress_version(self, user_id):
+        """(recent answers, last answer id, compacted answers, last compacted day) for a user;
+        changes whenever new progress is recorded or compacted"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT recent.answers, recent.last_id, COALESCE(summary.answers, 0), summary.last_day
+        FROM (SELECT COUNT(*) AS answers, MAX(id) AS last_id FROM user_progress WHERE user_id = ?) recent,
+             (SELECT SUM(answered) AS answers, MAX(day) AS last_day FROM progress_daily_summary WHERE user_id = ?) summary
+        ''', (user_id, user_id))
+        return tuple(cursor.fetchone())
+    
+    @timed('sat_db_query_seconds', 'query')
+    def get_daily_progress(self, user_id, days=30):
+        """(day, answered, correct) per day over the last ``days`` days, oldest first"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT day, SUM(answered), SUM(correct)
+        FROM (
+            SELECT DATE(timestamp) AS day, COUNT(*) AS answered, SUM(is_correct) AS correct
+            FROM user_progress
+            WHERE user_id = ? AND timestamp >= DATETIME('now', ?)
+            GROUP BY day
+            UNION ALL
+            SELECT day, answered, correct
+            FROM progress_daily_summary
+            WHERE user_id = ? AND day >= DATE('now', ?)
+        )
+        GROUP BY day
+        ORDER BY day
+        ''', (user_id, f'-{int(days)} days', user_id, f'-{int(days)} days'))
+        return cursor.fetchall()
+    
+    @timed('sat_db_query_seconds', 'query')
     def get_weak_areas(self, user_id):
         cursor = self.conn.cursor()
         cursor.execute('''
         SELECT 
-            q.section,
-            COUNT(*) as total,
-            SUM(up.is_correct) as correct,
-            (SUM(up.is_correct) * 100.0 / COUNT(*)) as accuracy
-        FROM user_progress up
-        JOIN questions q ON up.question_id = q.id
-        WHERE up.user_id = ?
-        GROUP BY q.section
+            section,
+            SUM(answered) as total,
+            SUM(correct) as correct,
+            (SUM(correct) * 100.0 / SUM(answered)) as accuracy
+        FROM (
+            SELECT q.section, COUNT(*) AS answered, SUM(up.is_correct) AS correct
+            FROM user_progress up
+            JOIN questions q ON up.question_id = q.id
+            WHERE up.user_id = ?
+            GROUP BY q.section
+            UNION ALL
+            SELECT section, SUM(answered), SUM(correct)
+            FROM progress_daily_summary
+            WHERE user_id = ?
+            GROUP BY section
+        )
+        GROUP BY section
         ORDER BY accuracy ASC
-        ''', (user_id,))
+        ''', (user_id, user_id))
         return cursor.fetchall()
     
     def close(self):
-        self.conn.close()
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
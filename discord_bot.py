@@ -3,10 +3,17 @@ from discord.ext import commands
 import os
 import time
 import asyncio
+import io
 import json
-import matplotlib.pyplot as plt
-import plotly.graph_objects as go
-from sat_utils import SATPrep
+from sat_utils import SATPrep, parse_difficulty_topic
+from view_registry import ViewRegistry
+from sharding import parse_shard_env
+from rate_limiter import create_admission_controller
+from profile_store import PROFILE_FIELDS
+from report_renderer import create_report_renderer
+from study_rooms import RoomEngine
+from event_log import EventConsumer, Leaderboard
+from metrics import registry as metrics, start_exporter, ANSWER_TIME_BUCKETS
 from analytics_engine import AnalyticsEngine
 from recommendation_engine import RecommendationEngine
 from dotenv import load_dotenv
@@ -16,25 +23,66 @@ load_dotenv()
 TOKEN = os.getenv('DISCORD_TOKEN')
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
-# Initialize components
-sat = SATPrep()
+# Initialize components. Anything that opens a connection, a file or a pool is built
+# by main(): report render workers import this module and must not build a second bot.
+sat = None
+admission = None
+reports = None
 analytics = AnalyticsEngine(None)
 recommender = RecommendationEngine(None)
 
-# Active sessions
+# Weekly leaderboard, kept current by tailing the answer event log every shard appends to
+weekly_board = Leaderboard(days=int(os.getenv('LEADERBOARD_DAYS', 7)))
+board_feed = None
+
+# Active sessions (study sessions live in the database so every shard sees them)
 active_quizzes = {}
-study_sessions = {}
-collaboration_rooms = {}
+
+def expire_view(entry, view):
+    """Stop an evicted view and grey out its buttons"""
+    view.stop()
+    asyncio.get_running_loop().create_task(view.disable())
+
+# Live question views, bounded per user and globally
+view_registry = None
 
 # Bot setup
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix='!', intents=intents)
+SHARD_COUNT, SHARD_IDS = parse_shard_env()
+if SHARD_COUNT:
+    bot = commands.AutoShardedBot(command_prefix='!', intents=intents,
+                                  shard_count=SHARD_COUNT, shard_ids=SHARD_IDS)
+else:
+    bot = commands.Bot(command_prefix='!', intents=intents)
+
+async def admit(ctx, command):
+    """Apply the per-user/per-guild limits for an expensive command"""
+    guild_id = ctx.guild.id if ctx.guild else None
+    retry_after = await admission.check_async(command, ctx.author.id, guild_id)
+    if retry_after:
+        await ctx.send(f"⏳ Slow down! You can use `!{command}` again in {retry_after:.0f}s.")
+        return False
+    return True
+
+@bot.before_invoke
+async def start_command_timer(ctx):
+    ctx.started_at = time.perf_counter()
+
+@bot.after_invoke
+async def record_command_time(ctx):
+    metrics.observe('sat_command_seconds', 'command', ctx.command.name,
+                    time.perf_counter() - ctx.started_at)
 
 @bot.event
 async def on_ready():
     print(f'Logged in as {bot.user}')
+    if SHARD_COUNT:
+        print(f'Running shards {sorted(bot.shards)} of {SHARD_COUNT}')
     print('Advanced SAT Prep Bot is ready!')
+    start_exporter()
+    if board_feed:
+        board_feed.start()
     await bot.change_presence(activity=discord.Game(name="SAT Preparation | !help"))
 
 @bot.command()
@@ -47,17 +95,20 @@ async def help(ctx):
     )
     
     embed.add_field(name="📚 Practice Commands", value="""
-    `!pyq <section> [difficulty]` - Get previous year question
+    `!pyq <section> [difficulty] [topic]` - Get previous year question
+    `!search [section] <keywords>` - Search the question bank
     `!newq <section> [difficulty] [topic]` - Generate new question
     `!adaptive <section>` - Get adaptive question
+    `!review` - Review a question that is due again
     `!quiz <section> [count]` - Start a quiz
     """, inline=False)
     
     embed.add_field(name="📊 Analytics Commands", value="""
     `!stats` - Show your statistics
     `!report` - Generate performance report
-    `!trends` - Show performance trends
+    `!trends [days]` - Show performance trends
     `!weak` - Show weak areas
+    `!leaderboard` - Top students this week
     `!compare <user>` - Compare with another user
     """, inline=False)
     
@@ -65,12 +116,13 @@ async def help(ctx):
     `!recommend` - Get personalized recommendations
     `!plan [days]` - Generate study plan
     `!goals` - Set learning goals
-    `!profile` - View your profile
+    `!profile [field] [value]` - View or update your profile
     """, inline=False)
     
     embed.add_field(name="🤝 Collaboration Commands", value="""
     `!studyroom create` - Create study room
     `!studyroom join <id>` - Join study room
+    `!studyroom start [section]` - Post a question to your room (host)
     `!studyroom leave` - Leave study room
     `!challenge <user> <section>` - Challenge another user
     """, inline=False)
@@ -91,12 +143,11 @@ async def help(ctx):
     await ctx.send(embed=embed)
 
 @bot.command()
-async def pyq(ctx, section: str, difficulty: str = None):
+async def pyq(ctx, section: str, difficulty: str = None, *, topic: str = None):
     """Get a previous year question with adaptive selection"""
-    diff_map = {'easy': 1, 'medium': 2, 'hard': 3}
-    diff = diff_map.get(difficulty.lower(), None) if difficulty else None
+    diff, topic = parse_difficulty_topic(difficulty, topic)
     
-    question = sat.get_pyq(section, diff, str(ctx.author.id))
+    question = await asyncio.to_thread(sat.get_pyq, section, diff, str(ctx.author.id), topic)
     if not question:
         await ctx.send(f"No questions found for section: {section}")
         return
@@ -104,33 +155,39 @@ async def pyq(ctx, section: str, difficulty: str = None):
     # Create interactive embed
     embed = discord.Embed(
         title=f"PYQ - {section.capitalize()}",
-        description=f"Difficulty: {difficulty or 'Adaptive'}",
+        description=f"Difficulty: {difficulty if diff else 'Adaptive'}" + (f" | Topic: {topic}" if topic else ''),
         color=0x3498db
     )
     
     embed.add_field(name="Question", value=question['question_en'], inline=False)
     
-    if question.get('passage_en'):
-        embed.add_field(name="Passage", value=question['passage_en'], inline=False)
+    passage = sat.get_passage(question.get('passage_id'))
+    if passage:
+        embed.add_field(name="Passage", value=passage[:1024], inline=False)
     
     # Add options as buttons
     options = question['options_en']
-    view = QuestionView(ctx.author.id, question, section, 'pyq')
+    view = QuestionView(ctx.author.id, question['id'], answer_index(options, question['answer']), section, 'pyq')
     
     for i, opt in enumerate(options):
         embed.add_field(name=f"Option {chr(65+i)}", value=opt, inline=False)
     
-    await ctx.send(embed=embed, view=view)
+    view.message = await ctx.send(embed=embed, view=view)
 
 @bot.command()
 async def newq(ctx, section: str, difficulty: str = 'medium', *, topic: str = None):
     """Generate a new AI question"""
-    diff_map = {'easy': 1, 'medium': 2, 'hard': 3}
-    diff = diff_map.get(difficulty.lower(), 2)
+    diff, topic = parse_difficulty_topic(difficulty, topic)
+    if diff is None:
+        difficulty, diff = 'medium', 2
+    
+    if not await admit(ctx, 'newq'):
+        return
     
     await ctx.send("🤖 Generating a new question... This may take a moment.")
     
-    question = sat.generate_new_question(section, diff, topic)
+    async with admission.slot(ctx.author.id):
+        question = await asyncio.to_thread(sat.generate_new_question, section, diff, topic)
     if not question:
         await ctx.send(f"Could not generate question for section: {section}")
         return
@@ -149,12 +206,12 @@ async def newq(ctx, section: str, difficulty: str = 'medium', *, topic: str = No
     
     # Add options as buttons
     options = question['options']
-    view = QuestionView(ctx.author.id, question, section, 'newq')
+    view = QuestionView(ctx.author.id, question['id'], answer_index(options, question['answer']), section, 'newq')
     
     for i, opt in enumerate(options):
         embed.add_field(name=f"Option {chr(65+i)}", value=opt, inline=False)
     
-    await ctx.send(embed=embed, view=view)
+    view.message = await ctx.send(embed=embed, view=view)
 
 @bot.command()
 async def adaptive(ctx, section: str):
@@ -162,7 +219,7 @@ async def adaptive(ctx, section: str):
     await ctx.send("🧠 Analyzing your performance to generate an adaptive question...")
     
     # Get adaptive question
-    question = sat.get_adaptive_question(str(ctx.author.id), section)
+    question = await asyncio.to_thread(sat.get_adaptive_question, str(ctx.author.id), section)
     if not question:
         await ctx.send("Could not generate adaptive question. Try !pyq or !newq instead.")
         return
@@ -176,17 +233,80 @@ async def adaptive(ctx, section: str):
     
     embed.add_field(name="Question", value=question['question_en'], inline=False)
     
-    if question.get('passage_en'):
-        embed.add_field(name="Passage", value=question['passage_en'], inline=False)
+    passage = sat.get_passage(question.get('passage_id'))
+    if passage:
+        embed.add_field(name="Passage", value=passage[:1024], inline=False)
     
     # Add options as buttons
     options = question['options_en']
-    view = QuestionView(ctx.author.id, question, section, 'adaptive')
+    view = QuestionView(ctx.author.id, question['id'], answer_index(options, question['answer']), section, 'adaptive')
+    
+    for i, opt in enumerate(options):
+        embed.add_field(name=f"Option {chr(65+i)}", value=opt, inline=False)
+    
+    view.message = await ctx.send(embed=embed, view=view)
+
+@bot.command()
+async def review(ctx):
+    """Serve the most overdue spaced-repetition review"""
+    question = sat.get_review_question(str(ctx.author.id))
+    if not question:
+        due, next_at = sat.get_review_summary(str(ctx.author.id))
+        if next_at:
+            await ctx.send(f"Nothing to review right now. Your next review is due <t:{int(next_at)}:R>.")
+        else:
+            await ctx.send("Nothing to review yet. Answer some questions with `!pyq` or `!adaptive` first.")
+        return
+    
+    due, _ = sat.get_review_summary(str(ctx.author.id))
+    embed = discord.Embed(
+        title=f"Review - {question['section'].capitalize()}",
+        description=f"{due} review(s) due",
+        color=0xe67e22
+    )
+    
+    embed.add_field(name="Question", value=question['question_en'], inline=False)
+    
+    passage = sat.get_passage(question.get('passage_id'))
+    if passage:
+        embed.add_field(name="Passage", value=passage[:1024], inline=False)
+    
+    options = question['options_en']
+    view = QuestionView(ctx.author.id, question['id'], answer_index(options, question['answer']), question['section'], 'review')
     
     for i, opt in enumerate(options):
         embed.add_field(name=f"Option {chr(65+i)}", value=opt, inline=False)
     
-    await ctx.send(embed=embed, view=view)
+    view.message = await ctx.send(embed=embed, view=view)
+
+@bot.command()
+async def search(ctx, *, query: str):
+    """Search the question bank by keyword or topic"""
+    section = None
+    first, _, rest = query.partition(' ')
+    if first.lower() in ('math', 'reading', 'writing') and rest:
+        section, query = first.lower(), rest
+    
+    results = sat.search_questions(query, section, limit=5)
+    if not results:
+        await ctx.send(f"No questions found for: {query}")
+        return
+    
+    embed = discord.Embed(
+        title=f"🔎 Results for \"{query}\"",
+        description="Practice one with `!pyq <section> <difficulty> <topic>`",
+        color=0x3498db
+    )
+    difficulty_names = {1: 'Easy', 2: 'Medium', 3: 'Hard'}
+    for result in results:
+        embed.add_field(
+            name=f"#{result['id']} · {result['section'].capitalize()} · {difficulty_names.get(result['difficulty'], 'Unknown')}"
+                 + (f" · {result['topic']}" if result['topic'] else ''),
+            value=result['snippet'][:1024] or '…',
+            inline=False
+        )
+    
+    await ctx.send(embed=embed)
 
 @bot.command()
 async def stats(ctx):
@@ -224,6 +344,52 @@ async def stats(ctx):
     
     await ctx.send(embed=embed)
 
+@bot.command()
+async def leaderboard(ctx):
+    """Show who answered the most questions correctly this week"""
+    if board_feed is None:
+        await ctx.send("The leaderboard needs the answer event log (EVENT_LOG=1).")
+        return
+    
+    top = weekly_board.top(10)
+    if not top:
+        await ctx.send("No correct answers yet this week. Be the first!")
+        return
+    
+    discord_ids = await asyncio.to_thread(sat.db.get_discord_ids, [user_id for user_id, _ in top])
+    lines = [f"{rank}. <@{discord_ids.get(user_id, user_id)}> - {correct} correct"
+             for rank, (user_id, correct) in enumerate(top, 1)]
+    embed = discord.Embed(title=f"🏆 Leaderboard - last {weekly_board.days} days",
+                          description='\n'.join(lines), color=0xf1c40f)
+    await ctx.send(embed=embed)
+
+async def send_chart(ctx, report_type, title, days=30):
+    """Render (or reuse) a chart in the report process pool and send the PNG"""
+    report = await asyncio.to_thread(sat.get_report_data, str(ctx.author.id), report_type, days)
+    if not report:
+        await ctx.send("You haven't answered any questions yet!")
+        return
+    
+    version, data = report
+    data['name'] = ctx.author.name
+    params = (days,) if report_type == 'trends' else ()
+    png = await reports.render(ctx.author.id, report_type, version, data, params)
+    
+    embed = discord.Embed(title=title, color=0x3498db)
+    embed.set_image(url=f"attachment://{report_type}.png")
+    await ctx.send(embed=embed, file=discord.File(io.BytesIO(png), filename=f"{report_type}.png"))
+
+@bot.command()
+async def report(ctx):
+    """Generate a performance report chart"""
+    await send_chart(ctx, 'report', f"📊 Performance Report for {ctx.author.name}")
+
+@bot.command()
+async def trends(ctx, days: int = 30):
+    """Show daily accuracy and practice volume"""
+    days = max(1, min(days, 365))
+    await send_chart(ctx, 'trends', f"📈 Trends for {ctx.author.name} (last {days} days)", days)
+
 @bot.command()
 async def recommend(ctx):
     """Get personalized recommendations"""
@@ -240,19 +406,49 @@ async def recommend(ctx):
     
     await ctx.send(embed=embed)
 
+@bot.command()
+async def profile(ctx, field: str = None, *, value: str = None):
+    """Show your learner profile, or set one field of it"""
+    if field:
+        field = field.lower()
+        if field not in PROFILE_FIELDS or not value:
+            await ctx.send(f"Usage: `!profile <field> <value>` where field is one of: {', '.join(PROFILE_FIELDS)}")
+            return
+        if field not in ('learning_style', 'pace'):
+            value = [item.strip().lower().replace(' ', '_') for item in value.split(',') if item.strip()]
+        sat.update_profile(str(ctx.author.id), **{field: value})
+    
+    learner = sat.get_profile(str(ctx.author.id))
+    embed = discord.Embed(title=f"👤 Learner Profile - {ctx.author.name}", color=0x1abc9c)
+    for name in PROFILE_FIELDS:
+        shown = learner.get(name)
+        if isinstance(shown, list):
+            shown = ', '.join(item.replace('_', ' ') for item in shown)
+        embed.add_field(name=name.replace('_', ' ').capitalize(), value=shown or "—", inline=False)
+    
+    await ctx.send(embed=embed)
+
 @bot.command()
 async def translate(ctx, *, text: str):
     """Translate text between Arabic and English"""
-    translation = sat.translate(text)
+    if not await admit(ctx, 'translate'):
+        return
+    
+    async with admission.slot(ctx.author.id):
+        translation = await asyncio.to_thread(sat.translate, text)
     await ctx.send(f"Translation: {translation}")
 
 @bot.command()
 async def explain(ctx, *, concept: str):
     """Explain a concept using AI"""
+    if not await admit(ctx, 'explain'):
+        return
+    
     await ctx.send("🤖 Generating explanation...")
     
     # Use AI to explain concept
-    explanation = sat.explain_concept(concept)
+    async with admission.slot(ctx.author.id):
+        explanation = await asyncio.to_thread(sat.explain_concept, concept)
     
     embed = discord.Embed(
         title=f"📖 Explanation: {concept}",
@@ -262,21 +458,233 @@ async def explain(ctx, *, concept: str):
     
     await ctx.send(embed=embed)
 
+@bot.command()
+@commands.is_owner()
+async def cachestats(ctx):
+    """Show LLM response and chart cache hit rates and savings"""
+    charts = reports.stats()
+    chart_line = (f"🖼️ Charts: {charts['hits']} cached / {charts['renders']} rendered, "
+                  f"{charts['shared']} shared, {charts['entries']} entries ({charts['bytes'] / 1024:.0f} KiB).")
+    cache = sat.ai_generator.cache
+    if cache is None:
+        await ctx.send(f"The LLM response cache is disabled.\n{chart_line}")
+        return
+    
+    stats = cache.stats()
+    await ctx.send(
+        f"🗄️ Cache: {stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate'] * 100:.1f}%), "
+        f"{stats['bypassed']} bypassed, {stats['entries']} entries ({stats['bytes'] / 1024:.0f} KiB). "
+        f"Saved {stats['saved_prompt_tokens'] + stats['saved_completion_tokens']} tokens and {stats['saved_seconds']:.1f}s.\n"
+        f"{chart_line}"
+    )
+
+@bot.command()
+async def startstudy(ctx):
+    """Start a study session"""
+    sat.start_study_session(str(ctx.author.id), ctx.author.name)
+    await ctx.send("📚 Study session started! Your answers will be tracked until you run `!endstudy`.")
+
+@bot.command()
+async def endstudy(ctx):
+    """End the current study session"""
+    session = sat.get_active_session(str(ctx.author.id))
+    if not session:
+        await ctx.send("You don't have an active study session. Start one with `!startstudy`.")
+        return
+    
+    session_id, start_time, answered, correct, sections = session
+    answered, correct = answered or 0, correct or 0
+    sat.end_study_session(session_id, answered, correct, sections)
+    accuracy = (correct / answered) * 100 if answered else 0
+    await ctx.send(f"✅ Study session ended: {correct}/{answered} correct ({accuracy:.1f}%)")
+
 # View classes for interactive buttons
+def scoreboard_embed(snapshot, final):
+    title = f"🏁 Round {snapshot['round']} results" if final else f"⏱️ Round {snapshot['round']} live scoreboard"
+    embed = discord.Embed(title=f"Study Room #{snapshot['room']} - {title}", color=0xf1c40f)
+    embed.add_field(name="Answered", value=f"{snapshot['answered']}/{snapshot['members']}", inline=True)
+    embed.add_field(name="Correct", value=str(snapshot['correct']), inline=True)
+    embed.add_field(
+        name="Answers per option",
+        value=' | '.join(f"{chr(65 + i)}: {count}" for i, count in enumerate(snapshot['option_counts'])) or "—",
+        inline=False
+    )
+    leaders = '\n'.join(f"{rank}. <@{user_id}> - {points} pts"
+                         for rank, (user_id, points) in enumerate(snapshot['leaders'], 1))
+    embed.add_field(name="Leaderboard", value=leaders or "No points yet", inline=False)
+    return embed
+
+async def publish_scoreboard(room, snapshot, final):
+    """One coalesced edit of the room's scoreboard message"""
+    if room.message is not None:
+        await room.message.edit(embed=scoreboard_embed(snapshot, final))
+
+rooms = None
+
+def record_room_answers(answers, question_id, section, names):
+    """Store a finished round's answers in one pass, off the event loop"""
+    for user_id, (choice, is_correct, elapsed) in answers.items():
+        sat.record_user_answer(str(user_id), names.get(user_id, str(user_id)), question_id, is_correct, round(elapsed, 2))
+        sat.record_session_answer(str(user_id), is_correct, section)
+
+async def run_room_round(ctx, room, section):
+    """Post one shared question to the room, collect answers and publish the result"""
+    question = await asyncio.to_thread(sat.get_pyq, section)
+    options = question['options_en'] if question else []
+    correct_index = answer_index(options, question['answer']) if question else None
+    if correct_index is None:
+        await ctx.send("Could not find a question for this room. Try another section.")
+        return None
+    
+    embed = discord.Embed(
+        title=f"Study Room #{room.id} - {section.capitalize()} (round {room.round + 1})",
+        description=f"{len(room.members)} members, {int(rooms.time_limit)}s to answer",
+        color=0x9b59b6
+    )
+    embed.add_field(name="Question", value=question['question_en'], inline=False)
+    passage = sat.get_passage(question.get('passage_id'))
+    if passage:
+        embed.add_field(name="Passage", value=passage[:1024], inline=False)
+    for i, opt in enumerate(options):
+        embed.add_field(name=f"Option {chr(65+i)}", value=opt, inline=False)
+    
+    rooms.start_round(room, {
+        'question_id': question['id'],
+        'options_en': options,
+        'correct_index': correct_index,
+        'section': section
+    })
+    view = RoomView(room, len(options))
+    question_message = await ctx.send(embed=embed, view=view)
+    room.message = await ctx.send(embed=scoreboard_embed(rooms.snapshot(room), False))
+    
+    snapshot = await rooms.wait_round(room)
+    view.stop()
+    for child in view.children:
+        child.disabled = True
+    try:
+        await question_message.edit(view=view)
+    except discord.HTTPException:
+        pass
+    names = {member.id: member.name for member in getattr(ctx.guild, 'members', [])}
+    # The round's own answers: the host may already have started the next round
+    await asyncio.to_thread(record_room_answers, snapshot.pop('answers'), question['id'], section, names)
+    await ctx.send(f"✅ Round over! The correct answer was {chr(65 + correct_index)}.")
+    return snapshot
+
+@bot.group(invoke_without_command=True)
+async def studyroom(ctx):
+    """Show the study room you are in"""
+    room = rooms.room_of(ctx.author.id)
+    if room is None:
+        await ctx.send("You are not in a study room. Use `!studyroom create` or `!studyroom join <id>`.")
+        return
+    await ctx.send(f"📚 You are in study room #{room.id} with {len(room.members)} members. Host: <@{room.host_id}>")
+
+@studyroom.command(name='create')
+async def studyroom_create(ctx):
+    """Create a study room and become its host"""
+    room = rooms.create(ctx.author.id, ctx.channel.id)
+    if isinstance(room, str):
+        await ctx.send(room)
+        return
+    await ctx.send(f"📚 Study room #{room.id} created! Others can join with `!studyroom join {room.id}`. "
+                   f"Start a question with `!studyroom start <section>`.")
+
+@studyroom.command(name='join')
+async def studyroom_join(ctx, room_id: int):
+    """Join a study room"""
+    room = rooms.join(room_id, ctx.author.id)
+    if isinstance(room, str):
+        await ctx.send(room)
+        return
+    await ctx.send(f"👋 {ctx.author.name} joined study room #{room.id} ({len(room.members)} members).")
+
+@studyroom.command(name='leave')
+async def studyroom_leave(ctx):
+    """Leave your study room"""
+    room = rooms.leave(ctx.author.id)
+    if room is None:
+        await ctx.send("You are not in a study room.")
+        return
+    await ctx.send(f"{ctx.author.name} left study room #{room.id}.")
+
+@studyroom.command(name='start')
+async def studyroom_start(ctx, section: str = 'math'):
+    """Post the next question to everyone in your room (host only)"""
+    room = rooms.room_of(ctx.author.id)
+    if room is None or room.host_id != ctx.author.id:
+        await ctx.send("Only the host of a study room can start a question.")
+        return
+    if room.round_open:
+        await ctx.send("A question is already open in this room.")
+        return
+    if section.lower() not in ('math', 'reading', 'writing'):
+        await ctx.send("Section must be math, reading or writing.")
+        return
+    await run_room_round(ctx, room, section.lower())
+
+@bot.command()
+async def challenge(ctx, opponent: discord.Member, section: str = 'math'):
+    """Challenge another user to a head-to-head question"""
+    if opponent.bot or opponent.id == ctx.author.id:
+        await ctx.send("Pick another human to challenge!")
+        return
+    if section.lower() not in ('math', 'reading', 'writing'):
+        await ctx.send("Section must be math, reading or writing.")
+        return
+    
+    if rooms.room_of(ctx.author.id) is not None:
+        await ctx.send("Leave your study room with `!studyroom leave` before starting a challenge.")
+        return
+    if rooms.room_of(opponent.id) is not None:
+        await ctx.send(f"{opponent.name} is busy in a study room right now. Try again later!")
+        return
+    room = rooms.create(ctx.author.id, ctx.channel.id)
+    rooms.join(room.id, opponent.id)
+    await ctx.send(f"⚔️ {ctx.author.mention} challenges {opponent.mention} to a {section.lower()} question!")
+    try:
+        snapshot = await run_room_round(ctx, room, section.lower())
+    finally:
+        rooms.close(room)
+    if not snapshot:
+        return
+    
+    points = dict(snapshot['leaders'])
+    mine, theirs = points.get(ctx.author.id, 0), points.get(opponent.id, 0)
+    if mine == theirs:
+        await ctx.send(f"🤝 It's a tie at {mine} points!")
+    else:
+        winner = ctx.author if mine > theirs else opponent
+        await ctx.send(f"🏆 {winner.mention} wins {max(mine, theirs)} to {min(mine, theirs)}!")
+
+def answer_index(options, answer):
+    try:
+        return options.index(answer)
+    except ValueError:
+        return None
+
 class QuestionView(discord.ui.View):
-    def __init__(self, user_id, question, section, question_type):
+    def __init__(self, user_id, question_id, correct_index, section, question_type):
         super().__init__(timeout=30)
         self.user_id = user_id
-        self.question = question
-        self.section = section
-        self.question_type = question_type
-        self.start_time = time.time()
+        self.message = None
+        # The registry keeps the question id and answer index; the view only keeps its token
+        self.token = view_registry.register(user_id, question_id, correct_index, section, question_type, view=self)
     
-    async def on_timeout(self):
+    async def disable(self):
         # Disable all buttons
         for child in self.children:
             child.disabled = True
-        await self.message.edit(view=self)
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+    
+    async def on_timeout(self):
+        view_registry.release(self.token)
+        await self.disable()
     
     @discord.ui.button(label="A", style=discord.ButtonStyle.secondary)
     async def button_a(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -299,52 +707,79 @@ class QuestionView(discord.ui.View):
             await interaction.response.send_message("This is not your question!", ephemeral=True)
             return
         
-        # Determine correct answer
-        if self.question_type == 'newq':
-            correct_answer = self.question['answer']
-            options = self.question['options']
-            try:
-                correct_index = options.index(correct_answer)
-            except ValueError:
-                correct_index = None
-        else:
-            correct_answer = self.question['answer']
-            options = self.question['options_en']
-            try:
-                correct_index = options.index(correct_answer)
-            except ValueError:
-                correct_index = None
+        entry = view_registry.release(self.token)
+        self.stop()
+        if entry is None:
+            await interaction.response.send_message("This question has expired. Ask for a new one!", ephemeral=True)
+            return
         
-        time_taken = int(time.time() - self.start_time)
+        correct_index = entry.answer_index
+        time_taken = round(time.monotonic() - entry.issued_at, 2)
+        metrics.observe('sat_answer_time_seconds', 'section', entry.section, time_taken, ANSWER_TIME_BUCKETS)
+        explanation = await asyncio.to_thread(sat.db.get_explanation, entry.question_id)
         
         if correct_index is not None and option_index == correct_index:
-            await interaction.response.send_message(f"✅ Correct! {self.question.get('explanation_en', self.question.get('explanation', ''))}")
+            await interaction.response.send_message(f"✅ Correct! {explanation}")
             is_correct = True
         else:
-            await interaction.response.send_message(f"❌ Wrong! The correct answer is {chr(65 + correct_index) if correct_index is not None else 'unknown'}. {self.question.get('explanation_en', self.question.get('explanation', ''))}")
+            await interaction.response.send_message(f"❌ Wrong! The correct answer is {chr(65 + correct_index) if correct_index is not None else 'unknown'}. {explanation}")
             is_correct = False
         
-        # Record answer
-        sat.record_user_answer(
+        # Record answer; this writes through locks other shards contend for, so keep it off the loop
+        await asyncio.to_thread(
+            sat.record_user_answer,
             str(self.user_id),
             interaction.user.name,
-            self.question['id'],
+            entry.question_id,
             is_correct,
             time_taken
         )
         
         # Update study session
-        if self.user_id in study_sessions:
-            session = study_sessions[self.user_id]
-            session['questions_answered'] += 1
-            if is_correct:
-                session['correct_answers'] += 1
-            if self.section not in session['sections_studied']:
-                session['sections_studied'].append(self.section)
+        await asyncio.to_thread(sat.record_session_answer, str(self.user_id), is_correct, entry.section)
         
         # Disable all buttons
         for child in self.children:
             child.disabled = True
         await interaction.message.edit(view=self)
 
-bot.run(TOKEN)
+class RoomView(discord.ui.View):
+    """One view shared by every member of a study room"""
+    def __init__(self, room, option_count):
+        super().__init__(timeout=rooms.time_limit + 5)
+        self.room = room
+        for i in range(option_count):
+            button = discord.ui.Button(label=chr(65 + i), style=discord.ButtonStyle.secondary)
+            button.callback = self.make_callback(i)
+            self.add_item(button)
+    
+    def make_callback(self, option_index):
+        async def callback(interaction):
+            result = rooms.answer(self.room, interaction.user.id, option_index)
+            if isinstance(result, str):
+                await interaction.response.send_message(result, ephemeral=True)
+            else:
+                await interaction.response.send_message(f"🔒 Answer {chr(65 + option_index)} locked in!", ephemeral=True)
+        return callback
+
+def main():
+    global sat, admission, reports, board_feed, view_registry, rooms
+    sat = SATPrep()
+    admission = create_admission_controller(sat.db)
+    reports = create_report_renderer()
+    board_feed = EventConsumer(sat.events, weekly_board.apply) if sat.events else None
+    view_registry = ViewRegistry(
+        max_per_user=int(os.getenv('MAX_VIEWS_PER_USER', 3)),
+        max_total=int(os.getenv('MAX_LIVE_VIEWS', 1000)),
+        on_evict=expire_view
+    )
+    rooms = RoomEngine(
+        publish_scoreboard,
+        edit_interval=float(os.getenv('STUDYROOM_EDIT_INTERVAL', 1.5)),
+        time_limit=float(os.getenv('STUDYROOM_TIME_LIMIT', 60)),
+        max_members=int(os.getenv('STUDYROOM_MAX_MEMBERS', 500))
+    )
+    bot.run(TOKEN)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+"""Append-only log of answer events with offset-tracking consumers.
+
+Every recorded answer is appended to a segmented log on local disk as one
+fixed-size record, so the event at offset N sits at a computable position
+in the segment whose file name is its first offset. Bot shards and app
+servers can all append to the same directory: writers take a file lock on
+the active segment and the next segment's name is derived from the full
+one, so offsets stay dense and unique across processes.
+
+Consumers tail the log from an offset. Named consumers persist their offset
+in job_checkpoints and resume where they stopped; in-memory views replay
+the retained segments on start. Delivery is at least once.
+
+    python event_log.py stats
+    python event_log.py prune leaderboard calibration
+"""
+import argparse
+import os
+import struct
+import threading
+import time
+from collections import Counter, OrderedDict, namedtuple
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single writer process only
+    fcntl = None
+
+# timestamp, user_id, question_id, time_taken, is_correct
+ANSWER = struct.Struct('<dqqfB')
+
+AnswerEvent = namedtuple('AnswerEvent', ['offset', 'timestamp', 'user_id', 'question_id', 'is_correct', 'time_taken'])
+
+SEGMENT_SUFFIX = '.log'
+
+
+def segment_name(base_offset):
+    return f"{base_offset:020d}{SEGMENT_SUFFIX}"
+
+
+class EventLog:
+    def __init__(self, directory='events', segment_events=1000000, fsync=False):
+        self.directory = directory
+        self.segment_bytes = segment_events * ANSWER.size
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._fd = None
+        self._base = None
+
+    def segments(self):
+        """Base offsets of the segments on disk, oldest first"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(int(name[:-len(SEGMENT_SUFFIX)]) for name in names
+                      if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit())
+
+    def _path(self, base):
+        return os.path.join(self.directory, segment_name(base))
+
+    def _open(self, base):
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd = os.open(self._path(base), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._base = base
+
+    def append_answer(self, user_id, question_id, is_correct, time_taken, timestamp=None):
+        """Append one answer event and return its offset"""
+        record = ANSWER.pack(timestamp or time.time(), user_id, question_id, time_taken or 0.0,
+                             1 if is_correct else 0)
+        with self._lock:
+            if self._fd is None:
+                os.makedirs(self.directory, exist_ok=True)
+                segments = self.segments()
+                self._open(segments[-1] if segments else 0)
+            while True:
+                fd, base = self._fd, self._base
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    size = os.fstat(fd).st_size
+                    if size % ANSWER.size:
+                        # A writer died mid-record; drop the torn tail so records stay aligned
+                        size -= size % ANSWER.size
+                        os.ftruncate(fd, size)
+                    if size < self.segment_bytes:
+                        os.write(fd, record)
+                        if self.fsync:
+                            os.fsync(fd)
+                        return base + size // ANSWER.size
+                finally:
+                    if fcntl:
+                        fcntl.flock(fd, fcntl.LOCK_UN)
+                # Full: every writer derives the same next segment from this one's size
+                self._open(base + size // ANSWER.size)
+
+    def end_offset(self):
+        """Offset the next appended event will get"""
+        segments = self.segments()
+        if not segments:
+            return 0
+        size = os.path.getsize(self._path(segments[-1]))
+        return segments[-1] + size // ANSWER.size
+
+    def read(self, offset, limit=1000):
+        """Up to ``limit`` events from ``offset`` on; skips ahead if those segments were pruned"""
+        segments = self.segments()
+        events = []
+        index = 0
+        while index + 1 < len(segments) and segments[index + 1] <= offset:
+            index += 1
+        if segments and offset < segments[0]:
+            offset = segments[0]
+
+        while index < len(segments) and len(events) < limit:
+            base = segments[index]
+            try:
+                with open(self._path(base), 'rb') as f:
+                    f.seek((offset - base) * ANSWER.size)
+                    data = f.read((limit - len(events)) * ANSWER.size)
+            except FileNotFoundError:
+                data = b''  # Pruned while we were reading
+            count = len(data) // ANSWER.size
+            for i, fields in enumerate(ANSWER.iter_unpack(data[:count * ANSWER.size])):
+                timestamp, user_id, question_id, time_taken, is_correct = fields
+                events.append(AnswerEvent(offset + i, timestamp, user_id, question_id, bool(is_correct), time_taken))
+            offset += count
+            if index + 1 < len(segments) and offset >= segments[index + 1]:
+                index += 1
+                offset = segments[index]
+            else:
+                break
+        return events
+
+    def delete_before(self, offset):
+        """Remove segments whose every event is below ``offset``; returns how many"""
+        segments = self.segments()
+        deleted = 0
+        for base, next_base in zip(segments, segments[1:]):
+            if next_base > offset:
+                break
+            os.remove(self._path(base))
+            deleted += 1
+        return deleted
+
+    def stats(self):
+        segments = self.segments()
+        return {
+            'segments': len(segments),
+            'first_offset': segments[0] if segments else 0,
+            'end_offset': self.end_offset(),
+            'bytes': sum(os.path.getsize(self._path(base)) for base in segments)
+        }
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+def checkpoint_job(name):
+    return f"events:{name}"
+
+
+class EventConsumer:
+    """Feeds new events to ``handler(events)`` in batches from a background thread.
+
+    With ``name`` and ``db`` the offset is checkpointed after every handled
+    batch; otherwise consumption starts at the oldest retained event.
+    """
+
+    def __init__(self, log, handler, name=None, db=None, batch_size=1000, poll_interval=0.5):
+        self.log = log
+        self.handler = handler
+        self.name = name
+        self.db = db if name else None
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.offset = self.db.get_checkpoint(checkpoint_job(name)) if self.db else 0
+        self.handled = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """Handle one batch of new events; returns how many there were"""
+        events = self.log.read(self.offset, self.batch_size)
+        if not events:
+            return 0
+        self.handler(events)
+        self.offset = events[-1].offset + 1
+        self.handled += len(events)
+        if self.db:
+            self.db.save_checkpoint(checkpoint_job(self.name), self.offset)
+        return len(events)
+
+    def lag(self):
+        return max(0, self.log.end_offset() - self.offset)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.poll():
+                    continue
+            except Exception as e:
+                print(f"Event consumer {self.name or self.handler} error: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class Leaderboard:
+    """Correct answers per user over the last ``days`` days, kept current from the event log"""
+
+    def __init__(self, days=7):
+        self.days = days
+        self._by_day = OrderedDict()
+        self._lock = threading.Lock()
+
+    def apply(self, events):
+        with self._lock:
+            for event in events:
+                if not event.is_correct:
+                    continue
+                day = datetime.fromtimestamp(event.timestamp).date().toordinal()
+                self._by_day.setdefault(day, Counter())[event.user_id] += 1
+            cutoff = datetime.now().date().toordinal() - self.days
+            for day in [day for day in self._by_day if day <= cutoff]:
+                del self._by_day[day]
+
+    def top(self, limit=10):
+        """[(user_id, correct answers)] best first"""
+        cutoff = datetime.now().date().toordinal() - self.days
+        totals = Counter()
+        with self._lock:
+            for day, counts in self._by_day.items():
+                if day > cutoff:
+                    totals.update(counts)
+        return totals.most_common(limit)
+
+
+def create_event_log():
+    """Build the log from EVENT_LOG* env vars; returns None when EVENT_LOG=0"""
+    if os.getenv('EVENT_LOG', '1') == '0':
+        return None
+    return EventLog(
+        directory=os.getenv('EVENT_LOG_DIR', 'events'),
+        segment_events=int(os.getenv('EVENT_LOG_SEGMENT_EVENTS', 1000000)),
+        fsync=os.getenv('EVENT_LOG_FSYNC', '0') == '1'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer event log maintenance")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('stats', help="Segments and offsets on disk")
+    prune_parser = subparsers.add_parser('prune', help="Delete segments every named consumer has passed")
+    prune_parser.add_argument('consumers', nargs='+')
+    args = parser.parse_args()
+
+    from storage import create_storage
+
+    log = create_event_log() or EventLog(os.getenv('EVENT_LOG_DIR', 'events'))
+    db = create_storage()
+    try:
+        if args.command == 'stats':
+            print(log.stats())
+        else:
+            offset = min(db.get_checkpoint(checkpoint_job(name)) for name in args.consumers)
+            print({'deleted_segments': log.delete_before(offset), 'offset': offset})
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+"""Shared NLP inference worker.
+
+One process loads the NLP models once and serves every Streamlit session
+over a local multiprocessing connection. Requests that arrive together are
+grouped into micro-batches: the batcher waits at most ``max_wait`` seconds
+after the first request for up to ``max_batch`` more before running them.
+
+    export INFERENCE_AUTHKEY=$(python -c "import secrets; print(secrets.token_hex(32))")
+    python inference_worker.py --address 127.0.0.1:6100
+    INFERENCE_WORKER_ADDRESS=127.0.0.1:6100 streamlit run streamlit_app.py
+
+Connections carry pickled objects, so anyone who can connect can run code in
+the worker: both sides need the same non-empty INFERENCE_AUTHKEY and the
+worker refuses to start without one. Clients fall back to an in-process model when the worker is unreachable.
+"""
+import argparse
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Listener
+
+STATS_TASK = '__stats__'
+
+
+def parse_address(address):
+    """'host:port' becomes a TCP address; anything else is a Unix socket path"""
+    host, _, port = address.rpartition(':')
+    if host and port.isdigit():
+        return host, int(port)
+    return address
+
+
+def default_authkey():
+    key = os.getenv('INFERENCE_AUTHKEY', '')
+    if not key:
+        raise ValueError("INFERENCE_AUTHKEY must be set to a non-empty secret shared by the worker and its clients")
+    return key.encode('utf-8')
+
+
+class NLPHandler:
+    """Runs batches against one warm NLPProcessor"""
+
+    def __init__(self):
+        from nlp_processor import NLPProcessor
+        self.nlp = NLPProcessor()
+
+    def run_batch(self, task, payloads):
+        if task == 'explain':
+            return [self.nlp.generate_explanation(*payload) for payload in payloads]
+        if task == 'translate':
+            return [self.nlp.translate_complex_concepts(*payload) for payload in payloads]
+        raise ValueError(f"Unknown inference task: {task}")
+
+
+class StubNLPHandler:
+    """Model stand-in whose batch cost is a fixed overhead plus a per-item cost"""
+
+    def __init__(self, per_batch=0.02, per_item=0.002):
+        self.per_batch = per_batch
+        self.per_item = per_item
+
+    def run_batch(self, task, payloads):
+        time.sleep(self.per_batch + self.per_item * len(payloads))
+        return [f"{task}: {payload[0]}" for payload in payloads]
+
+
+class InferenceWorker:
+    def __init__(self, handler, address, authkey=None, max_batch=16, max_wait=0.005):
+        self.handler = handler
+        self.address = address
+        self.authkey = authkey or default_authkey()
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self.requests = 0
+        self.batches = 0
+
+    def serve_forever(self):
+        threading.Thread(target=self._batch_loop, daemon=True).start()
+        with Listener(self.address, authkey=self.authkey) as listener:
+            print(f"Inference worker listening on {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    print(f"Inference worker accept error: {e}")
+                    continue
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _serve_connection(self, conn):
+        send_lock = threading.Lock()
+        try:
+            while True:
+                request_id, task, payload = conn.recv()
+                if task == STATS_TASK:
+                    self._send(conn, send_lock, request_id, True, self.stats())
+                else:
+                    self._queue.put((conn, send_lock, request_id, task, payload))
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def _batch_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._run(batch)
+
+    def _run(self, batch):
+        by_task = {}
+        for item in batch:
+            by_task.setdefault(item[3], []).append(item)
+        for task, items in by_task.items():
+            self.batches += 1
+            self.requests += len(items)
+            try:
+                results = self.handler.run_batch(task, [item[4] for item in items])
+                replies = [(True, result) for result in results]
+            except Exception as e:
+                print(f"Inference batch error: {e}")
+                replies = [(False, str(e))] * len(items)
+            for (conn, send_lock, request_id, _, _), (ok, result) in zip(items, replies):
+                self._send(conn, send_lock, request_id, ok, result)
+
+    def _send(self, conn, send_lock, request_id, ok, result):
+        try:
+            with send_lock:
+                conn.send((request_id, ok, result))
+        except OSError:
+            pass  # Client went away; nothing to deliver to
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'mean_batch_size': round(self.requests / self.batches, 2) if self.batches else 0.0,
+            'queued': self._queue.qsize()
+        }
+
+
+class InferenceClient:
+    """Thread-safe client multiplexing requests from many sessions over one connection"""
+
+    def __init__(self, address, authkey=None, timeout=30, fallback=None):
+        self.address = address
+        self.authkey = authkey or default_authkey()
+        self.timeout = timeout
+        self.fallback = fallback
+        self._conn = None
+        self._pending = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        with self._lock:
+            if self._conn is None:
+                self._conn = Client(self.address, authkey=self.authkey)
+                threading.Thread(target=self._read_loop, args=(self._conn,), daemon=True).start()
+            return self._conn
+
+    def _read_loop(self, conn):
+        try:
+            while True:
+                request_id, ok, result = conn.recv()
+                future = self._pending.pop(request_id, None)
+                if future is None:
+                    continue
+                if ok:
+                    future.set_result(result)
+                else:
+                    future.set_exception(RuntimeError(result))
+        except (EOFError, OSError):
+            pass
+        with self._lock:
+            if self._conn is conn:
+                self._conn = None
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(ConnectionError("Inference worker disconnected"))
+
+    def call(self, task, *payload):
+        request_id = None
+        try:
+            conn = self._connection()
+            future = Future()
+            with self._lock:
+                request_id = next(self._ids)
+                self._pending[request_id] = future
+                conn.send((request_id, task, payload))
+            return future.result(self.timeout)
+        except Exception as e:
+            self._pending.pop(request_id, None)
+            if self.fallback is None:
+                raise
+            print(f"Inference worker unavailable, running locally: {e}")
+            return self.fallback(task, payload)
+
+    def generate_explanation(self, concept, context='', level='intermediate'):
+        return self.call('explain', concept, context, level)
+
+    def translate_complex_concepts(self, text, target_lang):
+        return self.call('translate', text, target_lang)
+
+    def stats(self):
+        return self.call(STATS_TASK)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class _LocalFallback:
+    """Loads the models in-process on first use, only if the worker is unreachable"""
+
+    def __init__(self):
+        self._handler = None
+        self._lock = threading.Lock()
+
+    def __call__(self, task, payload):
+        with self._lock:
+            if self._handler is None:
+                self._handler = NLPHandler()
+        return self._handler.run_batch(task, [payload])[0]
+
+
+def create_nlp_client():
+    """InferenceClient when INFERENCE_WORKER_ADDRESS is set, otherwise an in-process NLPProcessor"""
+    address = os.getenv('INFERENCE_WORKER_ADDRESS')
+    if not address:
+        return NLPHandler().nlp
+    if not os.getenv('INFERENCE_AUTHKEY'):
+        print("INFERENCE_WORKER_ADDRESS is set without INFERENCE_AUTHKEY; using an in-process model")
+        return NLPHandler().nlp
+    return InferenceClient(
+        parse_address(address),
+        timeout=float(os.getenv('INFERENCE_TIMEOUT_SECONDS', 30)),
+        fallback=_LocalFallback()
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared NLP inference worker")
+    parser.add_argument('--address', default=os.getenv('INFERENCE_WORKER_ADDRESS', '127.0.0.1:6100'))
+    parser.add_argument('--max-batch', type=int, default=int(os.getenv('INFERENCE_MAX_BATCH', 16)))
+    parser.add_argument('--max-wait-ms', type=float, default=float(os.getenv('INFERENCE_MAX_WAIT_MS', 5)))
+    parser.add_argument('--stub', action='store_true', help="Serve the stub model instead of NLPProcessor")
+    args = parser.parse_args()
+
+    try:
+        authkey = default_authkey()
+    except ValueError as e:
+        parser.error(str(e))
+    handler = StubNLPHandler() if args.stub else NLPHandler()
+    InferenceWorker(handler, parse_address(args.address), authkey=authkey, max_batch=args.max_batch,
+                    max_wait=args.max_wait_ms / 1000).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
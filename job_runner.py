@@ -0,0 +1,115 @@
+"""Background jobs shared across Streamlit sessions.
+
+Slow AI calls are submitted here instead of running inside a script run.
+Each job gets an id that the page keeps in session state and polls on the
+next rerun, so the work survives reruns and page switches. Requests with
+the same key share one job while it is in flight, and finished results stay
+available for ``result_ttl`` seconds for jobs submitted with ``cache=True``.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class Job:
+    __slots__ = ('id', 'key', 'status', 'result', 'error', 'submitted_at', 'started_at', 'finished_at', 'cache')
+
+    def __init__(self, key, cache):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cache = cache
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    @property
+    def elapsed(self):
+        return (self.finished_at or time.time()) - (self.started_at or self.submitted_at)
+
+
+class JobRunner:
+    def __init__(self, max_workers=4, result_ttl=600, max_jobs=1000):
+        self.result_ttl = result_ttl
+        self.max_jobs = max_jobs
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sat-job')
+        self._jobs = OrderedDict()
+        self._by_key = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.shared = 0
+
+    def submit(self, key, fn, *args, cache=False, **kwargs):
+        """Start fn(*args, **kwargs) in the background and return its job id"""
+        with self._lock:
+            self._prune()
+            existing = self._jobs.get(self._by_key.get(key))
+            if existing is not None and (not existing.finished or (existing.cache and existing.status == DONE)):
+                self.shared += 1
+                return existing.id
+
+            job = Job(key, cache)
+            self._jobs[job.id] = job
+            self._by_key[key] = job.id
+            self.submitted += 1
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job, fn, args, kwargs):
+        job.started_at = time.time()
+        job.status = RUNNING
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = DONE
+        except Exception as e:
+            print(f"Background job {job.key} error: {e}")
+            job.error = str(e)
+            job.status = FAILED
+        job.finished_at = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        now = time.time()
+        while self._jobs:
+            job_id, job = next(iter(self._jobs.items()))
+            expired = job.finished and now - job.finished_at > self.result_ttl
+            if not expired and len(self._jobs) <= self.max_jobs:
+                break
+            if not job.finished:
+                # Never drop a running job; move it to the back and stop pruning
+                self._jobs.move_to_end(job_id)
+                break
+            del self._jobs[job_id]
+            if self._by_key.get(job.key) == job_id:
+                del self._by_key[job.key]
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            'submitted': self.submitted,
+            'shared': self.shared,
+            'pending': statuses.count(PENDING),
+            'running': statuses.count(RUNNING),
+            'done': statuses.count(DONE),
+            'failed': statuses.count(FAILED)
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,211 @@
+"""Latency histograms with a Prometheus text exporter.
+
+Disabled unless SAT_METRICS=1, in which case a timed call costs a clock read
+and a bisect. Set SAT_METRICS_PORT to serve /metrics over HTTP and/or
+SAT_METRICS_FILE to write the same text periodically (e.g. for the
+node_exporter textfile collector).
+"""
+import functools
+import inspect
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+ANSWER_TIME_BUCKETS = (2.0, 5.0, 10.0, 15.0, 20.0, 30.0, 45.0, 60.0, 90.0, 120.0, 300.0)
+
+HELP = {
+    'sat_operation_seconds': "Duration of SATPrep and generator operations",
+    'sat_db_query_seconds': "Duration of SATDatabase queries",
+    'sat_command_seconds': "Duration of Discord bot commands",
+    'sat_answer_time_seconds': "Time students take to answer a question"
+}
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside its bucket, like histogram_quantile()"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+            if index < len(self.buckets):
+                lower = self.buckets[index]
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, metric, label, value, buckets=LATENCY_BUCKETS):
+        key = (metric, label, value)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(buckets))
+        return histogram
+
+    def observe(self, metric, label, value, seconds, buckets=LATENCY_BUCKETS):
+        if self.enabled:
+            self.histogram(metric, label, value, buckets).observe(seconds)
+
+    def summary(self):
+        """p50/p99 per series, for logs and benchmarks"""
+        return {
+            f"{metric}{{{label}=\"{value}\"}}": {
+                'count': histogram.count,
+                'p50': histogram.quantile(0.5),
+                'p99': histogram.quantile(0.99)
+            }
+            for (metric, label, value), histogram in sorted(self._histograms.items())
+        }
+
+    def render_prometheus(self):
+        lines = []
+        current = None
+        for (metric, label, value), histogram in sorted(self._histograms.items()):
+            if metric != current:
+                current = metric
+                lines.append(f"# HELP {metric} {HELP.get(metric, metric)}")
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+                cumulative += bucket_count
+                lines.append(f'{metric}_bucket{{{label}="{value}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{label}="{value}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{metric}_sum{{{label}="{value}"}} {histogram.sum}')
+            lines.append(f'{metric}_count{{{label}="{value}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+
+registry = MetricsRegistry(enabled=os.getenv('SAT_METRICS', '0') == '1')
+
+
+def timed(metric, label='operation'):
+    """Record the wrapped call's duration as metric{label="<function name>"}.
+
+    For generator functions the time spent producing items is summed and
+    observed once the generator finishes or is closed.
+    """
+    def decorator(fn):
+        value = fn.__name__
+
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def generator_wrapper(*args, **kwargs):
+                if not registry.enabled:
+                    yield from fn(*args, **kwargs)
+                    return
+                elapsed = 0.0
+                items = fn(*args, **kwargs)
+                try:
+                    while True:
+                        started = time.perf_counter()
+                        try:
+                            item = next(items)
+                        except StopIteration:
+                            return
+                        finally:
+                            elapsed += time.perf_counter() - started
+                        yield item
+                finally:
+                    items.close()
+                    registry.histogram(metric, label, value).observe(elapsed)
+            return generator_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                registry.histogram(metric, label, value).observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_exporter_started = False
+_exporter_lock = threading.Lock()
+
+
+def start_exporter():
+    """Start the HTTP and/or textfile exporter once per process, as configured by env"""
+    global _exporter_started
+    if not registry.enabled:
+        return
+    with _exporter_lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+
+    port = os.getenv('SAT_METRICS_PORT')
+    if port:
+        server = ThreadingHTTPServer(('0.0.0.0', int(port)), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    path = os.getenv('SAT_METRICS_FILE')
+    if path:
+        interval = float(os.getenv('SAT_METRICS_INTERVAL', 15))
+
+        def write_forever():
+            while True:
+                time.sleep(interval)
+                try:
+                    registry.write_textfile(path)
+                except OSError as e:
+                    print(f"Metrics export error: {e}")
+        threading.Thread(target=write_forever, daemon=True).start()
@@ -0,0 +1,165 @@
+"""Learner profiles backed by the learner_profiles table.
+
+Profiles are read and written one user at a time and the hot ones are kept
+in an in-memory LRU, so lookups cost O(1) regardless of how many students
+exist. ``migrate_json`` streams the legacy user_models.json into the table
+without loading the whole file.
+
+    python profile_store.py migrate user_models.json
+"""
+import argparse
+import json
+import threading
+from collections import OrderedDict
+
+from storage import create_storage
+
+PROFILE_FIELDS = ('strengths', 'weaknesses', 'preferences', 'learning_style', 'pace', 'goals')
+
+
+def empty_profile():
+    return {
+        'strengths': [],
+        'weaknesses': [],
+        'preferences': [],
+        'learning_style': None,
+        'pace': 'medium',
+        'goals': []
+    }
+
+
+def iter_json_object(path, chunk_size=64 * 1024):
+    """Yield (key, value) pairs of a top-level JSON object, reading the file in chunks"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        position = 0
+        eof = False
+
+        def fill():
+            nonlocal buffer, position, eof
+            chunk = f.read(chunk_size)
+            buffer = buffer[position:] + chunk
+            position = 0
+            eof = not chunk
+
+        def skip(chars=' \t\r\n'):
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position] in chars:
+                    position += 1
+                if position < len(buffer) or eof:
+                    return
+                fill()
+
+        def decode():
+            nonlocal position
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, position)
+                    # A value that ends exactly at the buffer end may be cut short
+                    if end < len(buffer) or eof:
+                        position = end
+                        return value
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                fill()
+
+        fill()
+        skip()
+        if buffer[position:position + 1] != '{':
+            raise ValueError(f"{path} does not contain a JSON object")
+        position += 1
+        while True:
+            skip(' \t\r\n,')
+            if position >= len(buffer):
+                raise ValueError(f"{path} ends before the closing brace")
+            if buffer[position] == '}':
+                return
+            key = decode()
+            skip()
+            if buffer[position:position + 1] != ':':
+                raise ValueError(f"Expected ':' after key {key!r} in {path}")
+            position += 1
+            skip()
+            yield key, decode()
+
+
+class ProfileStore:
+    def __init__(self, db, max_profiles=5000):
+        self.db = db
+        self.max_profiles = max_profiles
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_key):
+        """Profile for a user (Discord id or Streamlit session id); an empty profile if none is stored"""
+        with self._lock:
+            profile = self._profiles.get(user_key)
+            if profile is not None:
+                self._profiles.move_to_end(user_key)
+                self.hits += 1
+                return profile
+            self.misses += 1
+
+        profile = self.db.get_learner_profile(user_key) or empty_profile()
+        self._remember(user_key, profile)
+        return profile
+
+    def update(self, user_key, **fields):
+        """Merge the given fields into the stored profile and write it back"""
+        unknown = set(fields) - set(PROFILE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown profile fields: {', '.join(sorted(unknown))}")
+        profile = dict(self.get(user_key), **fields)
+        self.db.save_learner_profiles([(user_key, profile)])
+        self._remember(user_key, profile)
+        return profile
+
+    def _remember(self, user_key, profile):
+        with self._lock:
+            self._profiles[user_key] = profile
+            self._profiles.move_to_end(user_key)
+            if len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    def migrate_json(self, path, batch_size=1000):
+        """Copy every profile in a user_models.json-style file into the database; safe to re-run"""
+        migrated = 0
+        batch = []
+        for user_key, record in iter_json_object(path):
+            profile = empty_profile()
+            profile.update({field: record[field] for field in PROFILE_FIELDS if field in record})
+            batch.append((user_key, profile))
+            if len(batch) >= batch_size:
+                self.db.save_learner_profiles(batch)
+                migrated += len(batch)
+                batch = []
+        if batch:
+            self.db.save_learner_profiles(batch)
+            migrated += len(batch)
+        with self._lock:
+            self._profiles.clear()
+        return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage learner profiles")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    migrate_parser = subparsers.add_parser('migrate', help="Stream profiles from user_models.json into the database")
+    migrate_parser.add_argument('path', nargs='?', default='user_models.json')
+    migrate_parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    db = create_storage()
+    try:
+        print({'profiles': ProfileStore(db).migrate_json(args.path, args.batch_size)})
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
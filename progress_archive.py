@@ -0,0 +1,182 @@
+"""Compaction of old answer history into daily summaries and archive files.
+
+Answers older than the horizon are rolled up into progress_daily_summary
+(one row per user, section and UTC day), written to a gzipped JSON Lines
+archive file and deleted from user_progress, so the hot table only holds
+recent answers while stats, trends and score forecasts still see the whole
+history through the summaries.
+
+Archive files are named by the days and first row id they cover, so a
+query for a date range only opens the files that can match:
+
+    python progress_archive.py compact --horizon-days 90
+    python progress_archive.py query --user 123456789 --since 2024-01-01
+
+Each batch is archived before its database transaction commits; if a run
+dies in between, the next run archives those rows again and queries skip
+the duplicate ids.
+"""
+import argparse
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from seen_set import SeenQuestions
+
+ARCHIVE_FIELDS = ['id', 'user_id', 'question_id', 'is_correct', 'time_taken', 'timestamp', 'section', 'difficulty']
+
+
+def horizon_cutoff(horizon_days, now=None):
+    """Start of the UTC day ``horizon_days`` ago, so whole days are compacted together"""
+    now = now or datetime.now(timezone.utc)
+    day = (now - timedelta(days=horizon_days)).date()
+    return f"{day.isoformat()} 00:00:00"
+
+
+def summarize(rows):
+    """Daily summary rows for compact_progress() from get_progress_rows_before() rows"""
+    totals = {}
+    for _, user_id, _, is_correct, time_taken, timestamp, section, difficulty in rows:
+        key = (user_id, section, timestamp[:10])
+        total = totals.setdefault(key, [0, 0, 0.0, 0, 0])
+        total[0] += 1
+        total[1] += 1 if is_correct else 0
+        total[2] += time_taken or 0
+        total[3] += difficulty
+        total[4] += difficulty if is_correct else 0
+    return [key + tuple(total) for key, total in totals.items()]
+
+
+def archive_name(rows):
+    days = sorted(row[5][:10] for row in rows)
+    return f"progress-{days[0]}_{days[-1]}-{rows[0][0]:012d}.jsonl.gz"
+
+
+def write_archive(directory, rows):
+    """Write one batch of raw rows to a new archive file and return its path"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, archive_name(rows))
+    partial = f"{path}.partial"
+    with gzip.open(partial, 'wt', encoding='utf-8') as f:
+        for row in rows:
+            record = dict(zip(ARCHIVE_FIELDS, row))
+            record['is_correct'] = bool(record['is_correct'])
+            f.write(json.dumps(record))
+            f.write('\n')
+    with open(partial, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(partial, path)
+    return path
+
+
+def archive_files(directory, since=None, until=None):
+    """Archive files whose day range overlaps [since, until] ('YYYY-MM-DD'), oldest first"""
+    try:
+        names = sorted(name for name in os.listdir(directory)
+                       if name.startswith('progress-') and name.endswith('.jsonl.gz'))
+    except FileNotFoundError:
+        return []
+    files = []
+    for name in names:
+        # progress-<first day>_<last day>-<first id>.jsonl.gz
+        first_day, _, last_day = name[len('progress-'):len('progress-') + 21].partition('_')
+        if (since and last_day < since) or (until and first_day > until):
+            continue
+        files.append(os.path.join(directory, name))
+    return files
+
+
+def query_archive(directory, user_id=None, since=None, until=None):
+    """Stream archived answers as dicts, optionally for one internal user id and a day range"""
+    seen_ids = set()
+    for path in archive_files(directory, since, until):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if user_id is not None and record['user_id'] != user_id:
+                    continue
+                day = record['timestamp'][:10]
+                if (since and day < since) or (until and day > until):
+                    continue
+                if record['id'] in seen_ids:
+                    continue
+                seen_ids.add(record['id'])
+                yield record
+
+
+class ProgressCompactor:
+    def __init__(self, db, directory='archive', horizon_days=90, batch_size=50000):
+        self.db = db
+        self.directory = directory
+        self.horizon_days = horizon_days
+        self.batch_size = batch_size
+        # Seen bitmaps are built from user_progress, so persist them before the rows go
+        self.seen = SeenQuestions(db, max_users=1000)
+
+    def run(self, now=None):
+        cutoff = horizon_cutoff(self.horizon_days, now)
+        started = time.perf_counter()
+        summary = {'cutoff': cutoff, 'rows': 0, 'summaries': 0, 'files': []}
+        while True:
+            rows = self.db.get_progress_rows_before(cutoff, self.batch_size)
+            if not rows:
+                break
+            for user_id in {row[1] for row in rows}:
+                self.seen.get(user_id)
+            path = write_archive(self.directory, rows)
+            summaries = summarize(rows)
+            self.db.compact_progress(summaries, [row[0] for row in rows])
+            summary['rows'] += len(rows)
+            summary['summaries'] += len(summaries)
+            summary['files'].append(os.path.basename(path))
+            print(f"Compacted {len(rows)} answers up to id {rows[-1][0]} into {os.path.basename(path)}")
+        elapsed = time.perf_counter() - started
+        summary['seconds'] = round(elapsed, 2)
+        summary['rows_per_second'] = round(summary['rows'] / elapsed, 1) if elapsed else None
+        return summary
+
+
+def create_progress_compactor(db):
+    return ProgressCompactor(
+        db,
+        directory=os.getenv('PROGRESS_ARCHIVE_DIR', 'archive'),
+        horizon_days=int(os.getenv('PROGRESS_HORIZON_DAYS', 90)),
+        batch_size=int(os.getenv('PROGRESS_COMPACT_BATCH', 50000))
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact and query answer history")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    compact_parser = subparsers.add_parser('compact', help="Summarize, archive and delete answers past the horizon")
+    compact_parser.add_argument('--horizon-days', type=int, help="Default: PROGRESS_HORIZON_DAYS or 90")
+    query_parser = subparsers.add_parser('query', help="Print archived answers as JSON Lines")
+    query_parser.add_argument('--user', help="Discord id (or Streamlit user key) to filter on")
+    query_parser.add_argument('--since', help="First day, YYYY-MM-DD")
+    query_parser.add_argument('--until', help="Last day, YYYY-MM-DD")
+    args = parser.parse_args()
+
+    from storage import create_storage
+
+    db = create_storage()
+    try:
+        compactor = create_progress_compactor(db)
+        if args.command == 'compact':
+            if args.horizon_days is not None:
+                compactor.horizon_days = args.horizon_days
+            print(compactor.run())
+        else:
+            user_id = db.get_user_id(args.user) if args.user else None
+            if args.user and user_id is None:
+                print(f"Unknown user: {args.user}")
+                return
+            for record in query_archive(compactor.directory, user_id, args.since, args.until):
+                print(json.dumps(record))
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
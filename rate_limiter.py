@@ -0,0 +1,235 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+
+from database import SATDatabase
+
+# Tokens refill at *_rate per second up to *_burst
+RateLimit = namedtuple('RateLimit', ['user_rate', 'user_burst', 'guild_rate', 'guild_burst'])
+
+DEFAULT_LIMITS = {
+    'newq': RateLimit(user_rate=1 / 30, user_burst=3, guild_rate=1 / 3, guild_burst=10),
+    'explain': RateLimit(user_rate=1 / 10, user_burst=3, guild_rate=1, guild_burst=15),
+    'translate': RateLimit(user_rate=1 / 3, user_burst=5, guild_rate=2, guild_burst=20)
+}
+
+
+def refill(tokens, updated_at, now, rate, capacity):
+    return min(capacity, tokens + max(0.0, now - updated_at) * rate)
+
+
+class InMemoryBucketStore:
+    """Token buckets kept in process memory"""
+
+    shared = False
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, capacity, cost=1, now=None):
+        """Take ``cost`` tokens; returns 0 on success or the seconds to wait"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = refill(tokens, updated_at, now, rate, capacity)
+            if tokens >= cost:
+                self._buckets[key] = (min(capacity, tokens - cost), now)
+                return 0
+            self._buckets[key] = (tokens, now)
+            return (cost - tokens) / rate
+
+
+class SQLiteBucketStore:
+    """Token buckets stored in the bot database, shared by every shard process.
+
+    The store keeps its own connection with a short lock timeout: when other
+    shards hold the write lock for longer, the request is charged against a
+    process-local bucket instead of waiting.
+    """
+
+    shared = True
+
+    def __init__(self, db, lock_timeout=0.2):
+        self.conn = sqlite3.connect(db.path, timeout=lock_timeout, check_same_thread=False,
+                                    isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+            key TEXT PRIMARY KEY,
+            tokens REAL,
+            updated_at REAL
+        )
+        ''')
+        self._lock = threading.Lock()
+        self.fallback = InMemoryBucketStore()
+
+    def take(self, key, rate, capacity, cost=1, now=None):
+        """Take ``cost`` tokens; returns 0 on success or the seconds to wait"""
+        now = now if now is not None else time.time()
+        try:
+            with self._lock:
+                return self._take(key, rate, capacity, cost, now)
+        except sqlite3.OperationalError:
+            # Database locked past the timeout: limit this process on its own for now
+            return self.fallback.take(key, rate, capacity, cost, now)
+
+    def _take(self, key, rate, capacity, cost, now):
+        conn = self.conn
+        # BEGIN IMMEDIATE takes the write lock up front so read-modify-write is atomic across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated_at = row if row else (capacity, now)
+            tokens = refill(tokens, updated_at, now, rate, capacity)
+            if tokens >= cost:
+                tokens = min(capacity, tokens - cost)
+                retry_after = 0
+            else:
+                retry_after = (cost - tokens) / rate
+            conn.execute('''
+            INSERT INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at
+            ''', (key, tokens, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return retry_after
+
+
+class FairSemaphore:
+    """Concurrency cap that hands free slots to waiting users round-robin.
+
+    A user with many queued requests gets one slot per turn, so a single
+    light request never waits behind a heavy user's whole backlog.
+    """
+
+    def __init__(self, limit, max_queued_per_user=2):
+        self.limit = limit
+        self.max_queued_per_user = max_queued_per_user
+        self.active = 0
+        self._waiters = OrderedDict()
+
+    def queued(self, user_id=None):
+        if user_id is None:
+            return sum(len(queue) for queue in self._waiters.values())
+        return len(self._waiters.get(user_id, ()))
+
+    def can_queue(self, user_id):
+        return self.queued(user_id) < self.max_queued_per_user
+
+    async def acquire(self, user_id):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(user_id, deque()).append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            queue = self._waiters.get(user_id)
+            if queue and waiter in queue:
+                queue.remove(waiter)
+                if not queue:
+                    del self._waiters[user_id]
+            elif waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled; pass it on
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            user_id, queue = next(iter(self._waiters.items()))
+            waiter = queue.popleft()
+            # Move the user to the back of the line
+            del self._waiters[user_id]
+            if queue:
+                self._waiters[user_id] = queue
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def slot(self, user_id):
+        return _Slot(self, user_id)
+
+
+class _Slot:
+    def __init__(self, semaphore, user_id):
+        self.semaphore = semaphore
+        self.user_id = user_id
+
+    async def __aenter__(self):
+        await self.semaphore.acquire(self.user_id)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.semaphore.release()
+
+
+class AdmissionController:
+    """Per-user and per-guild token buckets plus a fair global concurrency cap"""
+
+    def __init__(self, store=None, limits=None, max_concurrency=4, max_queued_per_user=2):
+        self.store = store or InMemoryBucketStore()
+        self.limits = limits or DEFAULT_LIMITS
+        self.semaphore = FairSemaphore(max_concurrency, max_queued_per_user)
+
+    def check(self, command, user_id, guild_id=None, now=None):
+        """Charge one request; returns 0 if admitted or the seconds until it would be"""
+        limit = self.limits.get(command)
+        if limit is None:
+            return 0
+        if not self.semaphore.can_queue(user_id):
+            return 1 / limit.user_rate
+        return self._charge(command, limit, user_id, guild_id, now)
+
+    async def check_async(self, command, user_id, guild_id=None):
+        """check() for the event loop; shared stores are charged from a worker thread"""
+        limit = self.limits.get(command)
+        if limit is None:
+            return 0
+        if not self.semaphore.can_queue(user_id):
+            return 1 / limit.user_rate
+        if self.store.shared:
+            return await asyncio.to_thread(self._charge, command, limit, user_id, guild_id)
+        return self._charge(command, limit, user_id, guild_id)
+
+    def _charge(self, command, limit, user_id, guild_id, now=None):
+        user_key = f"{command}:user:{user_id}"
+        retry_after = self.store.take(user_key, limit.user_rate, limit.user_burst, now=now)
+        if retry_after or guild_id is None:
+            return retry_after
+
+        retry_after = self.store.take(f"{command}:guild:{guild_id}", limit.guild_rate,
+                                      limit.guild_burst, now=now)
+        if retry_after:
+            # Give the user's token back; the request was not admitted
+            self.store.take(user_key, limit.user_rate, limit.user_burst, cost=-1, now=now)
+        return retry_after
+
+    def slot(self, user_id):
+        return self.semaphore.slot(user_id)
+
+
+def create_admission_controller(db=None):
+    """Build the controller from RATE_LIMIT_BACKEND / RATE_LIMIT_LOCK_TIMEOUT / AI_MAX_CONCURRENCY"""
+    backend = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+    if backend == 'sqlite' and isinstance(db, SATDatabase):
+        store = SQLiteBucketStore(db, float(os.getenv('RATE_LIMIT_LOCK_TIMEOUT', 0.2)))
+    elif backend == 'sqlite':
+        print("RATE_LIMIT_BACKEND=sqlite needs the SQLite database; using in-memory buckets")
+        store = InMemoryBucketStore()
+    else:
+        store = InMemoryBucketStore()
+    return AdmissionController(
+        store=store,
+        max_concurrency=int(os.getenv('AI_MAX_CONCURRENCY', 4)),
+        max_queued_per_user=int(os.getenv('MAX_QUEUED_PER_USER', 2))
+    )
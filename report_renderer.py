@@ -0,0 +1,166 @@
+"""Chart rendering for bot reports, off the event loop.
+
+Charts are drawn with matplotlib in a process pool so a burst of !report
+calls never blocks the gateway heartbeat. The pool uses the forkserver
+start method (spawn where that is unavailable): forking the bot itself
+would copy locks held by its other threads into the workers. The fork
+server preloads only this module; workers still import the main script,
+so the bot builds its connections in main() rather than at import time.
+
+Rendered PNG bytes are cached per (user, report type, chart parameters,
+display name) together with the data version they were drawn from; while
+the user's answers are unchanged the cached bytes are sent as they are,
+and concurrent requests for the same chart share one render.
+"""
+import asyncio
+import io
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _figure():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _png(plt, fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def render_report(data):
+    """Section accuracy bars and answer counts from get_user_stats()['sections']"""
+    plt = _figure()
+    sections = [row[0].capitalize() for row in data['sections']]
+    totals = [row[1] for row in data['sections']]
+    accuracies = [(row[2] or 0) / row[1] * 100 if row[1] else 0 for row in data['sections']]
+
+    fig, (accuracy_ax, count_ax) = plt.subplots(1, 2, figsize=(10, 4))
+    accuracy_ax.bar(sections, accuracies, color='#3498db')
+    accuracy_ax.set_ylim(0, 100)
+    accuracy_ax.set_ylabel('Accuracy (%)')
+    accuracy_ax.set_title('Accuracy by section')
+    count_ax.bar(sections, totals, color='#2ecc71')
+    count_ax.set_ylabel('Questions answered')
+    count_ax.set_title('Practice volume')
+    fig.suptitle(f"Performance report - {data['name']}")
+    return _png(plt, fig)
+
+
+def render_trends(data):
+    """Daily accuracy line with answer volume bars from get_daily_progress() rows"""
+    plt = _figure()
+    days = [row[0] for row in data['days']]
+    totals = [row[1] for row in data['days']]
+    accuracies = [(row[2] or 0) / row[1] * 100 if row[1] else 0 for row in data['days']]
+
+    fig, volume_ax = plt.subplots(figsize=(10, 4))
+    volume_ax.bar(days, totals, color='#bdc3c7')
+    volume_ax.set_ylabel('Questions answered')
+    accuracy_ax = volume_ax.twinx()
+    accuracy_ax.plot(days, accuracies, color='#e74c3c', marker='o')
+    accuracy_ax.set_ylim(0, 100)
+    accuracy_ax.set_ylabel('Accuracy (%)')
+    volume_ax.tick_params(axis='x', rotation=45)
+    fig.suptitle(f"Performance trends - {data['name']}")
+    return _png(plt, fig)
+
+
+RENDERERS = {
+    'report': render_report,
+    'trends': render_trends
+}
+
+
+class ReportRenderer:
+    def __init__(self, max_workers=2, max_entries=1000):
+        self.max_workers = max_workers
+        self.max_entries = max_entries
+        self._pool = None
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.renders = 0
+        self.shared = 0
+
+    def _executor(self):
+        if self._pool is None:
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+                # The fork server loads only this module instead of the bot's main script
+                context.set_forkserver_preload([__name__])
+            else:
+                context = multiprocessing.get_context('spawn')
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+        return self._pool
+
+    def cached(self, key, version):
+        """Cached PNG bytes for this chart key and data version, or None"""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    async def render(self, user_id, report_type, version, data, params=()):
+        """PNG bytes of the chart; rendered in the pool only if this version is not cached.
+
+        ``params`` are the chart's own options (e.g. the trends window); they and
+        the display name drawn in the title are part of the cache key.
+        """
+        key = (user_id, report_type, tuple(params), data.get('name'))
+        png = self.cached(key, version)
+        if png is not None:
+            return png
+
+        inflight_key = key + (version,)
+        future = self._inflight.get(inflight_key)
+        if future is not None:
+            self.shared += 1
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor(), RENDERERS[report_type], data)
+        self._inflight[inflight_key] = future
+        try:
+            png = await asyncio.shield(future)
+        finally:
+            self._inflight.pop(inflight_key, None)
+        self.renders += 1
+
+        with self._lock:
+            self._cache[key] = (version, png)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return png
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'renders': self.renders,
+            'shared': self.shared,
+            'entries': len(self._cache),
+            'bytes': sum(len(entry[1]) for entry in self._cache.values())
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+
+
+def create_report_renderer():
+    return ReportRenderer(
+        max_workers=int(os.getenv('REPORT_RENDER_WORKERS', 2)),
+        max_entries=int(os.getenv('REPORT_CACHE_ENTRIES', 1000))
+    )
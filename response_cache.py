@@ -0,0 +1,208 @@
+"""Content-addressed cache of LLM responses.
+
+Entries are keyed by a hash of (model, messages, temperature, max_tokens),
+stored in a small SQLite file, expire after a TTL and are evicted least
+recently used first once the store grows past its size budget. The total
+size and entry count are kept in a one-row cache_meta table updated in the
+same transaction as every insert and delete, so checking the budget never
+scans the responses.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def cache_key(model, messages, temperature, max_tokens):
+    payload = json.dumps([model, messages, temperature, max_tokens], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path='llm_cache.db', max_bytes=64 * 1024 * 1024, ttl=7 * 24 * 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.saved_prompt_tokens = 0
+        self.saved_completion_tokens = 0
+        self.saved_seconds = 0.0
+
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            response TEXT,
+            size INTEGER,
+            prompt_tokens INTEGER,
+            completion_tokens INTEGER,
+            latency REAL,
+            expires_at REAL,
+            last_used REAL
+        )
+        ''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS cache_meta (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            total_bytes INTEGER,
+            entries INTEGER
+        )
+        ''')
+        # A cache file from before cache_meta existed is measured once, here
+        self.conn.execute('''
+        INSERT OR IGNORE INTO cache_meta (id, total_bytes, entries)
+        SELECT 0, COALESCE(SUM(size), 0), COUNT(*) FROM responses
+        ''')
+        self.conn.commit()
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """Return (text, prompt_tokens, completion_tokens) for a live entry, else None"""
+        now = time.time()
+        row = self.conn.execute(
+            "SELECT response, prompt_tokens, completion_tokens, latency, expires_at FROM responses WHERE key = ?",
+            (key,)
+        ).fetchone()
+        if row is None or row[4] < now:
+            if row is not None:
+                self.delete(key)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        self.conn.commit()
+        with self._lock:
+            self.hits += 1
+            self.saved_prompt_tokens += row[1]
+            self.saved_completion_tokens += row[2]
+            self.saved_seconds += row[3]
+        return row[0], row[1], row[2]
+
+    def put(self, key, text, prompt_tokens, completion_tokens, latency, ttl=None):
+        now = time.time()
+        size = len(text.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        conn = self.conn
+        # Every process sharing the file writes to it; taking the write lock first keeps cache_meta exact
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            old = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute('''
+            INSERT OR REPLACE INTO responses
+                (key, response, size, prompt_tokens, completion_tokens, latency, expires_at, last_used)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (key, text, size, prompt_tokens, completion_tokens, latency,
+                  now + (ttl if ttl is not None else self.ttl), now))
+            self._adjust(size - (old[0] if old else 0), 0 if old else 1)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        if self.total_bytes() > self.max_bytes:
+            self._evict()
+
+    def record_bypass(self):
+        with self._lock:
+            self.bypassed += 1
+
+    def delete(self, key):
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._adjust(-row[0], -1)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def total_bytes(self):
+        return self.conn.execute("SELECT total_bytes FROM cache_meta").fetchone()[0]
+
+    def _adjust(self, size, entries):
+        self.conn.execute(
+            "UPDATE cache_meta SET total_bytes = total_bytes + ?, entries = entries + ?", (size, entries)
+        )
+
+    def _evict(self):
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Expired entries go first, then least recently used ones down to 90% of the budget
+            now = time.time()
+            expired_bytes, expired = conn.execute(
+                "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM responses WHERE expires_at < ?", (now,)
+            ).fetchone()
+            conn.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+            self._adjust(-expired_bytes, -expired)
+            target = int(self.max_bytes * 0.9)
+            total = self.total_bytes()
+            while total > target:
+                rows = conn.execute(
+                    "SELECT key, size FROM responses ORDER BY last_used LIMIT 100"
+                ).fetchall()
+                if not rows:
+                    break
+                # Stop at the target rather than clearing the whole batch
+                victims = []
+                for key, size in rows:
+                    if total <= target:
+                        break
+                    victims.append((key,))
+                    total -= size
+                conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+                self._adjust(total - self.total_bytes(), -len(victims))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        total_bytes, entries = self.conn.execute("SELECT total_bytes, entries FROM cache_meta").fetchone()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'saved_prompt_tokens': self.saved_prompt_tokens,
+            'saved_completion_tokens': self.saved_completion_tokens,
+            'saved_seconds': round(self.saved_seconds, 3),
+            'entries': entries,
+            'bytes': total_bytes
+        }
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def create_response_cache():
+    """Build the cache from LLM_CACHE* env vars; returns None when LLM_CACHE=0"""
+    if os.getenv('LLM_CACHE', '1') == '0':
+        return None
+    return ResponseCache(
+        path=os.getenv('LLM_CACHE_PATH', 'llm_cache.db'),
+        max_bytes=int(float(os.getenv('LLM_CACHE_MAX_MB', 64)) * 1024 * 1024),
+        ttl=float(os.getenv('LLM_CACHE_TTL_HOURS', 168)) * 3600
+    )
@@ -1,28 +1,53 @@
 import json
 import random
 import time
-from deep_translator import GoogleTranslator
-from database import SATDatabase
+from collections import OrderedDict
+from storage import create_storage
 from ai_generator import AIQuestionGenerator
+from backends import create_translation_backend
+from event_log import create_event_log
+from metrics import timed
+from profile_store import ProfileStore
+from seen_set import SeenQuestions
+from spaced_repetition import ReviewState, answer_quality, schedule, next_due
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
 
+DIFFICULTY_LEVELS = {'easy': 1, 'medium': 2, 'hard': 3}
+
+
+def parse_difficulty_topic(difficulty=None, topic=None):
+    """(difficulty level or None, topic or None) from a command's optional difficulty word and topic.
+
+    A first word that is not a difficulty starts the topic, so ``!pyq math algebra``
+    asks for algebra questions of any difficulty.
+    """
+    if difficulty and difficulty.lower() in DIFFICULTY_LEVELS:
+        return DIFFICULTY_LEVELS[difficulty.lower()], topic or None
+    return None, ' '.join(word for word in (difficulty, topic) if word) or None
+
 class SATPrep:
-    def __init__(self):
-        self.db = SATDatabase()
-        self.ai_generator = AIQuestionGenerator()
+    def __init__(self, db=None, ai_generator=None, translator=None, events=None):
+        self.db = db or create_storage()
+        self.ai_generator = ai_generator or AIQuestionGenerator()
+        self.translator = translator or create_translation_backend()
         self.translation_cache = {}
+        self.passage_cache = OrderedDict()
+        self.seen = SeenQuestions(self.db)
+        self.profiles = ProfileStore(self.db)
+        if events is None:
+            events = create_event_log()
+        # events=False turns the answer event log off for this instance
+        self.events = events or None
         
         # Load initial questions from JSON if database is empty
         if self._is_database_empty():
             self._load_initial_questions()
     
     def _is_database_empty(self):
-        cursor = self.db.conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM questions")
-        return cursor.fetchone()[0] == 0
+        return self.db.count_questions() == 0
     
     def _load_initial_questions(self):
         with open('questions.json', 'r', encoding='utf-8') as f:
@@ -39,46 +64,60 @@ class SATPrep:
                     answer=q['answer'],
                     explanation_en=q['explanation']['en'],
                     explanation_ar=q['explanation']['ar'],
-                    difficulty=q.get('difficulty', 2)
+                    difficulty=q.get('difficulty', 2),
+                    passage_en=q.get('passage', {}).get('en'),
+                    passage_ar=q.get('passage', {}).get('ar')
                 )
     
-    def get_pyq(self, section, difficulty=None, user_id=None):
+    @timed('sat_operation_seconds')
+    def get_pyq(self, section, difficulty=None, user_id=None, topic=None):
         """Get a previous year question with adaptive difficulty"""
-        cursor = self.db.conn.cursor()
-        
         # If user_id is provided, get their weak areas
-        if user_id:
-            weak_areas = self.db.get_weak_areas(user_id)
+        user_key = self.db.get_user_id(user_id) if user_id else None
+        if user_key and not topic:
+            weak_areas = self.db.get_weak_areas(user_key)
             if weak_areas:
                 # Prioritize questions from weak areas
                 weak_sections = [area[0] for area in weak_areas if area[3] < 70]  # Less than 70% accuracy
                 if weak_sections:
                     section = random.choice(weak_sections)
         
-        # Build query based on parameters
-        query = "SELECT * FROM questions WHERE section = ?"
-        params = [section]
-        
-        if difficulty:
-            query += " AND difficulty = ?"
-            params.append(difficulty)
-        
-        cursor.execute(query, params)
-        questions = cursor.fetchall()
+        # Pick from the candidate ids, then load only the chosen row
+        if topic:
+            candidates = [q['id'] for q in self.db.search_questions(topic, section, difficulty, limit=200)]
+        else:
+            candidates = self.db.get_question_ids(section, difficulty)
         
-        if not questions:
+        if not candidates:
             return None
         
-        # Convert to dict
-        columns = [desc[0] for desc in cursor.description]
-        question = dict(zip(columns, random.choice(questions)))
-        
-        # Parse JSON fields
-        question['options_en'] = json.loads(question['options_en'])
-        question['options_ar'] = json.loads(question['options_ar'])
-        
-        return question
+        # Prefer questions the user has not answered yet
+        if user_key:
+            return self.db.get_question(self.seen.pick_unseen(user_key, candidates, random))
+        return self.db.get_question(random.choice(candidates))
+    
+    @timed('sat_operation_seconds')
+    def search_questions(self, query, section=None, difficulty=None, limit=10):
+        """Full-text search over the bank, best matches first"""
+        return self.db.search_questions(query, section, difficulty, limit)
+    
+    def get_passage(self, passage_id, lang='en'):
+        """Fetch a question's passage only when it is about to be shown"""
+        if not passage_id:
+            return None
+        passage = self.passage_cache.get(passage_id)
+        if passage is None:
+            passage = self.db.get_passage(passage_id)
+            if passage is None:
+                return None
+            self.passage_cache[passage_id] = passage
+            if len(self.passage_cache) > 256:
+                self.passage_cache.popitem(last=False)
+        else:
+            self.passage_cache.move_to_end(passage_id)
+        return passage[1] if lang == 'ar' else passage[0]
     
+    @timed('sat_operation_seconds')
     def generate_new_question(self, section, difficulty=2, topic=None):
         """Generate a new question using AI"""
         question_data = self.ai_generator.generate_question(section, difficulty, topic)
@@ -102,22 +141,27 @@ class SATPrep:
             answer=question_data['answer'],
             explanation_en=question_data['explanation'],
             explanation_ar=question_data.get('explanation_ar', ''),
-            difficulty=question_data['difficulty']
+            difficulty=question_data['difficulty'],
+            passage_en=question_data.get('passage') or None,
+            passage_ar=question_data.get('passage_ar', ''),
+            topic=topic
         )
         
         question_data['id'] = question_id
         return question_data
     
+    @timed('sat_operation_seconds')
     def get_adaptive_question(self, user_id, section):
         """Get an adaptive question based on user performance"""
         # Get user stats
-        stats = self.db.get_user_stats(user_id)
+        user_key = self.db.get_user_id(user_id)
+        stats = self.db.get_user_stats(user_key) if user_key else None
         if not stats:
             return self.get_pyq(section)
         
         # Calculate average accuracy
-        total_correct = sum(s[1] for s in stats['sections'])
-        total_questions = sum(s[0] for s in stats['sections'])
+        total_correct = sum(s[2] or 0 for s in stats['sections'])
+        total_questions = sum(s[1] for s in stats['sections'])
         avg_accuracy = (total_correct / total_questions) * 100 if total_questions > 0 else 50
         
         # Adjust difficulty based on accuracy
@@ -128,8 +172,40 @@ class SATPrep:
         else:
             difficulty = 1  # Easy
         
+        # Learners on a slow pace get questions one level easier
+        profile = self.profiles.get(user_id)
+        if profile.get('pace') == 'slow':
+            difficulty = max(1, difficulty - 1)
+        
+        # Target a recorded weakness when the bank has questions on it
+        for weakness in profile.get('weaknesses', []):
+            question = self.get_pyq(section, difficulty, user_id, weakness.replace('_', ' '))
+            if question:
+                return question
+        
         return self.get_pyq(section, difficulty, user_id)
     
+    def get_profile(self, discord_id):
+        return self.profiles.get(discord_id)
+    
+    def update_profile(self, discord_id, **fields):
+        return self.profiles.update(discord_id, **fields)
+    
+    def get_report_data(self, discord_id, report_type, days=30):
+        """(data version, chart data) for a report; None if the user has no answers"""
+        user_id = self.db.get_user_id(discord_id)
+        if not user_id:
+            return None
+        version = self.db.get_progress_version(user_id)
+        recent_answers, _, compacted_answers, _ = version
+        if not recent_answers and not compacted_answers:
+            return None
+        if report_type == 'trends':
+            # The window moves with the UTC day the history is bucketed by, so that day is part of the version
+            return version + (time.strftime('%Y-%m-%d', time.gmtime()),), {'days': self.db.get_daily_progress(user_id, days)}
+        return version, {'sections': self.db.get_user_stats(user_id)['sections']}
+    
+    @timed('sat_operation_seconds')
     def translate(self, text, target_lang='en'):
         """Translate text with caching"""
         cache_key = f"{text}_{target_lang}"
@@ -137,42 +213,90 @@ class SATPrep:
             return self.translation_cache[cache_key]
         
         try:
-            translator = GoogleTranslator(source='auto', target=target_lang)
-            translation = translator.translate(text)
+            translation = self.translator.translate(text, target_lang)
             self.translation_cache[cache_key] = translation
             return translation
         except Exception as e:
             print(f"Translation error: {e}")
             return text
     
+    @timed('sat_operation_seconds')
     def record_user_answer(self, discord_id, username, question_id, is_correct, time_taken):
         """Record user's answer and update progress"""
         user_id = self.db.add_user(discord_id, username)
         self.db.record_answer(user_id, question_id, is_correct, time_taken)
+        if self.events:
+            self.events.append_answer(user_id, question_id, is_correct, time_taken)
+        self.seen.mark(user_id, question_id)
+        self._update_review_state(user_id, question_id, is_correct, time_taken)
         return user_id
     
+    def _update_review_state(self, user_id, question_id, is_correct, time_taken):
+        now = time.time()
+        row = self.db.get_review_state(user_id, question_id)
+        state = schedule(ReviewState(*row) if row else None, answer_quality(is_correct, time_taken))
+        self.db.save_review_state(user_id, question_id, state, next_due(state, now), now)
+    
+    @timed('sat_operation_seconds')
+    def get_review_question(self, discord_id):
+        """Next spaced-repetition review for the user, or None when nothing is due"""
+        user_id = self.db.get_user_id(discord_id)
+        if not user_id:
+            return None
+        question_id = self.db.get_next_review(user_id, time.time())
+        return self.db.get_question(question_id) if question_id else None
+    
+    def get_review_summary(self, discord_id):
+        """(reviews due now, epoch seconds of the next review or None)"""
+        user_id = self.db.get_user_id(discord_id)
+        if not user_id:
+            return 0, None
+        return self.db.get_review_summary(user_id, time.time())
+    
+    @timed('sat_operation_seconds')
     def get_user_stats(self, discord_id):
         """Get comprehensive user statistics"""
-        cursor = self.db.conn.cursor()
-        cursor.execute("SELECT id FROM users WHERE discord_id = ?", (discord_id,))
-        user = cursor.fetchone()
+        user_id = self.db.get_user_id(discord_id)
         
-        if not user:
+        if not user_id:
             return None
         
-        return self.db.get_user_stats(user[0])
+        return self.db.get_user_stats(user_id)
+    
+    def start_study_session(self, discord_id, username):
+        """Open a study session; it lives in the database so every shard sees it"""
+        user_id = self.db.add_user(discord_id, username)
+        active = self.db.get_active_session(user_id)
+        if active:
+            return active[0]
+        return self.db.start_study_session(user_id)
     
+    def get_active_session(self, discord_id):
+        user_id = self.db.get_user_id(discord_id)
+        if not user_id:
+            return None
+        return self.db.get_active_session(user_id)
+    
+    def record_session_answer(self, discord_id, is_correct, section):
+        """Count an answer against the user's open study session, if any"""
+        session = self.get_active_session(discord_id)
+        if session:
+            self.db.update_session_progress(session[0], is_correct, section)
+    
+    def end_study_session(self, session_id, questions_answered, correct_answers, sections_studied):
+        self.db.end_study_session(session_id, questions_answered, correct_answers, sections_studied)
+    
+    @timed('sat_operation_seconds')
     def explain_concept(self, concept):
         """Explain a concept using AI"""
-        # This would use the AI generator to create an explanation
-        prompt = f"Explain the concept of {concept} in simple terms for a high school student preparing for the SAT."
-        
-        try:
-            # In a real implementation, this would call the AI API
-            explanation = f"{concept} is an important concept for the SAT. Here's a simple explanation:\n\n1. Definition: [Definition of {concept}]\n2. Importance: Why it matters for the SAT\n3. Example: A practical example\n4. Tips: How to approach questions about {concept}"
+        explanation = self.ai_generator.explain_concept(concept)
+        if explanation:
             return explanation
-        except Exception as e:
-            return f"Error generating explanation: {str(e)}"
+        
+        # Fall back to a template when the AI backend is unavailable
+        return f"{concept} is an important concept for the SAT. Here's a simple explanation:\n\n1. Definition: [Definition of {concept}]\n2. Importance: Why it matters for the SAT\n3. Example: A practical example\n4. Tips: How to approach questions about {concept}"
     
     def close(self):
+        if self.events:
+            self.events.close()
         self.db.close()
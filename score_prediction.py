@@ -0,0 +1,166 @@
+"""SAT score forecasts from answer history.
+
+The model is a linear map from per-user features to the two section scores
+(Math and Reading & Writing, 200-800 each). Its weights are a single .npy
+artifact loaded once per process and memory-mapped; without one the built-in
+weights below are used. Features for any number of users come from one
+aggregate query and are assembled with numpy, so ``predict_many`` scores a
+whole cohort in one pass. Nightly precomputation stores the results in
+score_predictions, which the dashboard reads instead of predicting live.
+
+    python score_prediction.py precompute
+"""
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+
+from storage import create_storage
+
+SECTIONS = ('math', 'reading', 'writing')
+FEATURES = (
+    [f'accuracy_{section}' for section in SECTIONS]
+    + [f'difficulty_accuracy_{section}' for section in SECTIONS]
+    + [f'log_attempts_{section}' for section in SECTIONS]
+    + ['minutes_per_question', 'bias']
+)
+OUTPUTS = ('math', 'reading_writing')
+
+# Rows follow FEATURES, columns follow OUTPUTS
+DEFAULT_WEIGHTS = np.array([
+    [360, 0], [0, 180], [0, 180],
+    [240, 0], [0, 120], [0, 120],
+    [0, 0], [0, 0], [0, 0],
+    [0, 0],
+    [200, 200]
+], dtype=np.float64)
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def load_weights(path=None):
+    """Model weights for this process, read from disk at most once per path"""
+    path = path or os.getenv('SCORE_MODEL_PATH', 'models/score_model.npy')
+    with _models_lock:
+        weights = _models.get(path)
+        if weights is None:
+            if os.path.exists(path):
+                weights = np.load(path, mmap_mode='r')
+                if weights.shape != DEFAULT_WEIGHTS.shape:
+                    raise ValueError(f"{path} has shape {weights.shape}, expected {DEFAULT_WEIGHTS.shape}")
+            else:
+                weights = DEFAULT_WEIGHTS
+            _models[path] = weights
+        return weights
+
+
+def build_features(aggregates, user_ids):
+    """(feature matrix of len(user_ids) x len(FEATURES), answers per user) from get_progress_aggregates rows"""
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    features = np.zeros((len(user_ids), len(FEATURES)))
+    attempts = np.zeros((len(user_ids), len(SECTIONS)))
+    correct = np.zeros_like(attempts)
+    weighted_correct = np.zeros_like(attempts)
+    difficulty_total = np.zeros_like(attempts)
+    seconds = np.zeros(len(user_ids))
+
+    if aggregates:
+        data = np.array(aggregates, dtype=np.float64)
+        order = np.argsort(user_ids)
+        rows = order[np.searchsorted(user_ids, data[:, 0].astype(np.int64), sorter=order)]
+        columns = data[:, 1].astype(np.int64)
+        np.add.at(attempts, (rows, columns), data[:, 2])
+        np.add.at(correct, (rows, columns), data[:, 3])
+        np.add.at(weighted_correct, (rows, columns), data[:, 4])
+        np.add.at(difficulty_total, (rows, columns), data[:, 5])
+        np.add.at(seconds, rows, data[:, 6])
+
+    # Laplace smoothing keeps users with a handful of answers near the middle
+    features[:, 0:3] = (correct + 1) / (attempts + 2)
+    features[:, 3:6] = (weighted_correct + 2) / (difficulty_total + 4)
+    features[:, 6:9] = np.log1p(attempts)
+    total_attempts = attempts.sum(axis=1)
+    features[:, 9] = np.divide(seconds, total_attempts * 60, out=np.zeros_like(seconds), where=total_attempts > 0)
+    features[:, 10] = 1.0
+    return features, total_attempts
+
+
+def scale_scores(raw):
+    """Clip section scores to 200-800 and round to the nearest 10 like the real SAT"""
+    return np.round(np.clip(raw, 200, 800) / 10) * 10
+
+
+class ScorePredictor:
+    def __init__(self, db, model_path=None, max_age=24 * 3600):
+        self.db = db
+        self.weights = load_weights(model_path)
+        self.max_age = max_age
+
+    def predict_many(self, user_ids):
+        """{user_id: {'math', 'reading_writing', 'total', 'answers'}} for every id, in one pass"""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        aggregates = self.db.get_progress_aggregates(user_ids)
+        features, answers = build_features(aggregates, user_ids)
+        scores = scale_scores(features @ self.weights)
+        return {
+            user_id: {
+                'math': int(math),
+                'reading_writing': int(reading_writing),
+                'total': int(math + reading_writing),
+                'answers': int(count)
+            }
+            for user_id, (math, reading_writing), count in zip(user_ids, scores, answers)
+        }
+
+    def get_prediction(self, user_id):
+        """Stored forecast if it is recent enough, otherwise a fresh one that is then stored"""
+        cached = self.db.get_score_prediction(user_id)
+        if cached and time.time() - cached['predicted_at'] < self.max_age:
+            return cached
+        prediction = self.predict_many([user_id])[user_id]
+        self.db.save_score_predictions([(user_id, prediction)], time.time())
+        return dict(prediction, predicted_at=time.time())
+
+    def precompute(self, batch_size=5000):
+        """Score every user in batches and store the results"""
+        started = time.perf_counter()
+        after_id = 0
+        scored = 0
+        while True:
+            user_ids = self.db.get_user_ids_after(after_id, batch_size)
+            if not user_ids:
+                break
+            predictions = self.predict_many(user_ids)
+            self.db.save_score_predictions(predictions.items(), time.time())
+            scored += len(user_ids)
+            after_id = user_ids[-1]
+        elapsed = time.perf_counter() - started
+        return {
+            'users': scored,
+            'seconds': round(elapsed, 2),
+            'users_per_second': round(scored / elapsed, 1) if elapsed else None
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SAT score forecasts")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    precompute_parser = subparsers.add_parser('precompute', help="Score every user and store the forecasts")
+    precompute_parser.add_argument('--batch-size', type=int, default=5000)
+    precompute_parser.add_argument('--model', help="Weights .npy file (default: SCORE_MODEL_PATH)")
+    args = parser.parse_args()
+
+    db = create_storage()
+    try:
+        print(ScorePredictor(db, args.model).precompute(args.batch_size))
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
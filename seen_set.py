@@ -0,0 +1,125 @@
+"""Per-user bitmaps of answered question ids.
+
+Each user's seen-set is one bit per question id, so a user with thousands of
+answers costs a few kilobytes and a membership test is a single byte lookup.
+Bitmaps live in an LRU in memory and are written through to the
+user_seen_chunks table, one row per 4096 question ids; a user without a
+stored bitmap is built once from user_progress.
+
+Writes OR the new bits into the stored chunk inside one transaction, so
+shards recording answers for the same user never drop each other's bits,
+and a write only touches the chunk that changed.
+"""
+import threading
+from collections import OrderedDict
+
+CHUNK_BYTES = 512
+CHUNK_BITS = CHUNK_BYTES * 8
+
+
+def or_bytes(a, b):
+    """Bitwise OR of two little-endian bitmaps, as long as the longer one"""
+    length = max(len(a), len(b))
+    return (int.from_bytes(a, 'little') | int.from_bytes(b, 'little')).to_bytes(length, 'little')
+
+
+def split_chunks(data):
+    """{chunk index: bytes} for the non-empty chunks of a bitmap"""
+    return {offset // CHUNK_BYTES: bytes(data[offset:offset + CHUNK_BYTES])
+            for offset in range(0, len(data), CHUNK_BYTES)
+            if any(data[offset:offset + CHUNK_BYTES])}
+
+
+class SeenSet:
+    def __init__(self, data=b''):
+        self.bits = bytearray(data)
+
+    def __contains__(self, question_id):
+        byte = question_id >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] & (1 << (question_id & 7)))
+
+    def add(self, question_id):
+        """Set the bit for question_id; returns False if it was already set"""
+        byte = question_id >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte - len(self.bits) + 1))
+        mask = 1 << (question_id & 7)
+        if self.bits[byte] & mask:
+            return False
+        self.bits[byte] |= mask
+        return True
+
+    def merge(self, chunk, data):
+        """OR a stored chunk into the set"""
+        offset = chunk * CHUNK_BYTES
+        end = offset + len(data)
+        if end > len(self.bits):
+            self.bits.extend(bytes(end - len(self.bits)))
+        self.bits[offset:end] = or_bytes(self.bits[offset:end], data)
+
+    def __len__(self):
+        return sum(bin(byte).count('1') for byte in self.bits)
+
+    def to_bytes(self):
+        return bytes(self.bits)
+
+
+class SeenQuestions:
+    def __init__(self, db, max_users=10000):
+        self.db = db
+        self.max_users = max_users
+        self._sets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            seen = self._sets.get(user_id)
+            if seen is not None:
+                self._sets.move_to_end(user_id)
+                return seen
+
+        chunks = self.db.get_seen_chunks(user_id)
+        seen = SeenSet()
+        if chunks:
+            for chunk, data in chunks:
+                seen.merge(chunk, data)
+        else:
+            for question_id in self.db.get_answered_question_ids(user_id):
+                seen.add(question_id)
+            # Chunk 0 is always stored so a user with no answers counts as built
+            merged = self.db.merge_seen_chunks(user_id, split_chunks(seen.bits) or {0: b''})
+            for chunk, data in merged.items():
+                seen.merge(chunk, data)
+
+        with self._lock:
+            seen = self._sets.setdefault(user_id, seen)
+            self._sets.move_to_end(user_id)
+            if len(self._sets) > self.max_users:
+                self._sets.popitem(last=False)
+        return seen
+
+    def mark(self, user_id, question_id):
+        seen = self.get(user_id)
+        with self._lock:
+            if question_id in seen:
+                return
+        chunk, bit = divmod(question_id, CHUNK_BITS)
+        data = bytearray((bit >> 3) + 1)
+        data[bit >> 3] = 1 << (bit & 7)
+        # The merged chunk also carries bits other processes stored meanwhile
+        merged = self.db.merge_seen_chunks(user_id, {chunk: bytes(data)})
+        with self._lock:
+            seen.merge(chunk, merged[chunk])
+
+    def pick_unseen(self, user_id, candidates, rng, attempts=8):
+        """Random candidate the user has not answered, or any candidate once they have seen them all"""
+        if not candidates:
+            return None
+        seen = self.get(user_id)
+        # Random probes settle it in O(1) unless most candidates are already seen
+        for _ in range(attempts):
+            question_id = rng.choice(candidates)
+            if question_id not in seen:
+                return question_id
+        unseen = [question_id for question_id in candidates if question_id not in seen]
+        return rng.choice(unseen or candidates)
@@ -0,0 +1,57 @@
+"""Run the Discord bot as several sharded processes.
+
+Each process runs discord_bot.py as an AutoShardedBot that owns a subset of
+the shards. State the processes share (question bank, study sessions, user
+stats) lives in the database named by DATABASE_URL.
+
+    python shard_launcher.py --processes 4 --shards 16
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from sharding import shard_ids_for_process
+
+
+def launch(processes, shards, script='discord_bot.py'):
+    children = []
+    for index in range(processes):
+        shard_ids = shard_ids_for_process(index, processes, shards)
+        if not shard_ids:
+            continue
+        env = dict(os.environ)
+        env['SHARD_COUNT'] = str(shards)
+        env['SHARD_IDS'] = ','.join(str(shard_id) for shard_id in shard_ids)
+        if os.getenv('SAT_METRICS_PORT'):
+            # One metrics endpoint per process
+            env['SAT_METRICS_PORT'] = str(int(os.getenv('SAT_METRICS_PORT')) + index)
+        print(f"Starting process {index} with shards {env['SHARD_IDS']}")
+        children.append(subprocess.Popen([sys.executable, script], env=env))
+    return children
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the bot as several sharded processes")
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--shards', type=int, required=True)
+    args = parser.parse_args()
+
+    children = launch(args.processes, args.shards)
+    try:
+        while children:
+            for child in list(children):
+                if child.poll() is not None:
+                    print(f"Shard process {child.pid} exited with code {child.returncode}")
+                    children.remove(child)
+            time.sleep(1)
+    except KeyboardInterrupt:
+        for child in children:
+            child.terminate()
+        for child in children:
+            child.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+import os
+
+
+def shard_for_guild(guild_id, shard_count):
+    """Shard that Discord routes a guild to; DMs (no guild) always land on shard 0"""
+    if guild_id is None:
+        return 0
+    return (int(guild_id) >> 22) % shard_count
+
+
+def shard_ids_for_process(process_index, process_count, shard_count):
+    """Split shard ids round-robin across launcher processes"""
+    return [shard_id for shard_id in range(shard_count) if shard_id % process_count == process_index]
+
+
+def parse_shard_env():
+    """Read SHARD_COUNT / SHARD_IDS; returns (None, None) for a single unsharded process"""
+    shard_count = os.getenv('SHARD_COUNT')
+    if not shard_count:
+        return None, None
+
+    shard_ids = os.getenv('SHARD_IDS')
+    if shard_ids:
+        shard_ids = [int(shard_id) for shard_id in shard_ids.split(',') if shard_id.strip()]
+    else:
+        shard_ids = None
+    return int(shard_count), shard_ids
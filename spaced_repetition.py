@@ -0,0 +1,47 @@
+"""SM-2 style review scheduling for answered questions."""
+from collections import namedtuple
+
+ReviewState = namedtuple('ReviewState', ['ease', 'interval_days', 'repetitions', 'lapses'])
+
+NEW_CARD = ReviewState(ease=2.5, interval_days=0.0, repetitions=0, lapses=0)
+MIN_EASE = 1.3
+# A missed question comes back within the same study session
+RELEARN_INTERVAL_DAYS = 10 / (24 * 60)
+DAY = 24 * 3600
+
+
+def answer_quality(is_correct, time_taken):
+    """Map an answer to SM-2's 0-5 recall quality; slow correct answers count as harder recalls"""
+    if not is_correct:
+        return 1
+    if time_taken is None or time_taken <= 30:
+        return 5
+    if time_taken <= 90:
+        return 4
+    return 3
+
+
+def schedule(state, quality):
+    """Return the next ReviewState after a review of the given quality"""
+    state = state or NEW_CARD
+    if quality >= 3:
+        if state.repetitions == 0:
+            interval = 1.0
+        elif state.repetitions == 1:
+            interval = 6.0
+        else:
+            interval = round(state.interval_days * state.ease, 2)
+        repetitions = state.repetitions + 1
+        lapses = state.lapses
+    else:
+        interval = RELEARN_INTERVAL_DAYS
+        repetitions = 0
+        lapses = state.lapses + 1
+
+    ease = max(MIN_EASE, state.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return ReviewState(round(ease, 3), interval, repetitions, lapses)
+
+
+def next_due(state, now):
+    """Epoch seconds at which the question is due again"""
+    return now + state.interval_days * DAY
@@ -12,15 +12,58 @@ from sat_utils import SATPrep
 from analytics_engine import AnalyticsEngine
 from recommendation_engine import RecommendationEngine
 from ml_models import SATMLModels
-from nlp_processor import NLPProcessor
+from inference_worker import create_nlp_client
 import networkx as nx
+from metrics import registry as metrics, start_exporter, ANSWER_TIME_BUCKETS
+from job_runner import JobRunner
+from score_prediction import ScorePredictor
+
+@st.cache_resource
+def get_sat():
+    """SATPrep (schema checks, connections, response cache) is built once per server process"""
+    return SATPrep()
+
 
 # Initialize components
-sat = SATPrep()
+sat = get_sat()
 analytics = AnalyticsEngine(None)
 recommender = RecommendationEngine(None)
-ml_models = SATMLModels()
-nlp = NLPProcessor()
+start_exporter()
+
+
+@st.cache_resource
+def get_job_runner():
+    """One background job pool for every session of this server process"""
+    return JobRunner(
+        max_workers=int(os.getenv('STREAMLIT_JOB_WORKERS', 4)),
+        result_ttl=float(os.getenv('STREAMLIT_JOB_TTL_SECONDS', 600))
+    )
+
+
+jobs = get_job_runner()
+
+
+@st.cache_resource
+def get_ml_models():
+    """Model artifacts are loaded once per server process, not on every rerun"""
+    return SATMLModels()
+
+
+@st.cache_resource
+def get_score_predictor():
+    # Shares the cached SATPrep's storage rather than opening a second pool
+    return ScorePredictor(get_sat().db, max_age=float(os.getenv('SCORE_PREDICTION_MAX_AGE_HOURS', 24)) * 3600)
+
+
+@st.cache_resource
+def get_nlp():
+    """Client of the shared inference worker, or one in-process model per server when none is configured"""
+    return create_nlp_client()
+
+
+ml_models = get_ml_models()
+nlp = get_nlp()
+score_predictor = get_score_predictor()
 
 # Page configuration
 st.set_page_config(
@@ -84,6 +127,8 @@ if 'user_id' not in st.session_state:
     st.session_state.user_id = str(time.time())
 if 'current_question' not in st.session_state:
     st.session_state.current_question = None
+if 'question_started_at' not in st.session_state:
+    st.session_state.question_started_at = None
 if 'show_answer' not in st.session_state:
     st.session_state.show_answer = False
 if 'study_session' not in st.session_state:
@@ -97,6 +142,30 @@ if 'session_stats' not in st.session_state:
     }
 if 'page' not in st.session_state:
     st.session_state.page = 'dashboard'
+if 'jobs' not in st.session_state:
+    st.session_state.jobs = {}
+
+
+def start_job(slot, key, fn, *args, cache=False):
+    """Run fn in the background and remember its job id under this session's slot"""
+    st.session_state.jobs[slot] = jobs.submit(key, fn, *args, cache=cache)
+
+
+def poll_job(slot, message):
+    """Return the finished job for a slot; while it is still running show progress and schedule a rerun"""
+    job_id = st.session_state.jobs.get(slot)
+    job = jobs.get(job_id) if job_id else None
+    if job is None:
+        st.session_state.jobs.pop(slot, None)
+        return None
+    if not job.finished:
+        st.info(f"⏳ {message} ({job.elapsed:.0f}s)")
+        st.session_state.poll_pending = True
+        return None
+    return job
+
+
+st.session_state.poll_pending = False
 
 # Main header
 st.markdown('<div class="main-header">SAT Prep Oman - Ultra Advanced</div>', unsafe_allow_html=True)
@@ -163,6 +232,16 @@ if page == "Dashboard":
             </div>
             """, unsafe_allow_html=True)
         
+        # Score forecast, normally precomputed nightly by score_prediction.py
+        user_key = sat.db.get_user_id(st.session_state.user_id)
+        if user_key:
+            forecast = score_predictor.get_prediction(user_key)
+            st.markdown('<div class="section-header">Progress Forecasting</div>', unsafe_allow_html=True)
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Predicted SAT Score", forecast['total'])
+            col2.metric("Math", forecast['math'])
+            col3.metric("Reading & Writing", forecast['reading_writing'])
+        
         # Section performance
         st.markdown('<div class="section-header">Section Performance</div>', unsafe_allow_html=True)
         
@@ -228,7 +307,7 @@ elif page == "Practice":
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        question_mode = st.selectbox("Mode", ["Previous Year Questions", "AI Generated", "Adaptive"])
+        question_mode = st.selectbox("Mode", ["Previous Year Questions", "AI Generated", "Adaptive", "Spaced Review"])
     
     with col2:
         section = st.selectbox("Section", ["math", "reading", "writing"])
@@ -239,7 +318,7 @@ elif page == "Practice":
             topic = st.text_input("Specific Topic (optional)")
         else:
             difficulty = st.selectbox("Difficulty", ["any", "easy", "medium", "hard"])
-            topic = None
+            topic = st.text_input("Topic (optional)") if question_mode == "Previous Year Questions" else None
     
     # Get question button
     if st.button("Get Question", key="get_question"):
@@ -247,20 +326,44 @@ elif page == "Practice":
             if question_mode == "Previous Year Questions":
                 diff_map = {'easy': 1, 'medium': 2, 'hard': 3}
                 diff = diff_map.get(difficulty, None) if difficulty != "any" else None
-                question = sat.get_pyq(section, diff, st.session_state.user_id)
+                question = sat.get_pyq(section, diff, st.session_state.user_id, topic or None)
             elif question_mode == "AI Generated":
                 diff_map = {'easy': 1, 'medium': 2, 'hard': 3}
                 diff = diff_map[difficulty]
-                question = sat.generate_new_question(section, diff, topic)
-            else:  # Adaptive
+                # Identical in-flight requests from other users share this job
+                start_job('practice_question', ('generate', section, diff, topic or ''),
+                          sat.generate_new_question, section, diff, topic)
+                question = None
+            elif question_mode == "Adaptive":
                 question = sat.get_adaptive_question(st.session_state.user_id, section)
+            else:  # Spaced Review
+                question = sat.get_review_question(st.session_state.user_id)
             
             if question:
                 st.session_state.current_question = question
+                st.session_state.question_started_at = time.time()
                 st.session_state.show_answer = False
+            elif question_mode == "AI Generated":
+                pass
+            elif question_mode == "Spaced Review":
+                due, next_at = sat.get_review_summary(st.session_state.user_id)
+                if next_at:
+                    st.info(f"Nothing due yet. Next review in {max(1, int((next_at - time.time()) / 60))} minutes.")
+                else:
+                    st.info("Nothing to review yet. Answer some questions first.")
             else:
                 st.error("No questions available for this selection")
     
+    job = poll_job('practice_question', "Generating question...")
+    if job:
+        st.session_state.jobs.pop('practice_question')
+        if job.result:
+            st.session_state.current_question = job.result
+            st.session_state.question_started_at = time.time()
+            st.session_state.show_answer = False
+        else:
+            st.error("Could not generate question")
+    
     # Display question
     if st.session_state.current_question:
         q = st.session_state.current_question
@@ -272,14 +375,16 @@ elif page == "Practice":
         
         if lang == "English":
             st.markdown(f"**Question:** {q.get('question_en', q.get('question', ''))}")
-            if q.get('passage_en'):
-                st.markdown(f"**Passage:** {q['passage_en']}")
+            passage = q.get('passage') or sat.get_passage(q.get('passage_id'))
+            if passage:
+                st.markdown(f"**Passage:** {passage}")
             options = q.get('options_en', q.get('options', []))
             explanation = q.get('explanation_en', q.get('explanation', ''))
         else:
             st.markdown(f"**Question:** {q.get('question_ar', q.get('question_ar', ''))}")
-            if q.get('passage_ar'):
-                st.markdown(f"**Passage:** {q['passage_ar']}")
+            passage = q.get('passage_ar') or sat.get_passage(q.get('passage_id'), 'ar')
+            if passage:
+                st.markdown(f"**Passage:** {passage}")
             options = q.get('options_ar', q.get('options_ar', []))
             explanation = q.get('explanation_ar', q.get('explanation_ar', ''))
         
@@ -291,6 +396,8 @@ elif page == "Practice":
             # Check answer
             correct_answer = q.get('answer')
             is_correct = user_answer == correct_answer
+            time_taken = round(time.time() - st.session_state.question_started_at, 2) if st.session_state.question_started_at else 0
+            metrics.observe('sat_answer_time_seconds', 'section', section, time_taken, ANSWER_TIME_BUCKETS)
             
             # Update session stats
             if st.session_state.study_session:
@@ -305,7 +412,7 @@ elif page == "Practice":
                 "Streamlit User",
                 q['id'],
                 is_correct,
-                0  # Time tracking not implemented
+                time_taken
             )
             
             # Show result
@@ -327,9 +434,14 @@ elif page == "AI Tools":
     
     if st.button("Explain Concept", key="explain_concept"):
         if concept:
-            with st.spinner("Generating explanation..."):
-                explanation = nlp.generate_explanation(concept, "", "intermediate")
-                st.success(explanation)
+            start_job('explain', ('explain', concept.strip().lower()),
+                      nlp.generate_explanation, concept, "", "intermediate", cache=True)
+    
+    job = poll_job('explain', "Generating explanation...")
+    if job and job.result:
+        st.success(job.result)
+    elif job:
+        st.error("Could not generate explanation")
     
     # Question generation
     st.markdown("### AI Question Generator")
@@ -346,23 +458,26 @@ elif page == "AI Tools":
         gen_topic = st.text_input("Specific Topic")
     
     if st.button("Generate Question", key="ai_generate"):
-        with st.spinner("Generating question..."):
-            diff_map = {'easy': 1, 'medium': 2, 'hard': 3}
-            question = sat.generate_new_question(gen_section, diff_map[gen_difficulty], gen_topic)
+        diff_map = {'easy': 1, 'medium': 2, 'hard': 3}
+        start_job('ai_question', ('generate', gen_section, diff_map[gen_difficulty], gen_topic or ''),
+                  sat.generate_new_question, gen_section, diff_map[gen_difficulty], gen_topic)
+    
+    job = poll_job('ai_question', "Generating question...")
+    if job:
+        question = job.result
+        if question:
+            st.markdown(f"**Question:** {question['question']}")
+            if question.get('passage'):
+                st.markdown(f"**Passage:** {question['passage']}")
             
-            if question:
-                st.markdown(f"**Question:** {question['question']}")
-                if question.get('passage'):
-                    st.markdown(f"**Passage:** {question['passage']}")
-                
-                st.markdown("**Options:**")
-                for i, opt in enumerate(question['options']):
-                    st.write(f"{chr(65+i)}. {opt}")
-                
-                st.markdown(f"**Answer:** {question['answer']}")
-                st.markdown(f"**Explanation:** {question['explanation']}")
-            else:
-                st.error("Could not generate question")
+            st.markdown("**Options:**")
+            for i, opt in enumerate(question['options']):
+                st.write(f"{chr(65+i)}. {opt}")
+            
+            st.markdown(f"**Answer:** {question['answer']}")
+            st.markdown(f"**Explanation:** {question['explanation']}")
+        else:
+            st.error("Could not generate question")
     
     # Translation tool
     st.markdown("### Advanced Translation")
@@ -379,14 +494,24 @@ elif page == "AI Tools":
         if st.button("Translate", key="translate_text"):
             if translate_text:
                 lang_code = 'ar' if translate_target == "Arabic" else 'en'
+                key = ('translate', translate_text, lang_code, preserve_meaning)
                 
                 if preserve_meaning:
-                    translation = nlp.translate_complex_concepts(translate_text, lang_code)
+                    start_job('translate', key, nlp.translate_complex_concepts, translate_text, lang_code, cache=True)
                 else:
-                    translation = sat.translate(translate_text, lang_code)
-                
-                st.success(translation)
+                    start_job('translate', key, sat.translate, translate_text, lang_code, cache=True)
+        
+        job = poll_job('translate', "Translating...")
+        if job and job.result:
+            st.success(job.result)
+        elif job:
+            st.error("Translation failed")
 
 # Footer
 st.markdown("---")
 st.markdown("SAT Prep Oman - Ultra Advanced Edition | Built with ❤️ for Omani Students")
+
+# Poll background jobs until they finish
+if st.session_state.poll_pending:
+    time.sleep(1)
+    st.rerun()
@@ -0,0 +1,196 @@
+"""Live study rooms and head-to-head challenges.
+
+A room holds one question payload that every member answers through the
+same message and view, so fan-out costs one send however many people are in
+the room. Answers update per-option counts and scores in O(1); the
+scoreboard is only marked dirty, and a per-room flusher publishes at most
+one scoreboard edit every ``edit_interval`` seconds while a round is open,
+keeping a busy room well inside Discord's message edit rate limits.
+Members are never moved between rooms implicitly: creating or joining a
+room while in another one is refused until the member leaves.
+"""
+import asyncio
+import itertools
+import time
+
+
+class Room:
+    __slots__ = ('id', 'host_id', 'channel_id', 'members', 'question', 'round', 'round_started_at',
+                 'answers', 'option_counts', 'correct', 'scores', 'dirty', 'closed', 'flusher',
+                 'message', 'round_done', 'edits')
+
+    def __init__(self, room_id, host_id, channel_id):
+        self.id = room_id
+        self.host_id = host_id
+        self.channel_id = channel_id
+        self.members = {host_id}
+        self.question = None
+        self.round = 0
+        self.round_started_at = None
+        self.answers = {}
+        self.option_counts = []
+        self.correct = 0
+        self.scores = {}
+        self.dirty = False
+        self.closed = False
+        self.flusher = None
+        self.message = None
+        self.round_done = None
+        self.edits = 0
+
+    @property
+    def round_open(self):
+        return self.question is not None and self.round_done is not None and not self.round_done.is_set()
+
+
+def score_answer(is_correct, elapsed, time_limit):
+    """100 points for a correct answer plus up to 50 for speed"""
+    if not is_correct:
+        return 0
+    return 100 + int(50 * max(0.0, 1 - elapsed / time_limit))
+
+
+class RoomEngine:
+    def __init__(self, publish, edit_interval=1.5, time_limit=60, max_members=500):
+        """``publish(room, snapshot, final)`` is awaited to show a scoreboard; it is never called
+        more than once per ``edit_interval`` for a room except for the final result of a round"""
+        self.publish = publish
+        self.edit_interval = edit_interval
+        self.time_limit = time_limit
+        self.max_members = max_members
+        self.rooms = {}
+        self.member_rooms = {}
+        self._ids = itertools.count(1)
+
+    def create(self, host_id, channel_id):
+        """Open a room hosted by ``host_id``; returns the room, or an error message string"""
+        current = self.room_of(host_id)
+        if current is not None:
+            return f"You are already in study room #{current.id}. Leave it first with `!studyroom leave`."
+        room = Room(next(self._ids), host_id, channel_id)
+        self.rooms[room.id] = room
+        self.member_rooms[host_id] = room.id
+        return room
+
+    def join(self, room_id, user_id):
+        """Add a member; returns the room, or an error message string"""
+        room = self.rooms.get(room_id)
+        if room is None or room.closed:
+            return "That study room does not exist."
+        if user_id in room.members:
+            return room
+        if len(room.members) >= self.max_members:
+            return "That study room is full."
+        current = self.room_of(user_id)
+        if current is not None:
+            return f"You are already in study room #{current.id}. Leave it first with `!studyroom leave`."
+        room.members.add(user_id)
+        self.member_rooms[user_id] = room.id
+        room.dirty = True
+        return room
+
+    def leave(self, user_id):
+        room = self.room_of(user_id)
+        if room is None:
+            return None
+        room.members.discard(user_id)
+        del self.member_rooms[user_id]
+        if not room.members:
+            self.close(room)
+        elif user_id == room.host_id:
+            room.host_id = next(iter(room.members))
+        room.dirty = True
+        return room
+
+    def room_of(self, user_id):
+        room_id = self.member_rooms.get(user_id)
+        return self.rooms.get(room_id) if room_id else None
+
+    def close(self, room):
+        room.closed = True
+        if room.round_done is not None:
+            room.round_done.set()
+        if room.flusher is not None:
+            room.flusher.cancel()
+        for user_id in list(room.members):
+            self.member_rooms.pop(user_id, None)
+        self.rooms.pop(room.id, None)
+
+    def start_round(self, room, question):
+        """Make ``question`` (shared by every member) the live question and reset the tallies"""
+        room.question = question
+        room.round += 1
+        room.round_started_at = time.monotonic()
+        room.answers = {}
+        room.option_counts = [0] * len(question['options_en'])
+        room.correct = 0
+        room.round_done = asyncio.Event()
+        room.dirty = True
+        if room.flusher is None or room.flusher.done():
+            room.flusher = asyncio.get_running_loop().create_task(self._flush_loop(room))
+
+    def answer(self, room, user_id, choice):
+        """Record one member's answer; returns (is_correct, points) or an error message string"""
+        if not room.round_open:
+            return "There is no open question in this room."
+        if user_id not in room.members:
+            return "Join the room first with `!studyroom join`."
+        if user_id in room.answers:
+            return "You have already answered this question."
+        elapsed = time.monotonic() - room.round_started_at
+        is_correct = choice == room.question['correct_index']
+        points = score_answer(is_correct, elapsed, self.time_limit)
+        room.answers[user_id] = (choice, is_correct, elapsed)
+        room.option_counts[choice] += 1
+        room.correct += is_correct
+        room.scores[user_id] = room.scores.get(user_id, 0) + points
+        room.dirty = True
+        if len(room.answers) >= len(room.members):
+            room.round_done.set()
+        return is_correct, points
+
+    def snapshot(self, room, top=10):
+        leaders = sorted(room.scores.items(), key=lambda item: item[1], reverse=True)[:top]
+        return {
+            'room': room.id,
+            'round': room.round,
+            'members': len(room.members),
+            'answered': len(room.answers),
+            'correct': room.correct,
+            'option_counts': list(room.option_counts),
+            'leaders': leaders
+        }
+
+    async def wait_round(self, room):
+        """Wait until every member has answered or the time limit passes, then publish the result.
+
+        Returns the final snapshot plus ``answers``, the round's {user_id: (choice, is_correct,
+        elapsed)}, taken before anything else can start the next round.
+        """
+        try:
+            await asyncio.wait_for(room.round_done.wait(), self.time_limit)
+        except asyncio.TimeoutError:
+            pass
+        room.round_done.set()
+        room.dirty = False
+        answers = room.answers
+        snapshot = self.snapshot(room)
+        await self._publish(room, snapshot, True)
+        return dict(snapshot, answers=answers)
+
+    async def _flush_loop(self, room):
+        # Runs only while a round is open; start_round() starts it again for the next one
+        while not room.closed:
+            await asyncio.sleep(self.edit_interval)
+            if not room.round_open:
+                break
+            if room.dirty:
+                room.dirty = False
+                await self._publish(room, self.snapshot(room), False)
+
+    async def _publish(self, room, snapshot, final):
+        room.edits += 1
+        try:
+            await self.publish(room, snapshot, final)
+        except Exception as e:
+            print(f"Study room {room.id} publish error: {e}")
@@ -0,0 +1,55 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SATDatabase
+
+# A PostgreSQL server the tests may create schemas in, e.g.
+# TEST_DATABASE_URL=postgresql://postgres@localhost:5432/postgres
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+
+
+def postgres_schema_url(url, schema):
+    separator = '&' if '?' in url else '?'
+    return f"{url}{separator}options=-csearch_path%3D{schema}"
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    db = SATDatabase(str(tmp_path / 'sat_prep.db'))
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def postgres_db():
+    """A PostgresDatabase in a throwaway schema; skipped without psycopg2 or TEST_DATABASE_URL"""
+    psycopg2 = pytest.importorskip('psycopg2')
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from postgres_storage import PostgresDatabase
+
+    schema = f"sat_test_{uuid.uuid4().hex[:12]}"
+    admin = psycopg2.connect(TEST_DATABASE_URL)
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cursor:
+            cursor.execute(f"CREATE SCHEMA {schema}")
+        db = PostgresDatabase(postgres_schema_url(TEST_DATABASE_URL, schema), min_connections=1, max_connections=4)
+        try:
+            yield db
+        finally:
+            db.close()
+        with admin.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA {schema} CASCADE")
+    finally:
+        admin.close()
+
+
+@pytest.fixture(params=['sqlite', 'postgres'])
+def db(request):
+    return request.getfixturevalue(f"{request.param}_db")
@@ -0,0 +1,74 @@
+import json
+import os
+
+import pytest
+
+from bank_io import import_job, import_jsonl
+
+
+class Interrupted(Exception):
+    pass
+
+
+class FailingUpserts:
+    """Passes calls through to ``db`` but fails the upsert after ``batches`` succeeded"""
+
+    def __init__(self, db, batches):
+        self.db = db
+        self.batches = batches
+
+    def upsert_questions(self, questions):
+        if self.batches == 0:
+            raise Interrupted()
+        self.batches -= 1
+        return self.db.upsert_questions(questions)
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+
+def write_bank(path, count, prefix='question'):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            f.write(json.dumps({
+                'section': 'math', 'question_en': f"{prefix} {i}", 'options_en': ['1', '2', '3', '4'],
+                'answer': '1', 'difficulty': 1 + i % 3
+            }))
+            f.write('\n')
+    return str(path)
+
+
+def test_interrupted_import_resumes_from_checkpoint(db, tmp_path):
+    path = write_bank(tmp_path / 'bank.jsonl', 25)
+
+    with pytest.raises(Interrupted):
+        import_jsonl(FailingUpserts(db, batches=2), path, batch_size=10)
+    assert db.count_questions() == 20
+    assert db.get_checkpoint(import_job(path)) == 20
+
+    result = import_jsonl(db, path, batch_size=10)
+    assert (result['resumed_from_line'], result['rows']) == (20, 5)
+    assert db.count_questions() == 25
+    assert db.get_checkpoint(import_job(path)) == 0
+
+
+def test_reimport_reads_the_whole_file(db, tmp_path):
+    path = write_bank(tmp_path / 'bank.jsonl', 25)
+    import_jsonl(db, path, batch_size=10)
+
+    result = import_jsonl(db, path, batch_size=10)
+    assert (result['resumed_from_line'], result['rows']) == (0, 25)
+    assert db.count_questions() == 25
+
+
+def test_rewritten_file_does_not_resume_old_checkpoint(db, tmp_path):
+    path = write_bank(tmp_path / 'bank.jsonl', 25)
+    with pytest.raises(Interrupted):
+        import_jsonl(FailingUpserts(db, batches=1), path, batch_size=10)
+
+    write_bank(path, 30, prefix='updated question')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    result = import_jsonl(db, path, batch_size=10)
+    assert (result['resumed_from_line'], result['rows']) == (0, 30)
+    assert db.count_questions() == 40
@@ -0,0 +1,24 @@
+import sqlite3
+
+
+def test_existing_user_leaves_no_open_transaction(sqlite_db):
+    user_id = sqlite_db.add_user('1001', 'alice')
+    assert sqlite_db.add_user('1001', 'alice') == user_id
+    assert not sqlite_db.conn.in_transaction
+
+    # Another shard's connection can write straight away
+    other = sqlite3.connect(sqlite_db.path, timeout=0)
+    try:
+        other.execute("INSERT INTO users (discord_id, username) VALUES ('1002', 'bob')")
+        other.commit()
+    finally:
+        other.close()
+    assert sqlite_db.merge_seen_chunks(user_id, {0: b'\x01'}) == {0: b'\x01'}
+    assert sqlite_db.add_user('1002', 'bob') == sqlite_db.get_user_id('1002')
+
+
+def test_duplicate_question_leaves_no_open_transaction(sqlite_db):
+    args = ('math', 'What is 1 + 1?', '', ['1', '2'], [], '2', '', '', 1)
+    question_id = sqlite_db.add_question(*args)
+    assert sqlite_db.add_question(*args) == question_id
+    assert not sqlite_db.conn.in_transaction
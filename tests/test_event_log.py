@@ -0,0 +1,69 @@
+import os
+
+from event_log import ANSWER, EventConsumer, EventLog, segment_name
+
+
+def append(log, count, start=0):
+    return [log.append_answer(user_id=n, question_id=n * 10, is_correct=n % 2, time_taken=1.0, timestamp=1000.0 + n)
+            for n in range(start, start + count)]
+
+
+def test_offsets_are_dense_across_segment_rollover(tmp_path):
+    log = EventLog(str(tmp_path), segment_events=4)
+    assert append(log, 10) == list(range(10))
+    assert log.segments() == [0, 4, 8]
+    assert os.path.getsize(tmp_path / segment_name(4)) == 4 * ANSWER.size
+    assert log.end_offset() == 10
+
+    events = log.read(3, limit=6)
+    assert [event.offset for event in events] == [3, 4, 5, 6, 7, 8]
+    assert [event.user_id for event in events] == [3, 4, 5, 6, 7, 8]
+    assert [event.is_correct for event in events[:2]] == [True, False]
+    log.close()
+
+
+def test_second_writer_continues_the_same_offsets(tmp_path):
+    first = EventLog(str(tmp_path), segment_events=4)
+    second = EventLog(str(tmp_path), segment_events=4)
+    offsets = append(first, 3) + append(second, 3, start=3) + append(first, 3, start=6)
+    assert offsets == list(range(9))
+    assert [event.user_id for event in first.read(0, limit=100)] == list(range(9))
+    first.close()
+    second.close()
+
+
+def test_torn_record_is_dropped(tmp_path):
+    log = EventLog(str(tmp_path), segment_events=4)
+    append(log, 2)
+    with open(tmp_path / segment_name(0), 'ab') as f:
+        f.write(b'\x00' * (ANSWER.size // 2))
+    assert append(log, 1, start=2) == [2]
+    assert [event.user_id for event in log.read(0)] == [0, 1, 2]
+    log.close()
+
+
+def test_read_skips_pruned_segments(tmp_path):
+    log = EventLog(str(tmp_path), segment_events=4)
+    append(log, 10)
+    assert log.delete_before(9) == 2
+    assert log.segments() == [8]
+    assert [event.offset for event in log.read(0)] == [8, 9]
+    log.close()
+
+
+def test_consumer_resumes_from_checkpoint(tmp_path, sqlite_db):
+    log = EventLog(str(tmp_path), segment_events=4)
+    append(log, 6)
+    handled = []
+    consumer = EventConsumer(log, handled.extend, name='test', db=sqlite_db, batch_size=5)
+    assert consumer.poll() == 5
+    assert consumer.lag() == 1
+
+    append(log, 3, start=6)
+    resumed = EventConsumer(log, handled.extend, name='test', db=sqlite_db, batch_size=5)
+    assert resumed.offset == 5
+    while resumed.poll():
+        pass
+    assert [event.offset for event in handled] == list(range(9))
+    assert resumed.lag() == 0
+    log.close()
@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+from job_runner import DONE, FAILED, JobRunner
+
+
+@pytest.fixture
+def runner():
+    runner = JobRunner(max_workers=2, result_ttl=60)
+    yield runner
+    runner.shutdown()
+
+
+def wait(runner, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not runner.get(job_id).finished:
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.005)
+    return runner.get(job_id)
+
+
+def test_requests_for_the_same_key_share_the_running_job(runner):
+    gate = threading.Event()
+    calls = []
+
+    def work(value):
+        calls.append(value)
+        gate.wait(5)
+        return value * 2
+
+    first = runner.submit('key', work, 21)
+    second = runner.submit('key', work, 21)
+    other = runner.submit('other', work, 1)
+    gate.set()
+
+    assert first == second != other
+    assert (wait(runner, first).status, wait(runner, first).result) == (DONE, 42)
+    wait(runner, other)
+    assert sorted(calls) == [1, 21]
+    assert runner.stats()['shared'] == 1
+
+
+def test_finished_results_are_reused_only_when_cached(runner):
+    cached = wait(runner, runner.submit('cached', lambda: 'a', cache=True))
+    assert runner.submit('cached', lambda: 'b', cache=True) == cached.id
+
+    uncached = wait(runner, runner.submit('uncached', lambda: 'a'))
+    again = runner.submit('uncached', lambda: 'b')
+    assert again != uncached.id
+    assert wait(runner, again).result == 'b'
+
+
+def test_failed_job_keeps_the_error_and_is_retried(runner):
+    def fail():
+        raise ValueError("no model")
+
+    job = wait(runner, runner.submit('key', fail, cache=True))
+    assert (job.status, job.error) == (FAILED, "no model")
+    assert runner.submit('key', lambda: 'ok', cache=True) != job.id
+
+
+def test_expired_results_are_pruned():
+    runner = JobRunner(max_workers=1, result_ttl=0)
+    try:
+        job = wait(runner, runner.submit('old', lambda: 1, cache=True))
+        time.sleep(0.01)
+        runner.submit('new', lambda: 2)
+        assert runner.get(job.id) is None
+    finally:
+        runner.shutdown()
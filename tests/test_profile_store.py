@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from profile_store import ProfileStore, empty_profile, iter_json_object
+
+MODELS = {
+    'user1': {'strengths': ['algebra'], 'weaknesses': ['grammar', 'inference'], 'pace': 'fast', 'goals': [1400]},
+    'user "2"': {'learning_style': 'visual', 'preferences': [{'nested': {'deep': [1, 2.5, None, True]}}]},
+    'user3': {'pace': 12345678901234567890, 'unknown_field': 'ignored'},
+    'empty': {}
+}
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64 * 1024])
+def test_iter_json_object_matches_json_load(tmp_path, chunk_size):
+    path = tmp_path / 'user_models.json'
+    path.write_text(json.dumps(MODELS, indent=2), encoding='utf-8')
+    assert list(iter_json_object(str(path), chunk_size)) == list(MODELS.items())
+
+
+def test_iter_json_object_handles_numbers_at_a_chunk_end(tmp_path):
+    path = tmp_path / 'numbers.json'
+    path.write_text('{"a":123456,"b":7}', encoding='utf-8')
+    for chunk_size in range(1, 20):
+        assert list(iter_json_object(str(path), chunk_size)) == [('a', 123456), ('b', 7)]
+
+
+@pytest.mark.parametrize('content', ['{}', '  {\n}\n'])
+def test_iter_json_object_empty(tmp_path, content):
+    path = tmp_path / 'empty.json'
+    path.write_text(content, encoding='utf-8')
+    assert list(iter_json_object(str(path), 2)) == []
+
+
+@pytest.mark.parametrize('content', ['[1, 2]', '{"a": 1', '{"a" 1}'])
+def test_iter_json_object_rejects_malformed_files(tmp_path, content):
+    path = tmp_path / 'bad.json'
+    path.write_text(content, encoding='utf-8')
+    with pytest.raises(ValueError):
+        list(iter_json_object(str(path), 3))
+
+
+def test_migrate_and_update_profiles(db, tmp_path):
+    path = tmp_path / 'user_models.json'
+    path.write_text(json.dumps({'user1': MODELS['user1'], 'user2': {'learning_style': 'visual'}}), encoding='utf-8')
+    store = ProfileStore(db)
+    assert store.migrate_json(str(path), batch_size=1) == 2
+    # Re-running the migration is harmless
+    assert store.migrate_json(str(path)) == 2
+
+    reloaded = ProfileStore(db)
+    assert reloaded.get('user1') == dict(empty_profile(), **MODELS['user1'])
+    assert reloaded.get('user2')['learning_style'] == 'visual'
+    assert reloaded.get('nobody') == empty_profile()
+
+    reloaded.update('user2', pace='slow')
+    assert ProfileStore(db).get('user2')['pace'] == 'slow'
+    with pytest.raises(ValueError):
+        reloaded.update('user2', favourite_colour='blue')
@@ -0,0 +1,69 @@
+import time
+
+from progress_archive import ProgressCompactor, query_archive
+from test_storage import add_bank
+
+
+def timestamp(days_ago, hour=12):
+    return time.strftime('%Y-%m-%d', time.gmtime(time.time() - days_ago * 86400)) + f" {hour:02d}:00:00"
+
+
+def add_history(db):
+    question_ids = add_bank(db)
+    users = [db.add_user(str(1000 + i), f"user{i}") for i in range(3)]
+    rows = []
+    for n, (user_id, question_id) in enumerate((u, q) for u in users for q in question_ids):
+        # Two thirds of the answers fall before a 90 day horizon, spread over several days
+        days_ago = 100 + n % 5 if n % 3 else 10
+        rows.append((user_id, question_id, n % 2, 1.5 + n % 4, timestamp(days_ago, n % 24)))
+    db.add_progress_rows(rows)
+    return users, len(rows)
+
+
+def user_stats(db, user_ids):
+    stats = {}
+    for user_id in user_ids:
+        overall = db.get_user_stats(user_id)
+        stats[user_id] = {
+            'overall': overall['overall'][:2] + (round(overall['overall'][2], 6),),
+            'sections': sorted((row[0], row[1], row[2], round(row[3], 6)) for row in overall['sections']),
+            'daily': db.get_daily_progress(user_id, 365),
+            'weak': [(row[0], row[1], row[2]) for row in db.get_weak_areas(user_id)]
+        }
+    # Raw and compacted history come back as separate rows, so compare the per-section totals
+    aggregates = {}
+    for user_id, section, *values in db.get_progress_aggregates(user_ids):
+        total = aggregates.setdefault((user_id, section), [0] * len(values))
+        for i, value in enumerate(values):
+            total[i] += value
+    stats['aggregates'] = {key: [round(value, 6) for value in values] for key, values in aggregates.items()}
+    return stats
+
+
+def test_compaction_keeps_stats(db, tmp_path):
+    users, answers = add_history(db)
+    before = user_stats(db, users)
+    versions = [db.get_progress_version(user_id) for user_id in users]
+
+    summary = ProgressCompactor(db, directory=str(tmp_path), horizon_days=90, batch_size=7).run()
+
+    assert summary['rows'] == answers - (answers + 2) // 3
+    assert user_stats(db, users) == before
+    assert [db.get_progress_version(user_id) for user_id in users] != versions
+    assert len(list(query_archive(str(tmp_path)))) == summary['rows']
+    # Nothing is left to compact on a second run
+    assert ProgressCompactor(db, directory=str(tmp_path), horizon_days=90).run()['rows'] == 0
+    assert user_stats(db, users) == before
+
+
+def test_fully_compacted_user_keeps_report(db, tmp_path):
+    question_ids = add_bank(db)
+    user_id = db.add_user('1001', 'alice')
+    db.add_progress_rows([(user_id, question_ids[0], 1, 3, timestamp(120)), (user_id, question_ids[1], 0, 4, timestamp(120))])
+
+    ProgressCompactor(db, directory=str(tmp_path), horizon_days=90).run()
+
+    answers, last_id, compacted, last_day = db.get_progress_version(user_id)
+    assert (answers, last_id, compacted) == (0, None, 2)
+    assert last_day == timestamp(120)[:10]
+    assert db.get_user_stats(user_id)['overall'] == (2, 1, 3.5)
@@ -0,0 +1,63 @@
+import asyncio
+
+from rate_limiter import FairSemaphore
+
+
+async def run_requests(semaphore, users):
+    """Queue one request per entry of ``users`` behind a held slot; returns the order they got in"""
+    order = []
+    await semaphore.acquire('holder')
+
+    async def request(user_id, n):
+        async with semaphore.slot(user_id):
+            order.append((user_id, n))
+            await asyncio.sleep(0)
+
+    tasks = [asyncio.create_task(request(user_id, n)) for n, user_id in enumerate(users)]
+    await asyncio.sleep(0)
+    semaphore.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_waiting_users_take_turns():
+    semaphore = FairSemaphore(1, max_queued_per_user=10)
+    order = asyncio.run(run_requests(semaphore, ['heavy'] * 4 + ['light', 'other']))
+    assert [user_id for user_id, _ in order] == ['heavy', 'light', 'other', 'heavy', 'heavy', 'heavy']
+    # A user's own requests still run in the order they arrived
+    assert [n for user_id, n in order if user_id == 'heavy'] == [0, 1, 2, 3]
+    assert semaphore.active == 0 and semaphore.queued() == 0
+
+
+def test_cancelled_waiter_gives_up_its_turn():
+    async def scenario():
+        semaphore = FairSemaphore(1)
+        await semaphore.acquire('holder')
+        waiter = asyncio.create_task(semaphore.acquire('a'))
+        other = asyncio.create_task(semaphore.acquire('b'))
+        await asyncio.sleep(0)
+        assert semaphore.queued() == 2
+        waiter.cancel()
+        await asyncio.sleep(0)
+        semaphore.release()
+        await other
+        assert semaphore.active == 1 and semaphore.queued() == 0
+        semaphore.release()
+        return semaphore.active
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_queue_limit_is_per_user():
+    async def scenario():
+        semaphore = FairSemaphore(1, max_queued_per_user=2)
+        await semaphore.acquire('holder')
+        tasks = [asyncio.create_task(semaphore.acquire('heavy')) for _ in range(2)]
+        await asyncio.sleep(0)
+        result = (semaphore.can_queue('heavy'), semaphore.can_queue('light'))
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return result
+
+    assert asyncio.run(scenario()) == (False, True)
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import report_renderer
+from report_renderer import ReportRenderer
+
+DATA = {'name': 'alice', 'sections': [('math', 4, 3, 3.5), ('reading', 2, 1, 4.0)]}
+
+
+@pytest.fixture
+def renderer(monkeypatch):
+    """A renderer whose charts are drawn by a counting stub in a thread pool"""
+    calls = []
+    gate = threading.Event()
+    gate.set()
+
+    def draw(data):
+        calls.append(data)
+        gate.wait(5)
+        return f"png:{data['name']}:{len(calls)}".encode()
+
+    pool = ThreadPoolExecutor(max_workers=4)
+    renderer = ReportRenderer()
+    renderer._executor = lambda: pool
+    monkeypatch.setitem(report_renderer.RENDERERS, 'report', draw)
+    renderer.calls = calls
+    renderer.gate = gate
+    yield renderer
+    pool.shutdown()
+
+
+def test_cached_png_is_reused_until_the_version_changes(renderer):
+    async def scenario():
+        first = await renderer.render(1, 'report', (3, 10), DATA)
+        again = await renderer.render(1, 'report', (3, 10), DATA)
+        newer = await renderer.render(1, 'report', (4, 11), DATA)
+        return first, again, newer
+
+    first, again, newer = asyncio.run(scenario())
+    assert first == again != newer
+    assert len(renderer.calls) == 2
+    assert renderer.stats()['hits'] == 1
+
+
+def test_chart_parameters_and_display_name_are_part_of_the_key(renderer):
+    async def scenario():
+        await renderer.render(1, 'report', (3, 10), DATA, params=(30,))
+        await renderer.render(1, 'report', (3, 10), DATA, params=(7,))
+        await renderer.render(1, 'report', (3, 10), dict(DATA, name='renamed'), params=(30,))
+        await renderer.render(1, 'report', (3, 10), DATA, params=(30,))
+
+    asyncio.run(scenario())
+    assert len(renderer.calls) == 3
+    assert renderer.stats()['hits'] == 1
+
+
+def test_concurrent_requests_share_one_render(renderer):
+    renderer.gate.clear()
+
+    async def scenario():
+        tasks = [asyncio.create_task(renderer.render(1, 'report', (3, 10), DATA)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        renderer.gate.set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(scenario())
+    assert len(set(results)) == 1
+    assert len(renderer.calls) == 1
+    assert renderer.stats()['shared'] == 4
+
+
+def test_least_recently_used_charts_are_dropped(renderer):
+    renderer.max_entries = 2
+
+    async def scenario():
+        for user_id in (1, 2, 1, 3):
+            await renderer.render(user_id, 'report', (1,), DATA)
+
+    asyncio.run(scenario())
+    assert renderer.cached((1, 'report', (), 'alice'), (1,)) is not None
+    assert renderer.cached((2, 'report', (), 'alice'), (1,)) is None
+    assert renderer.stats()['entries'] == 2
+
+
+def test_renders_a_png_in_the_process_pool():
+    pytest.importorskip('matplotlib')
+    renderer = ReportRenderer(max_workers=1)
+    try:
+        png = asyncio.run(renderer.render(1, 'report', (1,), DATA))
+    finally:
+        renderer.shutdown()
+    assert png.startswith(b'\x89PNG')
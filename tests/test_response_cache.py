@@ -0,0 +1,72 @@
+import sqlite3
+import time
+
+import pytest
+
+from response_cache import ResponseCache, cache_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'llm_cache.db'), max_bytes=1000, ttl=60)
+    yield cache
+    cache.close()
+
+
+def stored_size(cache):
+    return cache.conn.execute("SELECT COALESCE(SUM(size), 0), COUNT(*) FROM responses").fetchone()
+
+
+def test_key_depends_on_every_prompt_field():
+    messages = [{'role': 'user', 'content': 'hi'}]
+    key = cache_key('model', messages, 0.7, 100)
+    assert key == cache_key('model', [{'content': 'hi', 'role': 'user'}], 0.7, 100)
+    assert key != cache_key('model', messages, 0.2, 100)
+    assert key != cache_key('other', messages, 0.7, 100)
+
+
+def test_hit_and_ttl_expiry(cache):
+    cache.put('fresh', 'answer', 10, 20, 1.5)
+    cache.put('stale', 'old answer', 10, 20, 1.5, ttl=-1)
+    assert cache.get('fresh') == ('answer', 10, 20)
+    assert cache.get('stale') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['saved_completion_tokens']) == (1, 1, 20)
+    assert (stats['bytes'], stats['entries']) == stored_size(cache) == (len('answer'), 1)
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    for n in range(9):
+        cache.put(f"key{n}", 'x' * 100, 1, 1, 0.1)
+        time.sleep(0.002)
+    cache.get('key0')
+    cache.put('key9', 'x' * 150, 1, 1, 0.1)
+
+    assert cache.total_bytes() <= 900
+    assert cache.get('key0') is not None
+    assert cache.get('key1') is None
+    assert cache.get('key9') is not None
+    assert (cache.total_bytes(), cache.stats()['entries']) == stored_size(cache)
+
+
+def test_replacing_and_deleting_keep_the_running_size(cache):
+    cache.put('key', 'x' * 100, 1, 1, 0.1)
+    cache.put('key', 'x' * 40, 1, 1, 0.1)
+    assert (cache.total_bytes(), cache.stats()['entries']) == (40, 1)
+    cache.delete('key')
+    cache.delete('missing')
+    assert (cache.total_bytes(), cache.stats()['entries']) == (0, 0)
+
+
+def test_existing_cache_file_is_measured_once(tmp_path):
+    path = str(tmp_path / 'llm_cache.db')
+    ResponseCache(path).close()
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE cache_meta")
+    conn.execute("INSERT INTO responses VALUES ('key', 'abc', 3, 1, 1, 0.1, ?, ?)", (time.time() + 60, time.time()))
+    conn.commit()
+    conn.close()
+
+    cache = ResponseCache(path)
+    assert (cache.total_bytes(), cache.stats()['entries']) == (3, 1)
+    cache.close()
@@ -0,0 +1,36 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from sat_utils import parse_difficulty_topic
+
+
+@pytest.mark.parametrize('difficulty, topic, expected', [
+    (None, None, (None, None)),
+    ('hard', None, (3, None)),
+    ('Easy', 'linear equations', (1, 'linear equations')),
+    ('algebra', None, (None, 'algebra')),
+    ('linear', 'equations', (None, 'linear equations')),
+])
+def test_parse_difficulty_topic(difficulty, topic, expected):
+    assert parse_difficulty_topic(difficulty, topic) == expected
+
+
+def test_trends_version_uses_the_utc_day(sqlite_db, monkeypatch):
+    from types import SimpleNamespace
+    from sat_utils import SATPrep
+
+    # A zone whose local date differs from the UTC date right now
+    monkeypatch.setenv('TZ', 'Etc/GMT+12' if datetime.now(timezone.utc).hour < 12 else 'Etc/GMT-14')
+    time.tzset()
+    try:
+        user_id = sqlite_db.add_user('1001', 'alice')
+        question_id = sqlite_db.add_question('math', 'What is 1 + 1?', '', ['1', '2'], [], '2', '', '', 1)
+        sqlite_db.record_answer(user_id, question_id, True, 3)
+        version, data = SATPrep.get_report_data(SimpleNamespace(db=sqlite_db), '1001', 'trends')
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+    assert version[-1] == datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    assert [row[1:] for row in data['days']] == [(1, 1)]
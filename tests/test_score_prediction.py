@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from score_prediction import DEFAULT_WEIGHTS, FEATURES, ScorePredictor, build_features, load_weights, scale_scores
+from test_storage import add_bank
+
+
+def test_features_sum_raw_and_compacted_rows_per_user():
+    # (user_id, section index, attempts, correct, weighted correct, difficulty sum, seconds)
+    aggregates = [(7, 0, 8, 6, 12, 16, 240), (7, 0, 2, 2, 4, 4, 60), (3, 1, 4, 0, 0, 8, 120)]
+    features, answers = build_features(aggregates, [7, 3, 5])
+    accuracy_math = FEATURES.index('accuracy_math')
+    assert features.shape == (3, len(FEATURES))
+    assert list(answers) == [10, 4, 0]
+    assert features[0, accuracy_math] == pytest.approx((8 + 1) / (10 + 2))
+    assert features[1, FEATURES.index('accuracy_reading')] == pytest.approx(1 / 6)
+    assert features[0, FEATURES.index('minutes_per_question')] == pytest.approx(300 / (10 * 60))
+    # A user without answers sits in the middle of every accuracy
+    assert features[2, accuracy_math] == 0.5 and features[2, FEATURES.index('minutes_per_question')] == 0
+
+
+def test_scores_are_clipped_and_rounded():
+    assert list(scale_scores(np.array([150.0, 456.0, 999.0]))) == [200, 460, 800]
+
+
+def test_weights_file_shape_is_checked(tmp_path):
+    good = tmp_path / 'good.npy'
+    np.save(good, DEFAULT_WEIGHTS * 0)
+    assert not load_weights(str(good)).any()
+    bad = tmp_path / 'bad.npy'
+    np.save(bad, np.zeros((2, 2)))
+    with pytest.raises(ValueError):
+        load_weights(str(bad))
+    assert load_weights(str(tmp_path / 'missing.npy')) is DEFAULT_WEIGHTS
+
+
+def test_batch_predictions_match_single_ones(db, tmp_path):
+    question_ids = add_bank(db)
+    strong, weak, idle = (db.add_user(str(n), f"user{n}") for n in range(3))
+    for question_id in question_ids:
+        db.record_answer(strong, question_id, True, 20)
+        db.record_answer(weak, question_id, False, 90)
+    predictor = ScorePredictor(db, model_path=str(tmp_path / 'missing.npy'))
+
+    batch = predictor.predict_many([idle, weak, strong])
+    assert batch == {user_id: predictor.predict_many([user_id])[user_id] for user_id in (idle, weak, strong)}
+    assert batch[idle] == {'math': 500, 'reading_writing': 500, 'total': 1000, 'answers': 0}
+    assert batch[strong]['total'] > batch[idle]['total'] > batch[weak]['total']
+    assert batch[strong]['answers'] == len(question_ids)
+
+
+def test_precomputed_predictions_are_served_until_stale(db, tmp_path):
+    user_id = db.add_user('1001', 'alice')
+    db.add_user('1002', 'bob')
+    predictor = ScorePredictor(db, model_path=str(tmp_path / 'missing.npy'), max_age=3600)
+    assert predictor.precompute(batch_size=1)['users'] == 2
+
+    stored = db.get_score_prediction(user_id)
+    assert predictor.get_prediction(user_id) == stored
+    stale = ScorePredictor(db, model_path=str(tmp_path / 'missing.npy'), max_age=0)
+    assert stale.get_prediction(user_id)['predicted_at'] > stored['predicted_at']
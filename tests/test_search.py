@@ -0,0 +1,77 @@
+import pytest
+
+from database import fts_query
+
+
+def question(text, section='math', difficulty=2, topic=None, explanation='', question_ar=''):
+    return {
+        'section': section, 'question_en': text, 'question_ar': question_ar, 'options_en': ['A', 'B'],
+        'options_ar': [], 'answer': 'A', 'explanation_en': explanation, 'explanation_ar': '',
+        'difficulty': difficulty, 'passage_en': None, 'passage_ar': '', 'topic': topic
+    }
+
+
+@pytest.fixture
+def bank(db):
+    db.upsert_questions([
+        question("Solve the quadratic equation x^2 - 5x + 6 = 0", topic='quadratics'),
+        question("A triangle has sides 3, 4 and 5; find its area", difficulty=1, topic='geometry'),
+        question("Find the slope of the line through two points", explanation="Use rise over run"),
+        question("Which word best completes the sentence?", section='writing', topic='vocabulary'),
+        question("The equation of a circle is given; find its radius", difficulty=3, topic='geometry'),
+        question("ما هي قيمة المعادلة؟", question_ar="ما هي قيمة المعادلة؟"),
+    ])
+    return db
+
+
+def ids_for(db, query, **filters):
+    return {result['id'] for result in db.search_questions(query, **filters)}
+
+
+def questions_matching(db, word):
+    return {q['id'] for q in db.iter_questions() if word in ' '.join(
+        str(q.get(field) or '') for field in ('question_en', 'question_ar', 'explanation_en', 'topic')).lower()}
+
+
+def test_fts_query_quotes_every_word_and_prefixes_the_last():
+    assert fts_query('quadratic equa') == '"quadratic" "equa"*'
+    assert fts_query('say "hi"') == '"say" """hi"""*'
+    assert fts_query('   ') == ''
+
+
+def test_every_word_must_match_and_the_last_one_is_a_prefix(bank):
+    assert ids_for(bank, 'quadratic equation') == questions_matching(bank, 'quadratic equation')
+    assert ids_for(bank, 'quadratic equ') == questions_matching(bank, 'quadratic equation')
+    assert ids_for(bank, 'triangle radius') == set()
+
+
+def test_topic_and_explanation_are_searched(bank):
+    assert ids_for(bank, 'geometry') == questions_matching(bank, 'geometry')
+    assert len(ids_for(bank, 'geometry')) == 2
+    assert ids_for(bank, 'rise over run') == questions_matching(bank, 'rise over run')
+
+
+def test_filters_and_limit(bank):
+    assert ids_for(bank, 'geometry', difficulty=3) == questions_matching(bank, 'circle')
+    assert ids_for(bank, 'find', section='writing') == set()
+    assert len(bank.search_questions('find', limit=1)) == 1
+    result = bank.search_questions('slope')[0]
+    assert set(result) >= {'id', 'section', 'difficulty', 'topic', 'snippet', 'rank'}
+    assert 'slope' in result['snippet'].lower()
+
+
+def test_odd_queries_do_not_raise(bank):
+    assert bank.search_questions('') == []
+    for query in ('"', "x^2 - 5x", 'AND OR NOT', 'NEAR(', '*'):
+        bank.search_questions(query)
+
+
+def test_updated_questions_are_reindexed(db):
+    db.upsert_questions([question("Find the slope", explanation="Use rise over run")])
+    db.upsert_questions([question("Find the slope", explanation="Divide the change in y by the change in x")])
+    assert ids_for(db, 'divide') and not ids_for(db, 'rise')
+
+
+def test_arabic_text_is_searched(bank):
+    assert ids_for(bank, 'المعادلة') == questions_matching(bank, 'المعادلة')
+    assert len(ids_for(bank, 'المعادلة')) == 1
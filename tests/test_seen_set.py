@@ -0,0 +1,62 @@
+import random
+
+from seen_set import CHUNK_BITS, SeenQuestions, SeenSet, or_bytes, split_chunks
+from test_storage import add_bank
+
+
+def test_seen_set_bits():
+    seen = SeenSet()
+    assert seen.add(9) and not seen.add(9)
+    assert 9 in seen and 8 not in seen and 100000 not in seen
+    seen.merge(1, b'\x01')
+    assert CHUNK_BITS in seen
+    assert len(seen) == 2
+
+
+def test_chunk_helpers():
+    assert or_bytes(b'\x01', b'\x02\x04') == b'\x03\x04'
+    seen = SeenSet()
+    seen.add(3)
+    seen.add(2 * CHUNK_BITS + 1)
+    assert sorted(split_chunks(seen.bits)) == [0, 2]
+
+
+def test_built_from_history_then_marked(db):
+    question_ids = add_bank(db)
+    user_id = db.add_user('1001', 'alice')
+    db.record_answer(user_id, question_ids[0], True, 3)
+
+    seen = SeenQuestions(db).get(user_id)
+    assert question_ids[0] in seen and question_ids[1] not in seen
+
+    SeenQuestions(db).mark(user_id, question_ids[1])
+    SeenQuestions(db).mark(user_id, CHUNK_BITS + 5)
+    # A fresh cache, as in another shard, reads the stored chunks instead of user_progress
+    reloaded = SeenQuestions(db).get(user_id)
+    assert all(question_id in reloaded for question_id in (question_ids[0], question_ids[1], CHUNK_BITS + 5))
+    assert question_ids[2] not in reloaded
+
+
+def test_mark_keeps_bits_stored_by_another_cache(db):
+    user_id = db.add_user('1001', 'alice')
+    first, second = SeenQuestions(db), SeenQuestions(db)
+    first.get(user_id)
+    second.get(user_id)
+    first.mark(user_id, 1)
+    second.mark(user_id, 2)
+    assert 1 in second.get(user_id) and 2 in second.get(user_id)
+    assert [q for q in range(8) if q in SeenQuestions(db).get(user_id)] == [1, 2]
+
+
+def test_pick_unseen_prefers_unanswered_candidates(sqlite_db):
+    user_id = sqlite_db.add_user('1001', 'alice')
+    seen = SeenQuestions(sqlite_db)
+    candidates = list(range(1, 21))
+    for question_id in candidates[:-1]:
+        seen.mark(user_id, question_id)
+
+    rng = random.Random(0)
+    assert {seen.pick_unseen(user_id, candidates, rng) for _ in range(20)} == {20}
+    seen.mark(user_id, 20)
+    assert seen.pick_unseen(user_id, candidates, rng) in candidates
+    assert seen.pick_unseen(user_id, [], rng) is None
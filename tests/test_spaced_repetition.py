@@ -0,0 +1,51 @@
+import pytest
+
+from spaced_repetition import DAY, MIN_EASE, NEW_CARD, RELEARN_INTERVAL_DAYS, answer_quality, next_due, schedule
+from test_storage import add_bank
+
+
+def test_answer_quality():
+    assert answer_quality(False, 5) == 1
+    assert [answer_quality(True, seconds) for seconds in (None, 20, 60, 120)] == [5, 5, 4, 3]
+
+
+def test_intervals_grow_with_successful_reviews():
+    first = schedule(None, 5)
+    second = schedule(first, 5)
+    third = schedule(second, 5)
+    assert (first.interval_days, second.interval_days) == (1.0, 6.0)
+    assert third.interval_days == pytest.approx(6.0 * second.ease, abs=0.01)
+    assert third.repetitions == 3 and third.ease > NEW_CARD.ease
+
+
+def test_lapse_relearns_soon_and_lowers_ease():
+    learned = schedule(schedule(None, 5), 5)
+    lapsed = schedule(learned, 1)
+    assert lapsed.interval_days == RELEARN_INTERVAL_DAYS
+    assert (lapsed.repetitions, lapsed.lapses) == (0, 1)
+    assert lapsed.ease < learned.ease
+
+
+def test_ease_never_drops_below_the_floor():
+    state = None
+    for _ in range(20):
+        state = schedule(state, 0)
+    assert state.ease == MIN_EASE
+
+
+def test_next_due():
+    assert next_due(schedule(None, 5), 1000.0) == 1000.0 + DAY
+
+
+def test_most_overdue_review_comes_first(db):
+    question_ids = add_bank(db)
+    user_id = db.add_user('1001', 'alice')
+    state = schedule(None, 5)
+    db.save_review_state(user_id, question_ids[0], state, 500.0, 0.0)
+    db.save_review_state(user_id, question_ids[1], state, 200.0, 0.0)
+    db.save_review_state(user_id, question_ids[2], state, 5000.0, 0.0)
+
+    assert db.get_next_review(user_id, 1000.0) == question_ids[1]
+    assert db.get_review_state(user_id, question_ids[1]) == tuple(state)
+    assert db.get_review_summary(user_id, 1000.0) == (2, 5000.0)
+    assert db.get_next_review(user_id, 100.0) is None
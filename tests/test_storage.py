@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+
+def add_bank(db):
+    questions = [
+        {
+            'section': section, 'question_en': f"{section} question {i} about triangles" if i % 2 else f"{section} question {i}",
+            'question_ar': '', 'options_en': ['A', 'B', 'C', 'D'], 'options_ar': [], 'answer': 'A',
+            'explanation_en': f"explanation {i}", 'explanation_ar': '', 'difficulty': 1 + i % 3,
+            'passage_en': 'A shared passage' if section == 'reading' else None, 'passage_ar': '',
+            'topic': 'geometry' if i % 2 else None
+        }
+        for section in ('math', 'reading', 'writing') for i in range(4)
+    ]
+    db.upsert_questions(questions)
+    # Upserting the same content again must not duplicate it
+    db.upsert_questions(questions[:3])
+    return [question['id'] for question in db.iter_questions(batch_size=5)]
+
+
+def scenario(db):
+    """Results of the same calls on a fresh backend, in backend-independent form"""
+    results = {}
+    question_ids = add_bank(db)
+    results['count'] = db.count_questions()
+    results['bank'] = [{key: value for key, value in question.items() if key != 'id'} for question in db.iter_questions()]
+    results['math_ids'] = len(db.get_question_ids('math'))
+    results['easy_math_ids'] = len(db.get_question_ids('math', 2))
+    results['search'] = sorted(row['id'] for row in db.search_questions('triangles', section='math'))
+
+    user_id = db.add_user('1001', 'alice')
+    results['same_user'] = db.add_user('1001', 'alice') == user_id
+    db.add_users(['1002', '1003', '2001'])
+    results['found'] = sorted(db.find_discord_ids('100'))
+    results['missing_user'] = db.get_user_id('9999')
+
+    old = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(time.time() - 3 * 86400))
+    db.add_progress_rows([(user_id, question_ids[0], 1, 3.0, old), (user_id, question_ids[4], 0, 4.0, old)])
+    for question_id, is_correct in zip(question_ids[1:4], (True, False, True)):
+        db.record_answer(user_id, question_id, is_correct, 5.0)
+    stats = db.get_user_stats(user_id)
+    results['overall'] = stats['overall']
+    results['sections'] = sorted(stats['sections'])
+    results['daily'] = [tuple(row[1:]) for row in db.get_daily_progress(user_id, 7)]
+    results['weak'] = [(row[0], row[1], row[2]) for row in db.get_weak_areas(user_id)]
+    results['answered'] = sorted(db.get_answered_question_ids(user_id))
+    results['version'] = db.get_progress_version(user_id)[0::2]
+
+    db.save_checkpoint('job', 42)
+    db.save_checkpoint('job', 43)
+    results['checkpoint'] = (db.get_checkpoint('job'), db.get_checkpoint('never-ran'))
+
+    merged = db.merge_seen_chunks(user_id, {0: b'\x01', 1: b'\x02'})
+    merged = db.merge_seen_chunks(user_id, {0: b'\x04\x08'})
+    results['merged'] = sorted(merged.items())
+    results['seen_chunks'] = sorted((chunk, bytes(bits)) for chunk, bits in db.get_seen_chunks(user_id))
+    return results
+
+
+def test_average_time_is_not_truncated(db):
+    question_ids = add_bank(db)
+    user_id = db.add_user('1001', 'alice')
+    db.record_answer(user_id, question_ids[0], True, 3)
+    db.record_answer(user_id, question_ids[1], False, 4)
+    assert db.get_user_stats(user_id)['overall'] == (2, 1, pytest.approx(3.5))
+
+
+def test_seen_chunks_merge_by_or(db):
+    user_id = db.add_user('1001', 'alice')
+    db.merge_seen_chunks(user_id, {0: b'\x01', 2: b'\xff'})
+    merged = db.merge_seen_chunks(user_id, {0: b'\x02\x01'})
+    assert merged == {0: b'\x03\x01'}
+    assert sorted((chunk, bytes(bits)) for chunk, bits in db.get_seen_chunks(user_id)) == [(0, b'\x03\x01'), (2, b'\xff')]
+
+
+def test_sqlite_and_postgres_agree(sqlite_db, postgres_db):
+    sqlite_results = scenario(sqlite_db)
+    postgres_results = scenario(postgres_db)
+    for key, value in sqlite_results.items():
+        assert postgres_results[key] == value, key
@@ -0,0 +1,42 @@
+import inspect
+
+import pytest
+
+from database import SATDatabase
+from storage import StorageBackend
+
+
+def backends():
+    yield SATDatabase
+    try:
+        from postgres_storage import PostgresDatabase
+    except ImportError:
+        return
+    yield PostgresDatabase
+
+
+def interface_methods():
+    return {name for name, member in vars(StorageBackend).items() if inspect.isfunction(member)}
+
+
+def test_every_interface_method_is_abstract():
+    assert StorageBackend.__abstractmethods__ == interface_methods()
+    with pytest.raises(TypeError):
+        StorageBackend()
+
+
+@pytest.mark.parametrize('backend', list(backends()), ids=lambda backend: backend.__name__)
+def test_backend_implements_the_interface(backend):
+    assert not backend.__abstractmethods__
+    for name in interface_methods():
+        expected = list(inspect.signature(getattr(StorageBackend, name)).parameters)
+        actual = list(inspect.signature(getattr(backend, name)).parameters)
+        assert actual == expected, name
+
+
+def test_missing_method_fails_on_construction():
+    class Incomplete(StorageBackend):
+        pass
+
+    with pytest.raises(TypeError, match='get_user_id'):
+        Incomplete()
@@ -0,0 +1,98 @@
+import asyncio
+
+from study_rooms import RoomEngine, score_answer
+
+QUESTION = {'id': 1, 'options_en': ['A', 'B', 'C', 'D'], 'correct_index': 2}
+
+
+def engine(**kwargs):
+    published = []
+
+    async def publish(room, snapshot, final):
+        published.append((snapshot['answered'], final))
+
+    rooms = RoomEngine(publish, **dict({'edit_interval': 0.01, 'time_limit': 5}, **kwargs))
+    rooms.published = published
+    return rooms
+
+
+def test_scoring_rewards_speed():
+    assert score_answer(False, 1, 60) == 0
+    assert score_answer(True, 0, 60) == 150
+    assert score_answer(True, 60, 60) == score_answer(True, 120, 60) == 100
+
+
+def test_members_are_never_moved_between_rooms():
+    rooms = engine(max_members=2)
+    first = rooms.create('alice', 10)
+    second = rooms.create('bob', 10)
+    assert isinstance(rooms.create('alice', 10), str)
+    assert isinstance(rooms.join(second.id, 'alice'), str)
+    assert rooms.room_of('alice') is first
+
+    assert rooms.join(first.id, 'carol') is first
+    assert rooms.join(first.id, 'dave') == "That study room is full."
+    assert rooms.join(999, 'dave') == "That study room does not exist."
+
+
+def test_leaving_hands_over_the_host_and_closes_empty_rooms():
+    rooms = engine()
+    room = rooms.create('alice', 10)
+    rooms.join(room.id, 'bob')
+    rooms.leave('alice')
+    assert room.host_id == 'bob' and not room.closed
+    rooms.leave('bob')
+    assert room.closed and room.id not in rooms.rooms
+    assert rooms.room_of('bob') is None and rooms.leave('bob') is None
+
+
+def test_round_ends_when_every_member_has_answered():
+    rooms = engine()
+
+    async def scenario():
+        room = rooms.create('alice', 10)
+        rooms.join(room.id, 'bob')
+        assert rooms.answer(room, 'alice', 2) == "There is no open question in this room."
+        rooms.start_round(room, QUESTION)
+        waiting = asyncio.create_task(rooms.wait_round(room))
+
+        is_correct, points = rooms.answer(room, 'alice', 2)
+        assert is_correct and points > 100
+        assert rooms.answer(room, 'alice', 1) == "You have already answered this question."
+        assert rooms.answer(room, 'carol', 1) == "Join the room first with `!studyroom join`."
+        await asyncio.sleep(0.03)
+        assert rooms.answer(room, 'bob', 0) == (False, 0)
+
+        result = await asyncio.wait_for(waiting, 1)
+        # A new round may start before the caller stores the answers; the result keeps its own
+        rooms.start_round(room, QUESTION)
+        return room, result
+
+    room, result = asyncio.run(scenario())
+    assert (result['answered'], result['correct'], result['option_counts']) == (2, 1, [1, 0, 1, 0])
+    assert set(result['answers']) == {'alice', 'bob'} and result['answers']['alice'][:2] == (2, True)
+    assert result['leaders'][0][0] == 'alice'
+    assert rooms.published[-1] == (2, True)
+    # Live edits while the round was open, coalesced by the flusher
+    assert (1, False) in rooms.published
+    assert room.answers == {}
+
+
+def test_round_closes_at_the_time_limit():
+    rooms = engine(time_limit=0.05)
+
+    async def scenario():
+        room = rooms.create('alice', 10)
+        rooms.join(room.id, 'bob')
+        rooms.start_round(room, QUESTION)
+        rooms.answer(room, 'alice', 2)
+        result = await rooms.wait_round(room)
+        late = rooms.answer(room, 'bob', 2)
+        await asyncio.sleep(0.05)
+        return room, result, late
+
+    room, result, late = asyncio.run(scenario())
+    assert result['answered'] == 1
+    assert late == "There is no open question in this room."
+    # The flusher stops with the round instead of idling
+    assert room.flusher.done()
@@ -0,0 +1,53 @@
+from view_registry import ViewRegistry
+
+
+def evictions(registry):
+    evicted = []
+    registry.on_evict = lambda entry, view: evicted.append((entry.question_id, view))
+    return evicted
+
+
+def test_oldest_view_of_a_user_is_evicted_at_the_per_user_cap():
+    registry = ViewRegistry(max_per_user=2, max_total=10)
+    evicted = evictions(registry)
+    first = registry.register('alice', 1, 0, 'math', 'pyq', view='view1')
+    registry.register('alice', 2, 0, 'math', 'pyq', view='view2')
+    registry.register('bob', 3, 0, 'math', 'pyq', view='view3')
+    registry.register('alice', 4, 0, 'math', 'pyq', view='view4')
+
+    assert evicted == [(1, 'view1')]
+    assert registry.get(first) is None
+    assert sorted(entry.question_id for entry in registry._entries.values()) == [2, 3, 4]
+    assert registry.stats() == {'live': 3, 'users': 2, 'issued': 4, 'evicted': 1}
+
+
+def test_oldest_view_overall_is_evicted_at_the_global_cap():
+    registry = ViewRegistry(max_per_user=5, max_total=3)
+    evicted = evictions(registry)
+    for n, user_id in enumerate(['alice', 'bob', 'carol', 'dave']):
+        registry.register(user_id, n, 0, 'math', 'pyq', view=f"view{n}")
+
+    assert evicted == [(0, 'view0')]
+    assert len(registry) == 3
+    assert registry.stats()['users'] == 3
+
+
+def test_release_returns_the_entry_once_and_drops_its_view():
+    registry = ViewRegistry()
+    evicted = evictions(registry)
+    token = registry.register('alice', 7, 2, 'reading', 'newq', view='view')
+
+    entry = registry.release(token)
+    assert (entry.question_id, entry.answer_index, entry.section, entry.question_type) == (7, 2, 'reading', 'newq')
+    assert entry.view is None
+    assert registry.release(token) is None
+    assert registry.stats() == {'live': 0, 'users': 0, 'issued': 1, 'evicted': 0}
+    assert evicted == []
+
+
+def test_released_views_do_not_count_towards_the_cap():
+    registry = ViewRegistry(max_per_user=1)
+    evicted = evictions(registry)
+    registry.release(registry.register('alice', 1, 0, 'math', 'pyq', view='view1'))
+    registry.register('alice', 2, 0, 'math', 'pyq', view='view2')
+    assert evicted == []
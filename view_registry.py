@@ -0,0 +1,91 @@
+import time
+from collections import OrderedDict
+
+
+class IssuedQuestion:
+    """What the bot needs to grade one issued question: ids only, no question text"""
+    __slots__ = ('token', 'user_id', 'question_id', 'answer_index', 'section',
+                 'question_type', 'issued_at', 'view')
+
+    def __init__(self, token, user_id, question_id, answer_index, section, question_type, view):
+        self.token = token
+        self.user_id = user_id
+        self.question_id = question_id
+        self.answer_index = answer_index
+        self.section = section
+        self.question_type = question_type
+        self.issued_at = time.monotonic()
+        self.view = view
+
+
+class ViewRegistry:
+    """Bounded registry of live question views.
+
+    Caps the number of live views per user and globally. When a cap is hit the
+    oldest view is evicted first and handed to ``on_evict`` so the caller can
+    stop it and disable its buttons.
+    """
+
+    def __init__(self, max_per_user=3, max_total=1000, on_evict=None):
+        self.max_per_user = max_per_user
+        self.max_total = max_total
+        self.on_evict = on_evict
+        self._entries = OrderedDict()
+        self._by_user = {}
+        self._next_token = 0
+        self.issued = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def register(self, user_id, question_id, answer_index, section, question_type, view=None):
+        """Register a newly issued question and return its token"""
+        user_tokens = self._by_user.get(user_id)
+        while user_tokens and len(user_tokens) >= self.max_per_user:
+            self._evict(next(iter(user_tokens)))
+            user_tokens = self._by_user.get(user_id)
+        while len(self._entries) >= self.max_total:
+            self._evict(next(iter(self._entries)))
+
+        self._next_token += 1
+        token = self._next_token
+        self._entries[token] = IssuedQuestion(
+            token, user_id, question_id, answer_index, section, question_type, view
+        )
+        self._by_user.setdefault(user_id, OrderedDict())[token] = None
+        self.issued += 1
+        return token
+
+    def get(self, token):
+        return self._entries.get(token)
+
+    def release(self, token):
+        """Remove a question once it was answered or timed out"""
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return None
+
+        user_tokens = self._by_user.get(entry.user_id)
+        if user_tokens is not None:
+            user_tokens.pop(token, None)
+            if not user_tokens:
+                del self._by_user[entry.user_id]
+
+        entry.view = None
+        return entry
+
+    def _evict(self, token):
+        view = self._entries[token].view
+        entry = self.release(token)
+        self.evicted += 1
+        if self.on_evict and view is not None:
+            self.on_evict(entry, view)
+
+    def stats(self):
+        return {
+            'live': len(self._entries),
+            'users': len(self._by_user),
+            'issued': self.issued,
+            'evicted': self.evicted
+        }